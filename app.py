@@ -147,6 +147,37 @@ app.register_blueprint(export_bp)
 app.register_blueprint(about_bp)
 app.register_blueprint(data_quality_bp)
 
+# ===== SAVED SEARCHES =====
+# Cập nhật tăng dần tập kết quả của saved search sau mỗi lần ghi camera
+from services import camera_events
+from services.saved_search_service import SavedSearchService
+camera_events.register_listener(SavedSearchService.apply_camera_changes)
+
+# ===== GEOFENCES =====
+# Cập nhật tăng dần tập camera của các geofence sau mỗi lần ghi camera
+from services.geofence_service import GeofenceService
+camera_events.register_listener(GeofenceService.apply_camera_changes)
+
+# ===== MAP CLUSTERS =====
+# Cập nhật tăng dần lưới cụm marker bản đồ sau mỗi lần ghi camera
+from services import cluster_service
+camera_events.register_listener(cluster_service.apply_camera_changes)
+
+# ===== MAP VECTOR TILES =====
+# Xóa các tile chứa vị trí cũ/mới của camera vừa ghi
+from services import tile_service
+camera_events.register_listener(tile_service.apply_camera_changes)
+
+# ===== SQL CACHE STATS =====
+# Đếm hit/miss compiled cache của SQLAlchemy (xem /dashboard/api/sql-cache-stats)
+from services.sql_stats import install_compiled_cache_stats
+install_compiled_cache_stats()
+
+# ===== IN-MEMORY CAMERA INDEX =====
+if app.config.get('CAMERA_INDEX_ENABLED'):
+    from services.camera_index import init_camera_index
+    init_camera_index(app)
+
 # ===== ERROR HANDLERS =====
 @app.errorhandler(404)
 def not_found_error(error):
@@ -184,4 +215,8 @@ if not app.debug:
 if __name__ == "__main__":
     with app.app_context():
         db.create_all()
+        from services.fulltext_service import ensure_fulltext_index
+        ensure_fulltext_index()
+        from services.spatial_index import ensure_spatial_index
+        ensure_spatial_index()
     app.run(debug=app.config.get('DEBUG', False))
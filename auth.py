@@ -10,6 +10,7 @@ import base64
 from models import db, User
 from security_utils import log_audit
 from security_utils import log_login, validate_password, sanitize_input, get_client_ip
+from services.pagination import keyset_paginate
 
 auth_bp = Blueprint("auth", __name__)
 
@@ -216,9 +217,33 @@ def login_history():
     
     page = request.args.get('page', 1, type=int)
     per_page = current_app.config.get('CAMERAS_PER_PAGE', 50)
+    cursor = request.args.get('cursor')
+    if cursor is None and current_app.config.get('PAGINATION_MODE') == 'keyset':
+        cursor = ''
     
-    pagination = LoginHistory.query.filter_by(user_id=current_user.id)\
-        .order_by(LoginHistory.login_time.desc())\
-        .paginate(page=page, per_page=per_page, error_out=False)
+    query = LoginHistory.query.filter_by(user_id=current_user.id)
+    if cursor is not None:
+        # id tăng theo thời gian ghi log nên id DESC tương đương login_time DESC
+        pagination = keyset_paginate(
+            query,
+            LoginHistory.id,
+            cursor=cursor,
+            per_page=per_page,
+            count_mode=current_app.config.get('KEYSET_COUNT_MODE', 'estimate'),
+        )
+    else:
+        pagination = query.order_by(LoginHistory.login_time.desc())\
+            .paginate(page=page, per_page=per_page, error_out=False)
     
-    return render_template("auth/login_history.html", pagination=pagination)
+    def build_cursor_url(cursor_value):
+        """Build URL cho trang keyset tiếp theo/trước đó"""
+        return url_for('auth.login_history', cursor=cursor_value)
+    
+    def build_pagination_url(page_num):
+        """Build URL theo số trang (keyset: đổi thành con trỏ tương ứng)"""
+        if cursor is not None:
+            return build_cursor_url(pagination.cursor_for(page_num) or '')
+        return url_for('auth.login_history', page=page_num)
+    
+    return render_template("auth/login_history.html", pagination=pagination,
+                           build_pagination_url=build_pagination_url, build_cursor_url=build_cursor_url)
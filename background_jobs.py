@@ -1,16 +1,40 @@
 import threading
+import time
 import uuid
+from collections import OrderedDict
 from concurrent.futures import ThreadPoolExecutor
 
 
+# Job giữ lại tối đa bao lâu sau khi xong (giây) và tối đa bao nhiêu job
+JOB_TTL = 3600
+MAX_JOBS = 200
+
 _executor = ThreadPoolExecutor(max_workers=2)
-_jobs = {}
+# Dựng lại index trong bộ nhớ: luồng riêng, không chờ sau import/coverage
+_index_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="index-rebuild")
+_jobs = OrderedDict()
+_finished_at = {}
 _lock = threading.Lock()
 
 
+def _evict_jobs():
+    """Bỏ job đã xong quá JOB_TTL giây, rồi job xong cũ nhất nếu vượt MAX_JOBS (gọi khi giữ _lock)."""
+    now = time.monotonic()
+    for job_id, finished_at in list(_finished_at.items()):
+        if now - finished_at > JOB_TTL:
+            _jobs.pop(job_id, None)
+            del _finished_at[job_id]
+    for job_id in list(_finished_at):
+        if len(_jobs) <= MAX_JOBS:
+            break
+        _jobs.pop(job_id, None)
+        del _finished_at[job_id]
+
+
 def start_job(func, *args, **kwargs):
     job_id = str(uuid.uuid4())
     with _lock:
+        _evict_jobs()
         _jobs[job_id] = {"status": "queued", "result": None, "error": None}
 
     def _run():
@@ -21,15 +45,25 @@ def start_job(func, *args, **kwargs):
             with _lock:
                 _jobs[job_id]["status"] = "finished"
                 _jobs[job_id]["result"] = result
+                _finished_at[job_id] = time.monotonic()
         except Exception as exc:  # noqa: BLE001
             with _lock:
                 _jobs[job_id]["status"] = "failed"
                 _jobs[job_id]["error"] = str(exc)
+                _finished_at[job_id] = time.monotonic()
 
     _executor.submit(_run)
     return job_id
 
 
+def start_index_rebuild(func, *args, **kwargs):
+    """
+    Chạy việc dựng lại index trên luồng riêng, không tạo job trong ``_jobs``
+    (không có trạng thái để tra cứu); ``func`` tự ghi log lỗi của mình.
+    """
+    return _index_executor.submit(func, *args, **kwargs)
+
+
 def get_job(job_id):
     with _lock:
         return _jobs.get(job_id)
@@ -3,7 +3,10 @@ from flask_login import login_required, current_user
 from models import db, Camera
 from sqlalchemy import func
 from import_data import convert_latlon
+from ip_utils import parse_ip_range
 from services.camera_service import CameraService
+from services.saved_search_service import SavedSearchService
+from services.suggest_service import suggest
 import pandas as pd
 import io
 import json
@@ -11,6 +14,43 @@ import json
 camera_bp = Blueprint("camera", __name__, url_prefix="/camera")
 
 
+def _parse_search_filters(args):
+    """Đọc bộ lọc tìm kiếm từ query string. Returns: (filters, has_filters)"""
+    filters = {}
+    has_filters = False
+    
+    # ===== BASIC =====
+    for field in ["owner_name", "organization_name", "address_street", "ward", 
+                  "province", "phone", "manufacturer", "latlon", "static_ip"]:
+        value = args.get(field)
+        if value:
+            filters[field] = value
+            has_filters = True
+    
+    # ===== ADVANCED =====
+    for field in ["monitoring_modes", "storage_types", "camera_types", 
+                  "form_factors", "network_types", "install_areas"]:
+        values = args.getlist(field)
+        if values:
+            filters[field] = values
+            has_filters = True
+    
+    if args.get("match") == "prefix":
+        filters["match"] = "prefix"
+    
+    # Dải IP: CIDR (10.20.0.0/16) hoặc khoảng (10.0.0.1-10.0.0.50); bỏ qua nếu không hợp lệ
+    ip_range = (args.get("ip_range") or "").strip()
+    if ip_range:
+        try:
+            parse_ip_range(ip_range)
+            filters["ip_range"] = ip_range
+            has_filters = True
+        except ValueError:
+            pass
+    
+    return filters, has_filters
+
+
 @camera_bp.route("/", methods=["GET", "POST"])
 @login_required
 def search():
@@ -23,7 +63,7 @@ def search():
         
         # Thêm các filter vào query params
         for key in ["owner_name", "organization_name", "address_street", "ward", 
-                    "province", "phone", "manufacturer", "latlon", "static_ip"]:
+                    "province", "phone", "manufacturer", "latlon", "static_ip", "ip_range"]:
             val = f.get(key)
             if val:
                 params.append(f"{key}={val}")
@@ -35,38 +75,43 @@ def search():
                 if val:
                     params.append(f"{key}={val}")
         
+        # Chế độ khớp: "prefix" = bắt đầu bằng (không dấu), mặc định là chứa
+        if f.get("match") == "prefix":
+            params.append("match=prefix")
+        
         query_string = "&".join(params)
         return redirect(url_for("camera.search") + ("?" + query_string if query_string else ""))
     
     # GET request - xử lý search và pagination
-    # Build filters dictionary
-    filters = {}
-    has_filters = False
-    
-    # ===== BASIC =====
-    for field in ["owner_name", "organization_name", "address_street", "ward", 
-                  "province", "phone", "manufacturer", "latlon", "static_ip"]:
-        value = request.args.get(field)
-        if value:
-            filters[field] = value
-            has_filters = True
-    
-    # ===== ADVANCED =====
-    for field in ["monitoring_modes", "storage_types", "camera_types", 
-                  "form_factors", "network_types", "install_areas"]:
-        values = request.args.getlist(field)
-        if values:
-            filters[field] = values
-            has_filters = True
+    filters, has_filters = _parse_search_filters(request.args)
+    if request.args.get("ip_range", "").strip() and "ip_range" not in filters:
+        flash("⚠️ Dải IP không hợp lệ (ví dụ: 10.20.0.0/16 hoặc 10.0.0.1-10.0.0.50)", "warning")
     
     # Pagination
     page = request.args.get('page', 1, type=int)
     per_page = current_app.config.get('CAMERAS_PER_PAGE', 50)
+    cursor = request.args.get('cursor')
+    if cursor is None and current_app.config.get('PAGINATION_MODE') == 'keyset':
+        cursor = ''
     
+    # Saved search: đọc tập kết quả đã materialize thay vì lọc lại
+    saved_search = SavedSearchService.get_for_user(
+        request.args.get("saved", type=int), getattr(current_user, "id", None)
+    )
+    if saved_search:
+        filters = saved_search.get_filters()
+        results, total_results, pagination = SavedSearchService.search(
+            saved_search, page=page, per_page=per_page, cursor=cursor, columns="list"
+        )
     # Use service layer for search
-    if has_filters:
+    elif has_filters:
         results, total_results, pagination = CameraService.search_cameras(
-            filters, page=page, per_page=per_page
+            filters,
+            page=page,
+            per_page=per_page,
+            cursor=cursor,
+            count_mode=current_app.config.get('KEYSET_COUNT_MODE', 'estimate'),
+            columns="list",
         )
     else:
         pagination = None
@@ -84,21 +129,34 @@ def search():
         "manufacturer": filters.get("manufacturer", ""),
         "latlon": filters.get("latlon", ""),
         "static_ip": filters.get("static_ip", ""),
+        "ip_range": filters.get("ip_range") or request.args.get("ip_range", ""),
         "monitoring_modes": filters.get("monitoring_modes", []),
         "storage_types": filters.get("storage_types", []),
         "camera_types": filters.get("camera_types", []),
         "form_factors": filters.get("form_factors", []),
         "network_types": filters.get("network_types", []),
         "install_areas": filters.get("install_areas", []),
+        "match": filters.get("match", "contains"),
     }
     
     # Helper function để build pagination URL
     def build_pagination_url(page_num):
         """Build URL với tất cả query params hiện tại, chỉ thay đổi page"""
+        if cursor is not None:
+            # Keyset: số trang (đầu/trước/sau) được đổi thành con trỏ tương ứng
+            return build_cursor_url(pagination.cursor_for(page_num) or '')
         args = request.args.copy()
         args['page'] = page_num
         return url_for('camera.search', **args)
     
+    # Helper function để build URL cho keyset pagination (cursor thay cho page)
+    def build_cursor_url(cursor_value):
+        """Build URL với tất cả query params hiện tại, chỉ thay đổi cursor"""
+        args = request.args.copy()
+        args.pop('page', None)
+        args['cursor'] = cursor_value
+        return url_for('camera.search', **args)
+    
     # Helper function để build URL với tất cả query params hiện tại (cho return_url)
     def build_current_search_url():
         """Build URL với tất cả query params hiện tại, giữ nguyên page"""
@@ -112,10 +170,67 @@ def search():
         total_results=total_results,
         filters=display_filters,
         build_pagination_url=build_pagination_url,
-        build_current_search_url=build_current_search_url
+        build_cursor_url=build_cursor_url,
+        build_current_search_url=build_current_search_url,
+        saved_search=saved_search,
+        saved_searches=SavedSearchService.list_for_user(getattr(current_user, "id", None)),
     )
 
 
+@camera_bp.route("/saved-searches", methods=["POST"])
+@login_required
+def create_saved_search():
+    """Lưu bộ lọc tìm kiếm hiện tại (gửi kèm trong form) thành saved search"""
+    name = (request.form.get("name") or "").strip()
+    filters, has_filters = _parse_search_filters(request.form)
+    if not name or not has_filters:
+        flash("⚠️ Cần tên và ít nhất một điều kiện lọc để lưu tìm kiếm", "warning")
+        return redirect(request.referrer or url_for("camera.search"))
+
+    saved = SavedSearchService.create(current_user.id, name, filters)
+    flash(f"✅ Đã lưu tìm kiếm '{saved.name}' ({saved.result_count} camera)", "success")
+    return redirect(url_for("camera.search", saved=saved.id))
+
+
+@camera_bp.route("/saved-searches/<int:saved_id>/refresh", methods=["POST"])
+@login_required
+def refresh_saved_search(saved_id):
+    saved = SavedSearchService.get_for_user(saved_id, current_user.id)
+    if not saved:
+        abort(404)
+    count = SavedSearchService.refresh(saved)
+    flash(f"✅ Đã cập nhật '{saved.name}' ({count} camera)", "success")
+    return redirect(url_for("camera.search", saved=saved.id))
+
+
+@camera_bp.route("/saved-searches/<int:saved_id>/delete", methods=["POST"])
+@login_required
+def delete_saved_search(saved_id):
+    saved = SavedSearchService.get_for_user(saved_id, current_user.id)
+    if not saved:
+        abort(404)
+    SavedSearchService.delete(saved)
+    flash("✅ Đã xóa tìm kiếm đã lưu", "success")
+    return redirect(url_for("camera.search"))
+
+
+@camera_bp.route("/api/saved-searches", methods=["GET"])
+@login_required
+def api_saved_searches():
+    """API danh sách saved search của người dùng hiện tại, kèm số camera"""
+    saved_searches = SavedSearchService.list_for_user(current_user.id)
+    return jsonify([
+        {
+            "id": saved.id,
+            "name": saved.name,
+            "filters": saved.get_filters(),
+            "count": saved.result_count or 0,
+            "url": url_for("camera.search", saved=saved.id),
+        }
+        for saved in saved_searches
+    ])
+
+
 @camera_bp.route("/<int:camera_id>")
 @login_required
 def detail(camera_id):
@@ -156,8 +271,15 @@ def detail(camera_id):
 @login_required
 def export():
     ids = request.form.getlist("camera_ids")
+    # Export saved search: đọc tập kết quả đã materialize bằng JOIN (không nạp id ra Python)
+    saved = None
+    saved_search_id = request.form.get("saved_search_id", type=int)
+    if not ids and saved_search_id:
+        saved = SavedSearchService.get_for_user(saved_search_id, current_user.id)
+        if not saved:
+            abort(404)
     # Nếu không có camera nào được chọn, lấy tất cả camera từ kết quả tìm kiếm
-    if not ids:
+    if not ids and not saved:
         all_ids = request.form.getlist("all_camera_ids")
         if all_ids:
             ids = all_ids
@@ -171,7 +293,10 @@ def export():
         flash("⚠️ Vui lòng chọn ít nhất một trường để xuất", "warning")
         return redirect(url_for("camera.search"))
     
-    cameras = CameraService.get_cameras_by_ids(ids)
+    if saved:
+        cameras = SavedSearchService.get_cameras(saved, columns=selected_fields)
+    else:
+        cameras = CameraService.get_cameras_by_ids(ids, columns=selected_fields)
 
     def format_json_field(value):
         """Format JSON field để hiển thị dạng text"""
@@ -381,7 +506,7 @@ def edit_list():
     cameras = []
     
     if selected_ward:
-        cameras = CameraService.get_cameras_by_ward(selected_ward)
+        cameras = CameraService.get_cameras_by_ward(selected_ward, columns="list")
     
     return render_template(
         "camera/edit.html",
@@ -737,3 +862,40 @@ def _get_stream_info(camera):
         "manufacturer": camera.manufacturer,
         "note": "RTSP streams cần được convert sang HLS/WebRTC để play trong browser. HTTP/MJPEG có thể play trực tiếp."
     }
+
+
+@camera_bp.route("/api/facets", methods=["GET"])
+@login_required
+def api_facets():
+    """API đếm kết quả tìm kiếm theo facet, nhận cùng bộ lọc với trang tìm kiếm"""
+    filters, _ = _parse_search_filters(request.args)
+    result = CameraService.get_facet_counts(filters)
+
+    facets = {
+        field: [
+            {"value": value, "count": count}
+            for value, count in sorted(counts.items(), key=lambda x: x[1], reverse=True)
+        ]
+        for field, counts in result["facets"].items()
+    }
+    return jsonify({"total": result["total"], "facets": facets})
+
+
+@camera_bp.route("/api/suggest", methods=["GET"])
+@login_required
+def api_suggest():
+    """API gợi ý giá trị cho ô tìm kiếm: ?field=ward&q=dong&limit=10"""
+    field = request.args.get("field", "")
+    query = request.args.get("q", "")
+    limit = request.args.get("limit", type=int)
+
+    try:
+        results = suggest(field, query, limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "field": field,
+        "q": query,
+        "suggestions": [{"value": value, "count": count} for value, count in results],
+    })
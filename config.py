@@ -40,6 +40,14 @@ class Config:
     
     # Pagination
     CAMERAS_PER_PAGE = 50
+    # "offset" (page=N) hoặc "keyset" (cursor, không OFFSET - trang sâu vẫn nhanh).
+    # Request có tham số ?cursor= luôn dùng keyset.
+    PAGINATION_MODE = 'offset'
+    # Cách tính tổng ở chế độ keyset: "exact", "estimate" (đếm tối đa 1000) hoặc "none"
+    KEYSET_COUNT_MODE = 'estimate'
+    # Truy cập cột nằm ngoài tập cột đã nạp (services.projections) thì báo lỗi
+    # thay vì lazy load thêm một query mỗi dòng, để tập cột thiếu lộ ra ngay
+    PROJECTION_RAISELOAD = True
     
     # Import batch size for transaction management
     # Commit database every N records instead of all at once
@@ -55,6 +63,37 @@ class Config:
     CACHE_TYPE = "SimpleCache"  # Default: SimpleCache (in-memory), hoặc "RedisCache" nếu có Redis
     CACHE_DEFAULT_TIMEOUT = 300  # 5 phút
     CACHE_REDIS_URL = os.environ.get('REDIS_URL') or 'redis://localhost:6379/0'
+    # Cache tổng số kết quả tìm kiếm theo bộ lọc (tự hết hạn khi dữ liệu camera thay đổi)
+    SEARCH_COUNT_CACHE_TIMEOUT = 300
+    
+    # Index dạng cột trong bộ nhớ (NumPy) cho tìm kiếm/dashboard/bản đồ.
+    # Mỗi worker giữ một bản; nên dùng RedisCache để data version dùng chung.
+    CAMERA_INDEX_ENABLED = os.environ.get('CAMERA_INDEX_ENABLED', 'false').lower() == 'true'
+    # Chu kỳ (giây) so checksum index với DB để phát hiện lệch và dựng lại
+    CAMERA_INDEX_CHECK_INTERVAL = 60
+    # Số dòng so từng giá trị với DB mỗi chu kỳ (quét lần lượt hết bảng)
+    CAMERA_INDEX_CHECK_ROWS = 5000
+    
+    # Vector tile bản đồ (/map/tiles/z/x/y.mvt): thư mục cache trên đĩa (dùng chung)
+    # và số tile giữ trong bộ nhớ mỗi worker
+    MAP_TILE_CACHE_DIR = os.environ.get('MAP_TILE_CACHE_DIR') or os.path.join('cache', 'tiles')
+    MAP_TILE_MEMORY_ITEMS = 512
+    # Tuổi tối đa (giây) của tile đã cache, phòng ghi camera không qua ứng dụng (0 = không hết hạn)
+    MAP_TILE_MAX_AGE = 3600
+    
+    # Tính tuyến đường (/map/route): "osrm" hoặc "offline" (đồ thị GeoJSON trong ROUTER_GRAPH_FILE).
+    # Có ROUTER_GRAPH_FILE thì router offline cũng là dự phòng khi OSRM không phản hồi.
+    ROUTER_BACKEND = os.environ.get('ROUTER_BACKEND', 'osrm')
+    OSRM_URL = os.environ.get('OSRM_URL') or 'http://router.project-osrm.org'
+    ROUTER_GRAPH_FILE = os.environ.get('ROUTER_GRAPH_FILE')
+    ROUTER_TIMEOUT = 10  # giây (đọc)
+    # Ngắt mạch: tối đa N lời gọi đồng thời, ngắt RESET_TIMEOUT giây sau THRESHOLD lỗi liên tiếp
+    ROUTER_MAX_CONCURRENCY = 4
+    ROUTER_FAILURE_THRESHOLD = 5
+    ROUTER_RESET_TIMEOUT = 30
+    # Cache tuyến đã tính (LRU trong file SQLite), 0 = tắt
+    ROUTE_CACHE_PATH = os.environ.get('ROUTE_CACHE_PATH') or os.path.join('cache', 'routes.sqlite')
+    ROUTE_CACHE_SIZE = 5000
 
 
 class DevelopmentConfig(Config):
@@ -67,6 +106,8 @@ class ProductionConfig(Config):
     """Cấu hình cho môi trường production"""
     DEBUG = False
     TESTING = False
+    # Tập cột thiếu chỉ làm chậm (lazy load) chứ không làm lỗi trang
+    PROJECTION_RAISELOAD = False
     # Trong production, SECRET_KEY sẽ được check ở app.py khi load config
 
 
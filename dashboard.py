@@ -2,6 +2,9 @@ from flask import Blueprint, render_template, request, jsonify, current_app, sen
 from flask_login import login_required
 from models import db, Camera
 from color_utils import build_system_color_map
+from services.camera_service import CameraService
+from services.camera_index import get_camera_index
+from services.sql_stats import get_stats
 from sqlalchemy import func
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, landscape
@@ -34,43 +37,18 @@ def get_cache() -> Optional[object]:
 dashboard_bp = Blueprint("dashboard", __name__, url_prefix="/dashboard")
 
 
-@dashboard_bp.route("/")
-@login_required
-def index():
-    cache = get_cache()
-    
-    # Cache key cho dashboard data
-    cache_key = 'dashboard_stats'
-    
-    # Thử lấy từ cache
-    cached_data = None
-    if cache:
-        try:
-            cached_data = cache.get(cache_key)
-        except (AttributeError, TypeError):
-            # Cache chưa được init hoặc không phải Cache object
-            cached_data = None
-    
-    if cached_data:
-        return render_template("dashboard/index.html", **cached_data)
-    
-    # Nếu không có cache, tính toán lại
+def _count_cameras_from_db():
+    """Đếm thống kê dashboard bằng cách duyệt toàn bộ camera (khi không có index)."""
     # OPTIMIZE: Load all cameras once và tính toán trong memory thay vì nhiều queries
     all_cameras = Camera.query.all()
     total = len(all_cameras)
 
-    color_map = build_system_color_map(db.session, Camera, cache=cache)
-
-    # OPTIMIZE: Tính toán trong memory từ all_cameras đã load
-    # Thống kê theo system_type
     system_counts = {}
     ward_counts = {}
     manufacturer_counts = {}
     cameras_with_coords = 0
     cameras_with_sharing = 0
     cameras_with_static_ip = 0
-    install_area_stats = {}
-    monitoring_stats = {}
     
     for cam in all_cameras:
         # System type
@@ -96,26 +74,59 @@ def index():
         # Static IP
         if cam.static_ip:
             cameras_with_static_ip += 1
-        
-        # Install areas (JSON field)
-        try:
-            areas = cam.get_json("install_areas")
-            for area in areas:
-                if area:
-                    install_area_stats[area] = install_area_stats.get(area, 0) + 1
-        except (ValueError, TypeError, AttributeError, KeyError):
-            # JSON parsing failed or field doesn't exist - skip this camera
-            pass
-        
-        # Monitoring modes (JSON field)
+
+    return (total, system_counts, ward_counts, manufacturer_counts, cameras_with_coords,
+            cameras_with_sharing, cameras_with_static_ip)
+
+
+@dashboard_bp.route("/")
+@login_required
+def index():
+    cache = get_cache()
+    
+    # Cache key cho dashboard data
+    cache_key = 'dashboard_stats'
+    
+    # Thử lấy từ cache
+    cached_data = None
+    if cache:
         try:
-            modes = cam.get_json("monitoring_modes")
-            for mode in modes:
-                if mode:
-                    monitoring_stats[mode] = monitoring_stats.get(mode, 0) + 1
-        except (ValueError, TypeError, AttributeError, KeyError):
-            # JSON parsing failed or field doesn't exist - skip this camera
-            pass
+            cached_data = cache.get(cache_key)
+        except (AttributeError, TypeError):
+            # Cache chưa được init hoặc không phải Cache object
+            cached_data = None
+    
+    if cached_data:
+        return render_template("dashboard/index.html", **cached_data)
+    
+    # Nếu không có cache, tính toán lại
+    color_map = build_system_color_map(db.session, Camera, cache=cache)
+
+    camera_index = get_camera_index()
+    if camera_index:
+        # Đếm vector hóa trên index trong bộ nhớ, không chạm DB
+        summary = camera_index.summary()
+        total = summary["total"]
+        system_counts = camera_index.value_counts("system_type", missing_label="Chưa phân loại")
+        ward_counts = camera_index.value_counts("ward")
+        manufacturer_counts = camera_index.value_counts("manufacturer")
+        cameras_with_coords = summary["with_latlon"]
+        cameras_with_sharing = summary["with_sharing"]
+        cameras_with_static_ip = summary["with_static_ip"]
+        option_counts = camera_index.option_counts(["install_areas", "monitoring_modes"])
+        # Giá trị ngoài danh mục không có bit trong index -> đếm bổ sung từ JSON
+        unlisted_counts = CameraService.get_unlisted_option_counts(["install_areas", "monitoring_modes"])
+        for field, unlisted in unlisted_counts.items():
+            for option, count in unlisted.items():
+                option_counts[field][option] = option_counts[field].get(option, 0) + count
+    else:
+        (total, system_counts, ward_counts, manufacturer_counts, cameras_with_coords,
+         cameras_with_sharing, cameras_with_static_ip) = _count_cameras_from_db()
+        # Install areas / monitoring modes: đếm trên cột bitmask bằng 1 query,
+        # không json.loads từng camera (giá trị ngoài danh mục đếm riêng từ JSON)
+        option_counts = CameraService.get_option_counts(["install_areas", "monitoring_modes"])
+    install_area_stats = option_counts["install_areas"]
+    monitoring_stats = option_counts["monitoring_modes"]
     
     # Convert to list format for compatibility
     by_system = [(k, v) for k, v in sorted(system_counts.items(), key=lambda x: x[1], reverse=True)]
@@ -235,6 +246,13 @@ def api_wards():
     return jsonify(result)
 
 
+@dashboard_bp.route("/api/sql-cache-stats")
+@login_required
+def api_sql_cache_stats():
+    """Hit/miss của compiled cache SQLAlchemy và cache điều kiện tìm kiếm camera"""
+    return jsonify(get_stats(db.engine))
+
+
 @dashboard_bp.route("/api/systems")
 @login_required
 def api_systems():
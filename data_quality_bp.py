@@ -7,6 +7,7 @@ from models import Camera, db
 from data_quality.duplicate_detector import DuplicateDetector
 from data_quality.quality_score import DataQualityScore
 from data_quality.auto_fix import AutoFixEngine
+from services import camera_events
 
 data_quality_bp = Blueprint("data_quality", __name__, url_prefix="/data-quality")
 
@@ -79,8 +80,16 @@ def apply_fix():
     
     if hasattr(camera, field):
         old_value = getattr(camera, field)
+        old = camera_events.snapshot(camera)
         setattr(camera, field, suggested_value)
+        if field == 'latlon':
+            # Tính lại latitude/longitude/geohash theo tọa độ mới
+            camera.set_latlon_components()
+        camera.set_option_masks()
+        camera.set_search_components()
+        new = camera_events.snapshot(camera)
         db.session.commit()
+        camera_events.publish([camera_events.CameraChange("update", camera_id, old, new)])
         
         log_audit('edit', 'camera', camera_id, {
             'field': field,
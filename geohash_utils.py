@@ -0,0 +1,151 @@
+"""
+Geohash cho tọa độ camera, phục vụ truy vấn không gian trên mọi backend SQL.
+
+Geohash xen kẽ bit kinh độ / vĩ độ (đường cong Z-order) rồi ghi base32; bảng
+chữ cái base32 tăng dần theo thứ tự ASCII nên thứ tự chuỗi trùng thứ tự số, và
+mọi điểm trong một ô là các chuỗi có chung tiền tố. Một khung chữ nhật vì vậy
+được phủ bằng vài ô rồi đổi thành vài khoảng ``geohash >= a AND geohash < b``
+dùng được B-tree index (không cần LIKE, không cần text_pattern_ops).
+"""
+
+GEOHASH_PRECISION = 9  # ~4.8 m x 4.8 m
+# Số ô tối đa khi phủ một khung: chọn độ chính xác mịn nhất không vượt quá mức này
+MAX_COVER_CELLS = 32
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def _bits(precision):
+    """(số bit kinh độ, số bit vĩ độ) của geohash ``precision`` ký tự."""
+    total = 5 * precision
+    return (total + 1) // 2, total // 2
+
+
+def _cell_index(value, low, high, bits):
+    index = int((value - low) / (high - low) * (1 << bits))
+    return min(max(index, 0), (1 << bits) - 1)
+
+
+def _interleave(lon_index, lat_index, precision):
+    lon_bits, lat_bits = _bits(precision)
+    value = 0
+    for position in range(lon_bits + lat_bits):
+        if position % 2 == 0:
+            bit = (lon_index >> (lon_bits - 1 - position // 2)) & 1
+        else:
+            bit = (lat_index >> (lat_bits - 1 - position // 2)) & 1
+        value = (value << 1) | bit
+    return value
+
+
+def _to_base32(value, precision):
+    chars = []
+    for _ in range(precision):
+        chars.append(_BASE32[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+def encode(lat, lon, precision=GEOHASH_PRECISION):
+    """
+    Geohash của điểm.
+
+    Returns:
+        chuỗi ``precision`` ký tự, hoặc None nếu thiếu / sai tọa độ
+
+    Example:
+        >>> encode(10.7769, 106.7009, 7)
+        'w3gvk1c'
+    """
+    if lat is None or lon is None:
+        return None
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    lon_bits, lat_bits = _bits(precision)
+    value = _interleave(
+        _cell_index(lon, -180.0, 180.0, lon_bits),
+        _cell_index(lat, -90.0, 90.0, lat_bits),
+        precision,
+    )
+    return _to_base32(value, precision)
+
+
+def _cover_size(min_lat, max_lat, min_lon, max_lon, precision):
+    lon_bits, lat_bits = _bits(precision)
+    columns = _cell_index(max_lon, -180.0, 180.0, lon_bits) - _cell_index(min_lon, -180.0, 180.0, lon_bits) + 1
+    rows = _cell_index(max_lat, -90.0, 90.0, lat_bits) - _cell_index(min_lat, -90.0, 90.0, lat_bits) + 1
+    return columns * rows
+
+
+def cover_precision(min_lat, max_lat, min_lon, max_lon, max_cells=MAX_COVER_CELLS):
+    """Độ chính xác mịn nhất mà khung được phủ bởi không quá ``max_cells`` ô."""
+    precision = 1
+    while precision < GEOHASH_PRECISION and _cover_size(
+        min_lat, max_lat, min_lon, max_lon, precision + 1
+    ) <= max_cells:
+        precision += 1
+    return precision
+
+
+def cover_ranges(boxes, max_cells=MAX_COVER_CELLS):
+    """
+    Các khoảng geohash phủ hợp các khung chữ nhật.
+
+    Mỗi khung được phủ ở độ chính xác riêng (``cover_precision``); các ô liền
+    nhau theo thứ tự Z-order và các khoảng chồng nhau được gộp lại.
+
+    Args:
+        boxes: list (min_lat, max_lat, min_lon, max_lon)
+
+    Returns:
+        list (start, stop) đã sắp xếp: geohash thuộc khoảng nếu
+        ``start <= geohash < stop``; stop là None nếu không chặn trên
+    """
+    intervals = []
+    for min_lat, max_lat, min_lon, max_lon in boxes:
+        min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 90.0)
+        min_lon, max_lon = max(min_lon, -180.0), min(max_lon, 180.0)
+        if min_lat > max_lat or min_lon > max_lon:
+            continue
+        precision = cover_precision(min_lat, max_lat, min_lon, max_lon, max_cells)
+        lon_bits, lat_bits = _bits(precision)
+        lon_range = range(
+            _cell_index(min_lon, -180.0, 180.0, lon_bits),
+            _cell_index(max_lon, -180.0, 180.0, lon_bits) + 1,
+        )
+        lat_range = range(
+            _cell_index(min_lat, -90.0, 90.0, lat_bits),
+            _cell_index(max_lat, -90.0, 90.0, lat_bits) + 1,
+        )
+        # Khoảng trên trục số chung: ô độ chính xác p phủ [v, v + 1) x 32^(P - p)
+        scale = 32 ** (GEOHASH_PRECISION - precision)
+        for value in sorted(
+            _interleave(lon_index, lat_index, precision)
+            for lon_index in lon_range for lat_index in lat_range
+        ):
+            intervals.append((value * scale, (value + 1) * scale))
+
+    merged = []
+    for start, stop in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], stop)
+        else:
+            merged.append([start, stop])
+
+    limit = 32 ** GEOHASH_PRECISION
+    ranges = []
+    for start, stop in merged:
+        ranges.append((
+            _trim(_to_base32(start, GEOHASH_PRECISION)),
+            _trim(_to_base32(stop, GEOHASH_PRECISION)) if stop < limit else None,
+        ))
+    return ranges
+
+
+def _trim(value):
+    # Bỏ các ký tự "0" cuối: "w3gv0000" và "w3gv" cùng vị trí so sánh với cột geohash
+    return value.rstrip("0") or "0"
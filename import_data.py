@@ -7,6 +7,7 @@ import pandas as pd
 
 from background_jobs import get_job, start_job
 from services.import_service import process_import
+from text_utils import normalize_phone
 
 # Batch size for committing records (configurable)
 DEFAULT_BATCH_SIZE = 100  # Commit every 100 records
@@ -249,9 +250,11 @@ def validate_phone(phone_str):
     """Validate phone number (cơ bản)"""
     if not phone_str or pd.isna(phone_str):
         return True  # Cho phép rỗng
-    # Chấp nhận số điện thoại với các ký tự +, -, khoảng trắng
-    phone_clean = re.sub(r'[\s\-\+]', '', str(phone_str))
-    return phone_clean.isdigit() and len(phone_clean) >= 8
+    # Chấp nhận số điện thoại với các ký tự +, -, ., (), khoảng trắng
+    if re.search(r'[^\d\s\-\+\.\(\)]', str(phone_str)):
+        return False
+    phone_clean = normalize_phone(phone_str)
+    return phone_clean is not None and len(phone_clean) >= 8
 
 
 # =========================
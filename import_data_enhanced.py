@@ -12,6 +12,7 @@ import csv
 from io import StringIO
 
 from models import db, Camera
+from services import camera_events
 from parse_m2 import parse_m2_to_records
 from security_utils import log_audit, sanitize_input
 from data_quality.validation_rules import ValidationRulesConfig
@@ -101,6 +102,7 @@ def import_with_progress(filepath, file_type, progress_key):
         success = 0
         errors = 0
         error_details = []
+        created = []
         
         # Process records
         for idx, record in enumerate(records):
@@ -129,8 +131,11 @@ def import_with_progress(filepath, file_type, progress_key):
                     system_type=sanitize_input(record.get('system_type')),
                     latlon=sanitize_input(record.get('latlon')),
                 )
+                camera.set_latlon_components()
+                camera.set_search_components()
                 
                 db.session.add(camera)
+                created.append(camera)
                 success += 1
                 
             except Exception as e:
@@ -148,8 +153,15 @@ def import_with_progress(filepath, file_type, progress_key):
             session[progress_key]['error_details'] = error_details
             session.modified = True
         
-        # Commit all at once
+        # Commit all at once; flush để có id và chụp snapshot trước commit,
+        # rồi phát sự kiện ghi (data version + listener) như process_import
+        db.session.flush()
+        changes = [
+            camera_events.CameraChange("create", cam.id, None, camera_events.snapshot(cam))
+            for cam in created
+        ]
         db.session.commit()
+        camera_events.publish(changes)
         
         session[progress_key]['status'] = 'completed'
         session.modified = True
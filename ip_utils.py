@@ -0,0 +1,94 @@
+"""
+Chuẩn hóa địa chỉ IP camera để tìm theo dải (CIDR / khoảng).
+
+Cột ``static_ip`` là chuỗi tự do ("10.20.1.5", "10.20.1.5:8000", "[fe80::1]").
+``ip_to_key`` đưa về số nguyên 128 bit (IPv4 được ánh xạ vào ::ffff:0:0/96),
+ghi dưới dạng hex cố định 32 ký tự: thứ tự chuỗi trùng với thứ tự số, nên một
+dải IP là một phép BETWEEN dùng được B-tree index trên mọi backend (số 128 bit
+không vừa kiểu INTEGER/BIGINT của SQL).
+"""
+import ipaddress
+
+IP_KEY_LENGTH = 32
+
+_IPV4_MAPPED_BASE = 0xFFFF << 32
+
+
+def parse_ip(value):
+    """
+    Đọc địa chỉ IP từ chuỗi, bỏ khoảng trắng, ngoặc vuông và cổng.
+
+    Returns:
+        ipaddress.IPv4Address / IPv6Address hoặc None nếu không hợp lệ
+
+    Example:
+        >>> str(parse_ip(" 10.20.1.5:8000 "))
+        '10.20.1.5'
+    """
+    if not value:
+        return None
+    text = str(value).strip()
+    if text.startswith("[") and "]" in text:
+        # [IPv6]:port
+        text = text[1:text.index("]")]
+    elif text.count(":") == 1:
+        # IPv4:port
+        text = text.split(":", 1)[0]
+    try:
+        return ipaddress.ip_address(text)
+    except ValueError:
+        return None
+
+
+def _to_int(address):
+    if address.version == 4:
+        return _IPV4_MAPPED_BASE | int(address)
+    return int(address)
+
+
+def _format_key(number):
+    return f"{number:0{IP_KEY_LENGTH}x}"
+
+
+def ip_to_key(value):
+    """
+    Khóa sắp xếp được (hex 32 ký tự) của địa chỉ IP, hoặc None nếu không hợp lệ.
+
+    Example:
+        >>> ip_to_key("10.0.0.1")
+        '00000000000000000000ffff0a000001'
+    """
+    address = parse_ip(value)
+    if address is None:
+        return None
+    return _format_key(_to_int(address))
+
+
+def parse_ip_range(expression):
+    """
+    Đọc dải IP: CIDR ("10.20.0.0/16"), khoảng ("10.0.0.1-10.0.0.50") hoặc một IP.
+
+    Returns:
+        (low_key, high_key) - cận dưới/trên (bao gồm) dạng ip_to_key
+
+    Raises:
+        ValueError: nếu biểu thức không hợp lệ
+    """
+    text = (expression or "").strip()
+    if not text:
+        raise ValueError("Dải IP rỗng")
+
+    if "/" in text:
+        network = ipaddress.ip_network(text, strict=False)
+        low, high = network.network_address, network.broadcast_address
+    elif "-" in text:
+        start, end = (part.strip() for part in text.split("-", 1))
+        low, high = ipaddress.ip_address(start), ipaddress.ip_address(end)
+        if low.version != high.version:
+            raise ValueError("Hai đầu dải IP phải cùng phiên bản (IPv4/IPv6)")
+        if low > high:
+            low, high = high, low
+    else:
+        low = high = ipaddress.ip_address(text)
+
+    return _format_key(_to_int(low)), _format_key(_to_int(high))
@@ -1,13 +1,30 @@
-from flask import Blueprint, render_template, request, jsonify, current_app
-from flask_login import login_required
+from flask import Blueprint, render_template, request, jsonify, current_app, url_for
+from flask_login import current_user, login_required
 from models import db, Camera
+from background_jobs import get_job, start_job
 from sqlalchemy import text
-from color_utils import build_system_color_map
+from color_utils import SYSTEM_PALETTE, build_system_color_map
+from services.camera_index import get_camera_index
+from services.cache_service import data_version_tag
+from services.cluster_service import get_clusters, get_heatmap
+from services.coverage_service import DEFAULT_CELL_M, DEFAULT_RADIUS_M, parse_area, plan_coverage, run_coverage
+from services.geofence_service import GeofenceService, cameras_in_polygons, parse_polygons
+from services.nearest_service import nearest_cameras
+from services.projections import projection_columns
+from services.radius_service import batch_radius_search, parse_centers
+from services.route_service import DEFAULT_BUFFER_M, MAX_BUFFER_M, cameras_along_route
+from services.routing import RouterUnavailable, RoutingError, get_router
+from services.spatial_index import bbox_criteria
+from services.tile_service import get_tile
+import hashlib
+import json
 import math
-import requests
 
 map_bp = Blueprint("map", __name__, url_prefix="/map")
 
+# Số camera tối đa mỗi lần nạp popup
+MAX_POPUP_IDS = 200
+
 
 def parse_latlon(latlon):
     """
@@ -52,15 +69,52 @@ def distance_m(lat1, lon1, lat2, lon2):
     return R * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
 
 
+def parse_bbox(value):
+    """
+    'min_lon,min_lat,max_lon,max_lat' (thứ tự của Leaflet toBBoxString) -> tuple float
+
+    Raises:
+        ValueError: nếu thiếu thành phần hoặc tọa độ không hợp lệ
+    """
+    parts = [part.strip() for part in (value or "").split(",")]
+    if len(parts) != 4:
+        raise ValueError("bbox phải có dạng min_lon,min_lat,max_lon,max_lat")
+    min_lon, min_lat, max_lon, max_lat = (float(part) for part in parts)
+    if not (-180 <= min_lon <= max_lon <= 180 and -90 <= min_lat <= max_lat <= 90):
+        raise ValueError("bbox nằm ngoài phạm vi tọa độ")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def _system_color_map():
+    cache = None
+    try:
+        cache = current_app.extensions.get('cache')
+    except (RuntimeError, AttributeError, KeyError):
+        pass
+    return build_system_color_map(db.session, Camera, cache=cache)
+
+
+def _viewport_etag(bbox, systems):
+    """
+    ETag theo data version + bbox + danh sách hệ thống (None nếu không có cache).
+
+    Version lấy từ ``data_version_tag``: với SimpleCache có kèm token process
+    nên ETag của worker khác không bao giờ được coi là khớp.
+    """
+    version = data_version_tag()
+    if not version:
+        return None
+    digest = hashlib.md5(
+        json.dumps([bbox, systems], ensure_ascii=False).encode("utf-8")
+    ).hexdigest()[:16]
+    return f"cameras-{version}-{digest}"
+
+
 @map_bp.route("/")
 @login_required
 def index():
     focus_id = request.args.get("camera_id", type=int)
     return_url = request.args.get("return_url")  # Lấy return_url từ query string
-    cameras = Camera.query.filter(
-        (Camera.latitude.isnot(None) & Camera.longitude.isnot(None))
-        | Camera.latlon.isnot(None)
-    ).all()
     # Luôn trả về color_map với 6 hệ thống cố định (có cache)
     cache = None
     try:
@@ -69,6 +123,29 @@ def index():
         pass
     color_map = build_system_color_map(db.session, Camera, cache=cache)
 
+    camera_index = get_camera_index()
+    if camera_index:
+        # Tọa độ/thuộc tính lấy từ index trong bộ nhớ, không query DB
+        cam_data = []
+        for point in camera_index.map_points():
+            system_type = point.pop("system_type") or "Chưa phân loại"
+            point["system"] = system_type
+            point["color"] = color_map.get(system_type, "#94A3B8")
+            cam_data.append(point)
+        return render_template(
+            "map/index.html",
+            cameras=cam_data,
+            focus_id=focus_id,
+            color_map=color_map,
+            return_url=return_url or "",
+        )
+
+    # Core select chỉ các cột cần cho marker/popup (Row, không dựng đối tượng ORM)
+    cameras = Camera.query.with_entities(*projection_columns("map")).filter(
+        (Camera.latitude.isnot(None) & Camera.longitude.isnot(None))
+        | Camera.latlon.isnot(None)
+    ).all()
+
     # Optimize: Parse all cameras in batch using list comprehension
     # This avoids N+1 query problem and improves performance
     cam_data = []
@@ -100,6 +177,214 @@ def index():
     )
 
 
+@map_bp.route("/api/clusters")
+@login_required
+def api_clusters():
+    """Cụm marker trong khung nhìn: ?bbox=min_lon,min_lat,max_lon,max_lat&zoom=12"""
+    zoom = request.args.get("zoom", type=int)
+    try:
+        bbox = parse_bbox(request.args.get("bbox"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if zoom is None or zoom < 0:
+        return jsonify({"error": "zoom không hợp lệ"}), 400
+
+    return jsonify({
+        "zoom": zoom,
+        "clusters": get_clusters(bbox, zoom),
+        "colors": _system_color_map(),
+    })
+
+
+@map_bp.route("/api/heatmap")
+@login_required
+def api_heatmap():
+    """
+    Lưới mật độ camera: ?bbox=min_lon,min_lat,max_lon,max_lat&zoom=12&system=<system_type>
+
+    Mỗi ô là mảng [lat, lon, count, counts] với counts là số camera theo từng
+    hệ thống, cùng thứ tự với ``systems``. Hỗ trợ ETag/If-None-Match.
+    """
+    zoom = request.args.get("zoom", type=int)
+    system = request.args.get("system") or None
+    try:
+        bbox = parse_bbox(request.args.get("bbox"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if zoom is None or zoom < 0:
+        return jsonify({"error": "zoom không hợp lệ"}), 400
+
+    # Bản sao: map màu có thể là object trong cache, hệ thống mới được bổ sung bên dưới
+    color_map = dict(_system_color_map())
+    systems = list(color_map)
+
+    etag = _viewport_etag([bbox, zoom, system], systems)
+    if etag and request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+
+    entries = get_heatmap(bbox, zoom, system=system)
+    for entry in entries:
+        for system_type in entry["systems"]:
+            if system_type not in color_map:
+                color_map[system_type] = SYSTEM_PALETTE[len(systems) % len(SYSTEM_PALETTE)]
+                systems.append(system_type)
+    cells = [
+        [
+            round(entry["lat"], 6),
+            round(entry["lon"], 6),
+            entry["count"],
+            [entry["systems"].get(system_type, 0) for system_type in systems],
+        ]
+        for entry in entries
+    ]
+
+    response = jsonify({
+        "zoom": zoom,
+        "fields": ["lat", "lon", "count", "systems"],
+        "systems": systems,
+        "colors": [color_map[system_type] for system_type in systems],
+        "max": max((cell[2] for cell in cells), default=0),
+        "cells": cells,
+    })
+    if etag:
+        response.set_etag(etag)
+    else:
+        response.add_etag()
+        response.make_conditional(request)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@map_bp.route("/api/cameras")
+@login_required
+def api_cameras():
+    """
+    Marker trong khung nhìn: ?bbox=min_lon,min_lat,max_lon,max_lat
+
+    Mỗi camera là mảng [id, lat, lon, system_code] với system_code là vị trí
+    trong ``systems`` (cùng thứ tự với ``colors``). Hỗ trợ ETag/If-None-Match.
+    """
+    try:
+        bbox = parse_bbox(request.args.get("bbox"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    min_lon, min_lat, max_lon, max_lat = bbox
+
+    color_map = _system_color_map()
+    systems = list(color_map)
+
+    # Có data version thì ETag tính được trước khi query -> 304 không chạm DB
+    etag = _viewport_etag(bbox, systems)
+    if etag and request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+
+    rows = (
+        Camera.query.with_entities(*projection_columns("marker"))
+        .filter(*bbox_criteria(min_lat, max_lat, min_lon, max_lon))
+        .order_by(Camera.id)
+        .all()
+    )
+    codes = {system_type: code for code, system_type in enumerate(systems)}
+    cameras = [
+        [row.id, row.latitude, row.longitude, codes.get(row.system_type or "Chưa phân loại", -1)]
+        for row in rows
+    ]
+
+    response = jsonify({
+        "fields": ["id", "lat", "lon", "system"],
+        "systems": systems,
+        "colors": [color_map[system_type] for system_type in systems],
+        "cameras": cameras,
+    })
+    if etag:
+        response.set_etag(etag)
+    else:
+        response.add_etag()
+        response.make_conditional(request)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
+@map_bp.route("/api/cameras/popup")
+@login_required
+def api_camera_popups():
+    """Thông tin popup của nhiều marker: ?ids=1,2,3 (tối đa MAX_POPUP_IDS)"""
+    try:
+        ids = sorted({int(part) for part in request.args.get("ids", "").split(",") if part.strip()})
+    except ValueError:
+        return jsonify({"error": "ids phải là danh sách số nguyên"}), 400
+    if len(ids) > MAX_POPUP_IDS:
+        return jsonify({"error": f"Tối đa {MAX_POPUP_IDS} camera mỗi lần"}), 400
+    if not ids:
+        return jsonify({"cameras": {}})
+
+    rows = (
+        Camera.query.with_entities(*projection_columns("popup"))
+        .filter(Camera.id.in_(ids))
+        .all()
+    )
+    return jsonify({
+        "cameras": {
+            str(row.id): {
+                "system": row.system_type or "Chưa phân loại",
+                "owner": row.owner_name,
+                "org": row.organization_name,
+                "address": row.address_street,
+                "ward": row.ward,
+                "province": row.province,
+                "phone": row.phone,
+                "manufacturer": row.manufacturer,
+            }
+            for row in rows
+        }
+    })
+
+
+@map_bp.route("/api/nearest")
+@login_required
+def api_nearest():
+    """
+    k camera gần một điểm nhất: ?lat=&lon=&k=10&system=<system_type>&shared=1|0
+    """
+    lat = request.args.get("lat", type=float)
+    lon = request.args.get("lon", type=float)
+    k = request.args.get("k", type=int)
+    system = request.args.get("system") or None
+    shared = request.args.get("shared")
+    if lat is None or lon is None:
+        return jsonify({"error": "Thiếu tọa độ lat/lon"}), 400
+    if shared not in (None, "", "0", "1"):
+        return jsonify({"error": "shared phải là 0 hoặc 1"}), 400
+
+    try:
+        cameras = nearest_cameras(
+            lat, lon, k, system=system, shared=None if not shared else shared == "1"
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"lat": lat, "lon": lon, "cameras": cameras})
+
+
+@map_bp.route("/tiles/<int:z>/<int:x>/<int:y>.mvt")
+@login_required
+def vector_tile(z, x, y):
+    """Vector tile (MVT) lớp camera, thuộc tính: system, count"""
+    try:
+        data = get_tile(z, x, y)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+
+    response = current_app.response_class(data, mimetype="application/vnd.mapbox-vector-tile")
+    response.add_etag()
+    response.make_conditional(request)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+
 @map_bp.route("/radius")
 @login_required
 def search_radius():
@@ -126,11 +411,9 @@ def search_radius():
             ),
         ).params(lat=lat, lon=lon, radius=radius).all()
     else:
+        # SQLite: R*Tree (nếu đã tạo) lọc khung bao, haversine loại phần góc
         cameras = Camera.query.filter(
-            Camera.latitude.isnot(None),
-            Camera.longitude.isnot(None),
-            Camera.latitude.between(min_lat, max_lat),
-            Camera.longitude.between(min_lon, max_lon),
+            *bbox_criteria(min_lat, max_lat, min_lon, max_lon)
         ).all()
     # OPTIMIZE: Parse latlon once per camera
     for c in cameras:
@@ -150,30 +433,147 @@ def search_radius():
     return jsonify(results)
 
 
-def point_to_line_distance(point_lat, point_lon, line_start_lat, line_start_lon, line_end_lat, line_end_lon):
+@map_bp.route("/api/radius/batch", methods=["POST"])
+@login_required
+def search_radius_batch():
     """
-    Tính khoảng cách từ điểm đến đoạn thẳng trên mặt cầu (sử dụng Haversine)
-    Tìm điểm gần nhất trên đoạn thẳng và tính khoảng cách đến điểm đó
+    Camera quanh nhiều tâm trong một request.
+    Body JSON: {"centers": [{"lat", "lon", "radius", "id"?}], "radius"?: mặc định}
     """
-    # Nếu đoạn thẳng là một điểm, tính khoảng cách trực tiếp
-    if abs(line_start_lat - line_end_lat) < 1e-6 and abs(line_start_lon - line_end_lon) < 1e-6:
-        return distance_m(point_lat, point_lon, line_start_lat, line_start_lon)
-    
-    # Chia đoạn thẳng thành nhiều điểm và tìm điểm gần nhất
-    # Sử dụng phương pháp chia nhỏ đoạn thẳng để tính gần đúng
-    num_points = max(10, int(distance_m(line_start_lat, line_start_lon, line_end_lat, line_end_lon) / 10))
-    min_dist = float('inf')
-    
-    for i in range(num_points + 1):
-        t = i / num_points
-        # Interpolate trên đường thẳng
-        interp_lat = line_start_lat + t * (line_end_lat - line_start_lat)
-        interp_lon = line_start_lon + t * (line_end_lon - line_start_lon)
-        
-        dist = distance_m(point_lat, point_lon, interp_lat, interp_lon)
-        min_dist = min(min_dist, dist)
-    
-    return min_dist
+    try:
+        centers = parse_centers(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(batch_radius_search(centers))
+
+
+@map_bp.route("/api/polygon", methods=["POST"])
+@login_required
+def search_polygon():
+    """
+    Camera trong đa giác.
+    Body: GeoJSON Polygon / MultiPolygon (Geometry, Feature hoặc FeatureCollection), tọa độ [lon, lat]
+    """
+    try:
+        polygons = parse_polygons(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    cameras = cameras_in_polygons(polygons)
+    return jsonify({"count": len(cameras), "cameras": cameras})
+
+
+def _geofence_dict(geofence):
+    return {
+        "id": geofence.id,
+        "name": geofence.name,
+        "count": geofence.camera_count or 0,
+        "bbox": [geofence.min_lon, geofence.min_lat, geofence.max_lon, geofence.max_lat],
+        "refreshed_at": geofence.refreshed_at.isoformat() if geofence.refreshed_at else None,
+    }
+
+
+@map_bp.route("/api/geofences", methods=["GET"])
+@login_required
+def api_geofences():
+    """Danh sách geofence đã lưu, kèm số camera"""
+    return jsonify([_geofence_dict(geofence) for geofence in GeofenceService.list_all()])
+
+
+@map_bp.route("/api/geofences", methods=["POST"])
+@login_required
+def create_geofence():
+    """
+    Lưu geofence: {"name": "...", "geometry": <GeoJSON Polygon / MultiPolygon>}
+    """
+    payload = request.get_json(silent=True) or {}
+    try:
+        geofence = GeofenceService.create(
+            getattr(current_user, "id", None), payload.get("name"), payload.get("geometry")
+        )
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    return jsonify(_geofence_dict(geofence)), 201
+
+
+@map_bp.route("/api/geofences/<int:geofence_id>")
+@login_required
+def api_geofence(geofence_id):
+    """Geofence kèm đa giác và các camera nằm trong (đã tính sẵn)"""
+    geofence = GeofenceService.get(geofence_id)
+    if not geofence:
+        return jsonify({"error": "Không tìm thấy geofence"}), 404
+    return jsonify({
+        **_geofence_dict(geofence),
+        "geometry": geofence.get_geometry(),
+        "cameras": GeofenceService.get_cameras(geofence),
+    })
+
+
+@map_bp.route("/api/geofences/<int:geofence_id>/refresh", methods=["POST"])
+@login_required
+def refresh_geofence(geofence_id):
+    geofence = GeofenceService.get(geofence_id)
+    if not geofence:
+        return jsonify({"error": "Không tìm thấy geofence"}), 404
+    GeofenceService.refresh(geofence)
+    return jsonify(_geofence_dict(geofence))
+
+
+@map_bp.route("/api/geofences/<int:geofence_id>/delete", methods=["POST"])
+@login_required
+def delete_geofence(geofence_id):
+    geofence = GeofenceService.get(geofence_id)
+    if not geofence:
+        return jsonify({"error": "Không tìm thấy geofence"}), 404
+    GeofenceService.delete(geofence)
+    return jsonify({"deleted": geofence_id})
+
+
+@map_bp.route("/api/coverage", methods=["POST"])
+@login_required
+def start_coverage_analysis():
+    """
+    Phân tích vùng trống camera (chạy nền).
+    Body JSON: một trong "bbox" | "geometry" (GeoJSON) | "geofence_id" | "route" ([[lat, lon]], kèm "buffer"),
+    cùng "radius" (m, mặc định 100) và "cell" (m, mặc định 25)
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({"error": "Body phải là JSON object"}), 400
+    try:
+        buffer_m = float(payload.get("buffer", DEFAULT_BUFFER_M))
+        radius_m = float(payload.get("radius", DEFAULT_RADIUS_M))
+        cell_m = float(payload.get("cell", DEFAULT_CELL_M))
+    except (TypeError, ValueError):
+        return jsonify({"error": "buffer, radius và cell phải là số (mét)"}), 400
+    try:
+        polygons, route_points = parse_area(payload, geofence_lookup=GeofenceService.get)
+        plan = plan_coverage(
+            polygons=polygons,
+            route_points=route_points,
+            buffer_m=buffer_m,
+            radius_m=radius_m,
+            cell_m=cell_m,
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    job_id = start_job(run_coverage, current_app._get_current_object(), plan)
+    return jsonify({
+        "job_id": job_id,
+        "grid": [plan.rows, plan.cols],
+        "status_url": url_for("map.coverage_status", job_id=job_id),
+    }), 202
+
+
+@map_bp.route("/api/coverage/<job_id>")
+@login_required
+def coverage_status(job_id):
+    job = get_job(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
 
 
 @map_bp.route("/route")
@@ -181,75 +581,43 @@ def point_to_line_distance(point_lat, point_lon, line_start_lat, line_start_lon,
 def search_route():
     """
     Tìm tuyến đường từ điểm A đến điểm B và các camera trên tuyến đường
-    Sử dụng OSRM để tính toán tuyến đường
+    Router: services.routing (OSRM hoặc đồ thị offline)
     """
     lat_a = request.args.get("lat_a", type=float)
     lon_a = request.args.get("lon_a", type=float)
     lat_b = request.args.get("lat_b", type=float)
     lon_b = request.args.get("lon_b", type=float)
+    # Bề rộng hành lang mỗi bên tuyến (mét)
+    buffer_m = request.args.get("buffer", type=float, default=DEFAULT_BUFFER_M)
     
     if not all([lat_a, lon_a, lat_b, lon_b]):
         return jsonify({"error": "Thiếu tọa độ điểm A hoặc B"}), 400
+    if not 0 < buffer_m <= MAX_BUFFER_M:
+        return jsonify({"error": f"buffer phải trong khoảng (0, {MAX_BUFFER_M}] mét"}), 400
     
-    # Sử dụng OSRM để tính toán tuyến đường
-    # OSRM format: lon,lat (chú ý thứ tự)
+    # Router theo cấu hình ROUTER_* (OSRM / đồ thị offline), có cache và ngắt mạch
     try:
-        osrm_url = f"http://router.project-osrm.org/route/v1/driving/{lon_a},{lat_a};{lon_b},{lat_b}?overview=full&geometries=geojson"
-        response = requests.get(osrm_url, timeout=10)
-        route_data = response.json()
+        route = get_router().route((lat_a, lon_a), (lat_b, lon_b))
         
-        if route_data.get("code") != "Ok" or not route_data.get("routes"):
-            return jsonify({"error": "Không thể tính toán tuyến đường"}), 400
+        # Tuyến dạng [lat, lon] cho Leaflet
+        route_points = route.points
         
-        route = route_data["routes"][0]
-        geometry = route["geometry"]
-        coordinates = geometry["coordinates"]  # [[lon, lat], ...]
-        
-        # Chuyển đổi sang format [lat, lon] cho Leaflet
-        route_points = [[coord[1], coord[0]] for coord in coordinates]
-        
-        # Tìm các camera trên tuyến đường (trong phạm vi 50m từ tuyến)
-        cameras_on_route = []
-        cameras = Camera.query.filter(Camera.latlon.isnot(None)).all()
-        
-        for c in cameras:
-            clat, clon = parse_latlon(c.latlon)
-            if not clat or not clon:
-                continue
-            
-            # Kiểm tra khoảng cách từ camera đến từng đoạn của tuyến đường
-            min_distance = float('inf')
-            for i in range(len(route_points) - 1):
-                point1 = route_points[i]  # [lat, lon]
-                point2 = route_points[i + 1]  # [lat, lon]
-                
-                # Tính khoảng cách từ camera đến đoạn thẳng
-                dist = point_to_line_distance(clat, clon, point1[0], point1[1], point2[0], point2[1])
-                min_distance = min(min_distance, dist)
-            
-            # Nếu camera nằm trong phạm vi 50m từ tuyến đường
-            if min_distance <= 50:
-                cameras_on_route.append({
-                    "id": c.id,
-                    "lat": clat,
-                    "lon": clon,
-                    "system": c.system_type or "Chưa phân loại",
-                    "owner": c.owner_name,
-                    "org": c.organization_name,
-                    "address": c.address_street,
-                    "ward": c.ward,
-                    "province": c.province,
-                    "distance_to_route": round(min_distance)
-                })
+        # Camera trong hành lang quanh tuyến (mặc định 50m mỗi bên), sắp theo vị trí dọc tuyến
+        cameras_on_route = cameras_along_route(route_points, buffer_m)
         
         return jsonify({
             "route": route_points,
-            "distance": round(route["distance"]),  # mét
-            "duration": round(route["duration"]),  # giây
+            "distance": round(route.distance),  # mét
+            "duration": round(route.duration),  # giây
             "cameras": cameras_on_route
         })
         
-    except (ValueError, KeyError, requests.RequestException, ConnectionError) as e:
+    except RouterUnavailable as e:
+        current_app.logger.warning(f"Router unavailable: {e}")
+        return jsonify({"error": f"Dịch vụ tính tuyến đường tạm thời không khả dụng: {str(e)}"}), 503
+    except RoutingError as e:
+        return jsonify({"error": f"Không thể tính toán tuyến đường: {str(e)}"}), 400
+    except (ValueError, KeyError) as e:
         current_app.logger.error(f"Route calculation error: {e}", exc_info=True)
         return jsonify({"error": f"Lỗi khi tính toán tuyến đường: {str(e)}"}), 500
     except Exception as e:
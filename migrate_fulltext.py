@@ -0,0 +1,17 @@
+"""
+Migration script để tạo full-text index cho tìm kiếm camera.
+SQLite: bảng FTS5 camera_fts + trigger đồng bộ; PostgreSQL: GIN index tsvector.
+Chạy lại script bất cứ lúc nào để nạp lại (rebuild) index.
+
+Usage:
+    python migrate_fulltext.py
+"""
+from app import app
+from services.fulltext_service import ensure_fulltext_index
+
+
+with app.app_context():
+    if ensure_fulltext_index(rebuild=True):
+        print("✅ Full-text index đã sẵn sàng")
+    else:
+        print("⚠️ Database hiện tại không hỗ trợ full-text index, tìm kiếm sẽ dùng ilike")
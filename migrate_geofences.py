@@ -0,0 +1,20 @@
+"""
+Migration script để tạo bảng geofence (geofence, geofence_camera)
+và tính lại tập camera của các geofence đã có.
+
+Usage:
+    python migrate_geofences.py
+"""
+from app import app
+from models import Geofence, db
+from services.geofence_service import GeofenceService
+
+
+with app.app_context():
+    db.create_all()
+    print("✓ Tables geofence, geofence_camera ready")
+
+    for geofence in Geofence.query.all():
+        count = GeofenceService.refresh(geofence)
+        print(f"✓ {geofence.name}: {count} cameras")
+    print("✅ Geofences updated")
@@ -0,0 +1,32 @@
+"""
+Migration script để thêm cột geohash (ô lưới của latitude/longitude, dùng cho
+truy vấn khung / bán kính bằng range scan trên mọi backend) và backfill cho các
+camera đã có.
+
+Usage:
+    python migrate_geohash.py
+"""
+from sqlalchemy import inspect, text
+
+from app import app
+from models import db
+from services.camera_service import CameraService
+
+
+with app.app_context():
+    inspector = inspect(db.engine)
+    columns = [col["name"] for col in inspector.get_columns("camera")]
+    existing_indexes = [idx["name"] for idx in inspector.get_indexes("camera")]
+
+    if "geohash" not in columns:
+        db.session.execute(text("ALTER TABLE camera ADD COLUMN geohash VARCHAR(12)"))
+        print("✓ Added column geohash")
+
+    if "ix_camera_geohash" not in existing_indexes:
+        db.session.execute(text("CREATE INDEX ix_camera_geohash ON camera (geohash)"))
+        print("✓ Created index ix_camera_geohash")
+    db.session.commit()
+
+    updated = CameraService.backfill_geohash()
+    print(f"✓ Backfilled {updated} cameras")
+    print("✅ Geohash column updated")
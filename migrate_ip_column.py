@@ -0,0 +1,32 @@
+"""
+Migration script để thêm cột static_ip_num (IP dạng số, dùng cho tìm kiếm
+theo dải CIDR) và backfill cho các camera đã có.
+
+Usage:
+    python migrate_ip_column.py
+"""
+from sqlalchemy import inspect, text
+
+from app import app
+from models import db
+from services.camera_service import CameraService
+
+
+with app.app_context():
+    inspector = inspect(db.engine)
+    columns = [col["name"] for col in inspector.get_columns("camera")]
+    existing_indexes = [idx["name"] for idx in inspector.get_indexes("camera")]
+
+    if "static_ip_num" not in columns:
+        db.session.execute(text("ALTER TABLE camera ADD COLUMN static_ip_num VARCHAR(32)"))
+        print("✓ Added column static_ip_num")
+
+    if "ix_camera_static_ip_num" not in existing_indexes:
+        db.session.execute(text("CREATE INDEX ix_camera_static_ip_num ON camera (static_ip_num)"))
+        print("✓ Created index ix_camera_static_ip_num")
+    db.session.commit()
+
+    # static_ip_num được điền cùng các cột tìm kiếm chuẩn hóa
+    updated = CameraService.backfill_search_columns()
+    print(f"✓ Backfilled {updated} cameras")
+    print("✅ IP column updated")
@@ -0,0 +1,36 @@
+"""
+Migration script để thêm các cột bitmask cho các trường nhiều lựa chọn
+(monitoring_modes, storage_types, camera_types, form_factors, network_types,
+install_areas) và chuyển đổi dữ liệu JSON hiện có sang bitmask.
+
+Cột JSON vẫn được giữ nguyên (get_json/set_json vẫn hoạt động).
+
+Usage:
+    python migrate_option_masks.py
+"""
+from sqlalchemy import inspect, text
+
+from app import app
+from models import MULTI_VALUE_OPTIONS, db
+from services.camera_service import CameraService
+
+
+with app.app_context():
+    inspector = inspect(db.engine)
+    columns = [col["name"] for col in inspector.get_columns("camera")]
+    existing_indexes = [idx["name"] for idx in inspector.get_indexes("camera")]
+
+    for field in MULTI_VALUE_OPTIONS:
+        column_name = f"{field}_mask"
+        if column_name not in columns:
+            db.session.execute(text(f"ALTER TABLE camera ADD COLUMN {column_name} INTEGER DEFAULT 0"))
+            print(f"✓ Added column {column_name}")
+
+        index_name = f"ix_camera_{column_name}"
+        if index_name not in existing_indexes:
+            db.session.execute(text(f"CREATE INDEX {index_name} ON camera ({column_name})"))
+            print(f"✓ Created index {index_name}")
+    db.session.commit()
+
+    updated = CameraService.backfill_option_masks()
+    print(f"✅ Converted {updated} cameras to bitmask columns")
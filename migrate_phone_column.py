@@ -0,0 +1,34 @@
+"""
+Migration script để thêm cột phone_norm (số điện thoại chỉ gồm chữ số, dạng
+trong nước) và backfill cho các camera đã có.
+
+Usage:
+    python migrate_phone_column.py
+"""
+from sqlalchemy import inspect, text
+
+from app import app
+from models import db
+from services.camera_service import CameraService
+
+
+with app.app_context():
+    inspector = inspect(db.engine)
+    columns = [col["name"] for col in inspector.get_columns("camera")]
+    existing_indexes = [idx["name"] for idx in inspector.get_indexes("camera")]
+
+    if "phone_norm" not in columns:
+        db.session.execute(text("ALTER TABLE camera ADD COLUMN phone_norm VARCHAR(20)"))
+        print("✓ Added column phone_norm")
+
+    if "ix_camera_phone_norm" not in existing_indexes:
+        # PostgreSQL cần text_pattern_ops để LIKE 'prefix%' dùng được index
+        opclass = " text_pattern_ops" if db.engine.dialect.name == "postgresql" else ""
+        db.session.execute(text(f"CREATE INDEX ix_camera_phone_norm ON camera (phone_norm{opclass})"))
+        print("✓ Created index ix_camera_phone_norm")
+    db.session.commit()
+
+    # phone_norm được điền cùng các cột tìm kiếm chuẩn hóa
+    updated = CameraService.backfill_search_columns()
+    print(f"✓ Backfilled {updated} cameras")
+    print("✅ Phone column updated")
@@ -0,0 +1,17 @@
+"""
+Migration script để tạo chỉ mục không gian R*Tree (SQLite) cho tọa độ camera.
+Bảng ảo camera_rtree + trigger đồng bộ với cột latitude/longitude.
+Chạy lại script bất cứ lúc nào để nạp lại (rebuild) index.
+
+Usage:
+    python migrate_rtree.py
+"""
+from app import app
+from services.spatial_index import ensure_spatial_index
+
+
+with app.app_context():
+    if ensure_spatial_index(rebuild=True):
+        print("✅ R*Tree index đã sẵn sàng")
+    else:
+        print("⚠️ Database hiện tại không dùng R*Tree, truy vấn không gian dùng index latitude/longitude")
@@ -0,0 +1,39 @@
+"""
+Migration script để tạo bảng saved search (saved_search, saved_search_result)
+và materialize lại tập kết quả của các saved search đã có.
+
+Usage:
+    python migrate_saved_searches.py
+"""
+from sqlalchemy import inspect, text
+
+from app import app
+from models import SavedSearch, db
+from services.saved_search_service import SavedSearchService
+
+
+with app.app_context():
+    db.create_all()
+    print("✓ Tables saved_search, saved_search_result ready")
+
+    # Bảng tạo từ phiên bản trước chưa có khóa ngoại camera_id -> camera.id.
+    # SQLite không thêm được constraint vào bảng có sẵn (listener vẫn gỡ camera đã xóa).
+    foreign_keys = inspect(db.engine).get_foreign_keys("saved_search_result")
+    if db.engine.dialect.name != "sqlite" and not any(
+        fk["referred_table"] == "camera" for fk in foreign_keys
+    ):
+        db.session.execute(text(
+            "DELETE FROM saved_search_result "
+            "WHERE camera_id NOT IN (SELECT id FROM camera)"
+        ))
+        db.session.execute(text(
+            "ALTER TABLE saved_search_result ADD CONSTRAINT fk_saved_search_result_camera "
+            "FOREIGN KEY (camera_id) REFERENCES camera (id) ON DELETE CASCADE"
+        ))
+        db.session.commit()
+        print("✓ Added foreign key saved_search_result.camera_id")
+
+    for saved in SavedSearch.query.all():
+        count = SavedSearchService.refresh(saved)
+        print(f"✓ {saved.name}: {count} cameras")
+    print("✅ Saved searches updated")
@@ -0,0 +1,44 @@
+"""
+Migration script để thêm các cột tìm kiếm chuẩn hóa (không dấu) cho camera
+và backfill dữ liệu cho các bản ghi đã có.
+
+Có thể chạy lại bất cứ lúc nào để backfill (ví dụ sau khi sửa dữ liệu trực tiếp trong DB).
+
+Usage:
+    python migrate_search_columns.py
+"""
+from sqlalchemy import inspect, text
+
+from app import app
+from models import SEARCH_NORMALIZED_FIELDS, Camera, db
+from services.camera_service import CameraService
+from services.fulltext_service import ensure_fulltext_index
+
+
+with app.app_context():
+    inspector = inspect(db.engine)
+    columns = [col["name"] for col in inspector.get_columns("camera")]
+    existing_indexes = [idx["name"] for idx in inspector.get_indexes("camera")]
+    is_postgres = db.engine.dialect.name == "postgresql"
+
+    for field in SEARCH_NORMALIZED_FIELDS:
+        column_name = f"{field}_norm"
+        length = getattr(Camera, column_name).type.length
+        if column_name not in columns:
+            db.session.execute(text(f"ALTER TABLE camera ADD COLUMN {column_name} VARCHAR({length})"))
+            print(f"✓ Added column {column_name}")
+
+        index_name = f"ix_camera_{column_name}"
+        if index_name not in existing_indexes:
+            # PostgreSQL cần text_pattern_ops để LIKE 'prefix%' dùng được index
+            opclass = " text_pattern_ops" if is_postgres else ""
+            db.session.execute(text(f"CREATE INDEX {index_name} ON camera ({column_name}{opclass})"))
+            print(f"✓ Created index {index_name}")
+    db.session.commit()
+
+    updated = CameraService.backfill_search_columns()
+    print(f"✓ Backfilled {updated} cameras")
+
+    # Full-text index được xây trên các cột chuẩn hóa -> tạo lại
+    ensure_fulltext_index(rebuild=True, recreate=True)
+    print("✅ Normalized search columns updated")
@@ -2,8 +2,50 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 import json
 
+from geohash_utils import encode as geohash_encode
+from ip_utils import ip_to_key
+from text_utils import fold_text, normalize_phone
+
 db = SQLAlchemy()
 
+# Các trường văn bản có cột "bóng" đã chuẩn hóa (<field>_norm) phục vụ tìm kiếm
+SEARCH_NORMALIZED_FIELDS = [
+    "owner_name",
+    "organization_name",
+    "address_street",
+    "ward",
+    "province",
+    "manufacturer",
+]
+
+# Danh mục giá trị của các trường nhiều lựa chọn (theo thứ tự cột trong file M2).
+# Vị trí trong list = số thứ tự bit trong cột <field>_mask, KHÔNG được đổi thứ tự
+# (chỉ thêm vào cuối) vì dữ liệu đã lưu phụ thuộc vào vị trí này.
+MULTI_VALUE_OPTIONS = {
+    "monitoring_modes": ["Xem qua Internet", "Xem cục bộ", "Ghi"],
+    "storage_types": ["Đầu ghi", "Thẻ nhớ", "Đám mây"],
+    "camera_types": ["Analog", "IP"],
+    "form_factors": ["Hộp ngoài", "Thân trụ", "Bán cầu"],
+    "network_types": ["Có dây", "Wifi", "Di động"],
+    "install_areas": ["Cổng và vỉa hè", "Ngoài đường"],
+}
+
+
+def options_to_mask(field_name, values):
+    """Chuyển list giá trị → bitmask; giá trị ngoài danh mục bị bỏ qua."""
+    options = MULTI_VALUE_OPTIONS.get(field_name, [])
+    mask = 0
+    for value in values or []:
+        if value in options:
+            mask |= 1 << options.index(value)
+    return mask
+
+
+def mask_to_options(field_name, mask):
+    """Chuyển bitmask → list giá trị theo thứ tự danh mục."""
+    options = MULTI_VALUE_OPTIONS.get(field_name, [])
+    return [option for bit, option in enumerate(options) if (mask or 0) & (1 << bit)]
+
 
 # =========================
 # USER MODEL (GIỮ NGUYÊN)
@@ -71,6 +113,8 @@ class Camera(db.Model):
     latlon = db.Column(db.String(50), index=True)  # "19.8,105.77" - Index cho tìm kiếm camera có tọa độ
     latitude = db.Column(db.Float, index=True)
     longitude = db.Column(db.Float, index=True)
+    # Geohash (GEOHASH_PRECISION ký tự) của latitude/longitude, được set_latlon_components() điền
+    geohash = db.Column(db.String(12), index=True)
 
     # ===== NHÓM E – TÀI KHOẢN / KẾT NỐI =====
     login_user = db.Column(db.String(100))
@@ -89,13 +133,37 @@ class Camera(db.Model):
     category = db.Column(db.String(50))
     sharing_scope = db.Column(db.Boolean, default=False)
 
+    # ===== NHÓM G – BITMASK CHO CÁC TRƯỜNG NHIỀU LỰA CHỌN =====
+    # Bit i = MULTI_VALUE_OPTIONS[field][i]; được set_json() cập nhật cùng cột JSON
+    monitoring_modes_mask = db.Column(db.Integer, default=0, index=True)
+    storage_types_mask = db.Column(db.Integer, default=0, index=True)
+    camera_types_mask = db.Column(db.Integer, default=0, index=True)
+    form_factors_mask = db.Column(db.Integer, default=0, index=True)
+    network_types_mask = db.Column(db.Integer, default=0, index=True)
+    install_areas_mask = db.Column(db.Integer, default=0, index=True)
+
+    # ===== NHÓM H – CỘT TÌM KIẾM (CHUẨN HÓA, KHÔNG DẤU) =====
+    # Được điền bởi set_search_components(), không nhập trực tiếp
+    owner_name_norm = db.Column(db.String(255), index=True)
+    organization_name_norm = db.Column(db.String(255), index=True)
+    address_street_norm = db.Column(db.String(255), index=True)
+    ward_norm = db.Column(db.String(100), index=True)
+    province_norm = db.Column(db.String(100), index=True)
+    manufacturer_norm = db.Column(db.String(100), index=True)
+    # static_ip dạng số 128 bit (hex cố định, xem ip_utils) cho tìm theo dải CIDR
+    static_ip_num = db.Column(db.String(32), index=True)
+    # Số điện thoại chỉ gồm chữ số, dạng trong nước (xem text_utils.normalize_phone)
+    phone_norm = db.Column(db.String(20), index=True)
+
     # =========================
     # HELPER METHODS
     # =========================
 
     def set_json(self, field_name, value):
-        """Lưu list → JSON string"""
+        """Lưu list → JSON string (và bitmask tương ứng nếu có)"""
         setattr(self, field_name, json.dumps(value, ensure_ascii=False))
+        if field_name in MULTI_VALUE_OPTIONS:
+            setattr(self, f"{field_name}_mask", options_to_mask(field_name, value))
 
     def get_json(self, field_name):
         """Đọc JSON string → list"""
@@ -108,16 +176,32 @@ class Camera(db.Model):
             return []
 
     def set_latlon_components(self):
-        """Parse latlon string and store latitude/longitude if available."""
-        if not self.latlon:
-            return
-        try:
-            lat_str, lon_str = self.latlon.split(",", 1)
-            self.latitude = float(lat_str.strip())
-            self.longitude = float(lon_str.strip())
-        except Exception:
-            self.latitude = None
-            self.longitude = None
+        """Parse latlon string and store latitude/longitude (and geohash) if available."""
+        if self.latlon:
+            try:
+                lat_str, lon_str = self.latlon.split(",", 1)
+                self.latitude = float(lat_str.strip())
+                self.longitude = float(lon_str.strip())
+            except Exception:
+                self.latitude = None
+                self.longitude = None
+        self.set_geohash()
+
+    def set_geohash(self):
+        """Tính cột geohash từ latitude/longitude (None nếu thiếu tọa độ)."""
+        self.geohash = geohash_encode(self.latitude, self.longitude)
+
+    def set_option_masks(self):
+        """Tính lại các cột bitmask từ JSON (dùng khi JSON được gán trực tiếp)."""
+        for field_name in MULTI_VALUE_OPTIONS:
+            setattr(self, f"{field_name}_mask", options_to_mask(field_name, self.get_json(field_name)))
+
+    def set_search_components(self):
+        """Fill normalized (lowercase, accent-free) search columns from the source fields."""
+        for field in SEARCH_NORMALIZED_FIELDS:
+            setattr(self, f"{field}_norm", fold_text(getattr(self, field)))
+        self.static_ip_num = ip_to_key(self.static_ip)
+        self.phone_norm = normalize_phone(self.phone)
 
 
 # =========================
@@ -151,3 +235,70 @@ class AuditLog(db.Model):
     timestamp = db.Column(db.DateTime, nullable=False, default=db.func.now())
     
     user = db.relationship('User', backref='audit_logs')
+
+
+# =========================
+# SAVED SEARCH MODELS
+# =========================
+
+class SavedSearch(db.Model):
+    """Bộ lọc tìm kiếm camera được lưu theo người dùng"""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    name = db.Column(db.String(255), nullable=False)
+    filters = db.Column(db.Text, nullable=False)  # JSON dict bộ lọc như trang tìm kiếm
+    result_count = db.Column(db.Integer, default=0)  # Số camera trong tập kết quả đã materialize
+    refreshed_at = db.Column(db.DateTime)  # Lần tính lại toàn bộ gần nhất
+    created_at = db.Column(db.DateTime, nullable=False, default=db.func.now())
+
+    user = db.relationship('User', backref='saved_searches')
+
+    def get_filters(self):
+        try:
+            return json.loads(self.filters or "{}")
+        except ValueError:
+            return {}
+
+
+class SavedSearchResult(db.Model):
+    """Tập id camera khớp một saved search, được cập nhật tăng dần khi ghi camera"""
+    saved_search_id = db.Column(
+        db.Integer, db.ForeignKey('saved_search.id', ondelete='CASCADE'), primary_key=True
+    )
+    camera_id = db.Column(
+        db.Integer, db.ForeignKey('camera.id', ondelete='CASCADE'), primary_key=True, index=True
+    )
+
+
+# =========================
+# GEOFENCE MODELS
+# =========================
+
+class Geofence(db.Model):
+    """Vùng (đa giác GeoJSON) do người vận hành vẽ, ví dụ chợ, khu trường học"""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(255), nullable=False)
+    geometry = db.Column(db.Text, nullable=False)  # GeoJSON Polygon / MultiPolygon
+    # Khung bao để lọc nhanh camera thay đổi trước khi kiểm tra điểm trong đa giác
+    min_lat = db.Column(db.Float, nullable=False)
+    max_lat = db.Column(db.Float, nullable=False)
+    min_lon = db.Column(db.Float, nullable=False)
+    max_lon = db.Column(db.Float, nullable=False)
+    camera_count = db.Column(db.Integer, default=0)  # Số camera trong tập đã materialize
+    refreshed_at = db.Column(db.DateTime)  # Lần tính lại toàn bộ gần nhất
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=db.func.now())
+
+    def get_geometry(self):
+        try:
+            return json.loads(self.geometry or "{}")
+        except ValueError:
+            return {}
+
+
+class GeofenceCamera(db.Model):
+    """Tập id camera nằm trong một geofence, được cập nhật tăng dần khi ghi camera"""
+    geofence_id = db.Column(
+        db.Integer, db.ForeignKey('geofence.id', ondelete='CASCADE'), primary_key=True
+    )
+    camera_id = db.Column(db.Integer, primary_key=True, index=True)
@@ -0,0 +1,37 @@
+"""
+Cache kết quả kiểm tra catalog ("index / cột đã được tạo chưa") theo engine URL.
+
+Kết quả True được giữ cho tới khi ``invalidate``; kết quả False chỉ giữ
+``NEGATIVE_TTL`` giây, để worker đang chạy nhận ra index được tạo sau khi khởi
+động (chạy ``migrate_*.py`` trong lúc ứng dụng đang phục vụ) mà không phải
+khởi động lại, trong khi vẫn không hỏi catalog ở mọi request. Trạng thái
+có thể mất đi do ghi ngoài ứng dụng (ví dụ dữ liệu chưa backfill) thì đặt
+thêm ``positive_ttl``.
+"""
+import time
+
+NEGATIVE_TTL = 60  # giây
+
+
+class AvailabilityCache:
+    def __init__(self, negative_ttl=NEGATIVE_TTL, positive_ttl=None):
+        self.negative_ttl = negative_ttl
+        self.positive_ttl = positive_ttl
+        self._entries = {}
+
+    def get(self, engine, check):
+        """Kết quả ``check(engine)`` (bool), dùng lại giá trị đã cache nếu còn hiệu lực."""
+        key = str(engine.url)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None:
+            available, checked_at = entry
+            ttl = self.positive_ttl if available else self.negative_ttl
+            if ttl is None or now - checked_at < ttl:
+                return available
+        available = bool(check(engine))
+        self._entries[key] = (available, now)
+        return available
+
+    def invalidate(self, engine):
+        self._entries.pop(str(engine.url), None)
@@ -0,0 +1,174 @@
+"""
+Cache helpers dùng chung cho dữ liệu camera.
+
+- ``data version``: bộ đếm lưu trong backend Flask-Caching (SimpleCache hoặc
+  Redis dùng chung giữa các worker). Mọi thao tác ghi camera gọi
+  ``bump_data_version()``; các cache phụ thuộc dữ liệu camera đưa version vào
+  cache key nên tự động hết hiệu lực mà không cần xóa từng key.
+- ``data_version_tag``: version kèm định danh process khi backend là
+  SimpleCache (mỗi worker một bộ đếm riêng), dùng cho ETag gửi ra client.
+- ``filter_signature``: hash ổn định của bộ lọc tìm kiếm (không phụ thuộc
+  thứ tự key/giá trị) để làm cache key.
+"""
+import hashlib
+import json
+import os
+import time
+import uuid
+
+from cachelib.base import BaseCache
+from cachelib.simple import SimpleCache
+from flask import current_app
+
+DATA_VERSION_KEY = "camera_data_version"
+DEFAULT_COUNT_TIMEOUT = 300
+
+# (pid, token) của process hiện tại, tạo lại sau fork (xem _process_token)
+_process = None
+
+
+def get_cache():
+    """Lấy cache instance từ Flask extensions (None nếu chưa khởi tạo)."""
+    try:
+        cache = current_app.extensions.get("cache")
+        # Flask-Caching đăng ký extensions["cache"] dạng {Cache: backend}
+        if isinstance(cache, dict):
+            cache = next(iter(cache), None)
+        if cache and hasattr(cache, "get") and hasattr(cache, "set"):
+            return cache
+        return None
+    except (RuntimeError, AttributeError, KeyError):
+        return None
+
+
+def _initial_version():
+    # Khởi tạo theo thời gian (ms) thay vì 0: nếu key bị evict thì version mới
+    # luôn khác các version cũ, tránh dùng lại count cũ
+    return int(time.time() * 1000)
+
+
+def get_data_version():
+    """Version hiện tại của dữ liệu camera (0 nếu không có cache)."""
+    cache = get_cache()
+    if not cache:
+        return 0
+    try:
+        version = cache.get(DATA_VERSION_KEY)
+        if version is None:
+            version = _initial_version()
+            cache.add(DATA_VERSION_KEY, version, timeout=0)
+            version = cache.get(DATA_VERSION_KEY) or version
+        return version
+    except (AttributeError, TypeError):
+        return 0
+
+
+def _has_native_inc(backend):
+    inc = getattr(type(backend), "inc", None)
+    return inc is not None and inc is not BaseCache.inc
+
+
+def bump_data_version():
+    """Tăng data version sau mỗi lần ghi camera (create/update/delete/import)."""
+    cache = get_cache()
+    if not cache:
+        return None
+    try:
+        version = cache.get(DATA_VERSION_KEY)
+        if version is None:
+            version = _initial_version()
+            cache.set(DATA_VERSION_KEY, version, timeout=0)
+            return version
+        # inc() riêng của backend (Redis INCR) là atomic giữa các worker và giữ
+        # nguyên TTL; inc() mặc định của cachelib (SimpleCache...) lại set() với
+        # timeout mặc định nên key sẽ hết hạn -> tự ghi với timeout=0
+        backend = getattr(cache, "cache", None)
+        if backend is not None and _has_native_inc(backend):
+            return backend.inc(DATA_VERSION_KEY)
+        cache.set(DATA_VERSION_KEY, version + 1, timeout=0)
+        return version + 1
+    except (AttributeError, TypeError):
+        return None
+
+
+def _process_token():
+    global _process
+    pid = os.getpid()
+    if _process is None or _process[0] != pid:
+        _process = (pid, uuid.uuid4().hex[:8])
+    return _process[1]
+
+
+def is_shared_cache():
+    """Backend cache có dùng chung giữa các worker không (SimpleCache thì không)."""
+    cache = get_cache()
+    return cache is not None and not isinstance(getattr(cache, "cache", None), SimpleCache)
+
+
+def data_version_tag():
+    """
+    Data version dạng chuỗi so sánh được giữa các worker (cho ETag), None nếu
+    không có cache.
+
+    Với SimpleCache, hai worker có thể có cùng số version cho dữ liệu khác
+    nhau nên version được gắn thêm token của process đã cấp nó.
+    """
+    version = get_data_version()
+    if not version:
+        return None
+    if is_shared_cache():
+        return str(version)
+    return f"{_process_token()}.{version}"
+
+
+def filter_signature(filters):
+    """
+    Hash chuẩn hóa của dict bộ lọc: bỏ giá trị rỗng, sắp xếp key và list.
+
+    Example:
+        >>> filter_signature({"ward": "A", "camera_types": ["IP", "Analog"]}) == \\
+        ...     filter_signature({"camera_types": ["Analog", "IP"], "ward": "A", "phone": ""})
+        True
+    """
+    canonical = {}
+    for key, value in (filters or {}).items():
+        if value in (None, "", [], ()):
+            continue
+        if isinstance(value, (list, tuple, set)):
+            value = sorted(str(v) for v in value)
+        else:
+            value = str(value)
+        canonical[key] = value
+    payload = json.dumps(canonical, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def cached_by_filters(namespace, filters, compute):
+    """
+    Lấy kết quả từ cache theo (namespace, data version, filter signature),
+    nếu chưa có thì gọi ``compute()`` và lưu lại.
+    """
+    cache = get_cache()
+    if not cache:
+        return compute()
+
+    key = f"{namespace}:{get_data_version()}:{filter_signature(filters)}"
+    try:
+        cached = cache.get(key)
+    except (AttributeError, TypeError):
+        cached = None
+    if cached is not None:
+        return cached
+
+    value = compute()
+    try:
+        timeout = current_app.config.get("SEARCH_COUNT_CACHE_TIMEOUT", DEFAULT_COUNT_TIMEOUT)
+        cache.set(key, value, timeout=timeout)
+    except (AttributeError, TypeError):
+        pass
+    return value
+
+
+def cached_count(namespace, filters, compute):
+    """Kết quả đếm của tìm kiếm, cache như ``cached_by_filters``."""
+    return cached_by_filters(f"count:{namespace}", filters, compute)
@@ -0,0 +1,56 @@
+"""
+Sự kiện ghi dữ liệu camera.
+
+Mọi đường ghi camera (CameraService, process_import, auto-fix...) gọi
+``publish()`` sau khi commit. ``publish`` tăng data version (xem
+``services.cache_service``) rồi báo cho các listener đã đăng ký - ví dụ index
+trong bộ nhớ - để chúng cập nhật tăng dần thay vì nạp lại toàn bộ từ DB.
+
+Mỗi thay đổi là một ``CameraChange(action, camera_id, old, new)`` với
+``old``/``new`` là snapshot (dict cột -> giá trị) trước/sau khi ghi;
+``old`` là None khi tạo mới, ``new`` là None khi xóa.
+"""
+from collections import namedtuple
+
+from flask import current_app
+
+from models import Camera
+from services.cache_service import bump_data_version
+
+CameraChange = namedtuple("CameraChange", ["action", "camera_id", "old", "new"])
+
+_listeners = []
+
+
+def register_listener(listener):
+    """Đăng ký ``listener(changes, data_version)`` nhận các thay đổi camera."""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def unregister_listener(listener):
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def snapshot(camera):
+    """Chụp giá trị các cột của camera thành dict (gọi trước commit để tránh reload)."""
+    return {column.key: getattr(camera, column.key) for column in Camera.__table__.columns}
+
+
+def publish(changes):
+    """
+    Tăng data version và báo các thay đổi cho listener.
+
+    Lỗi trong listener chỉ được log, không làm hỏng thao tác ghi đã commit.
+    """
+    changes = list(changes)
+    version = bump_data_version()
+    if not changes:
+        return version
+    for listener in list(_listeners):
+        try:
+            listener(changes, version)
+        except Exception as exc:  # noqa: BLE001
+            current_app.logger.error(f"Camera change listener failed: {exc}", exc_info=True)
+    return version
@@ -0,0 +1,576 @@
+"""
+Index dạng cột trong bộ nhớ cho bảng camera (bật bằng CAMERA_INDEX_ENABLED).
+
+Mỗi thuộc tính camera được lưu thành một mảng NumPy sắp theo id:
+tọa độ (float, NaN nếu thiếu), cờ bool, bitmask các trường nhiều lựa chọn và
+các chuỗi ít giá trị (system_type, ward, province, manufacturer) được mã hóa
+từ điển thành mã số nguyên. Tìm kiếm, dashboard và bản đồ lọc/đếm bằng phép
+toán vector trên các mảng này thay vì round-trip SQL; chuỗi tự do được tìm
+trên cả cột một lần (xem ``_TextColumn``).
+
+Vòng đời:
+- ``init_camera_index(app)`` dựng index lúc khởi động và đăng ký listener
+  với ``services.camera_events`` để cập nhật tăng dần sau mỗi lần ghi.
+- ``get_camera_index()`` chỉ trả về index khi nó khớp data version; định kỳ
+  (CAMERA_INDEX_CHECK_INTERVAL giây) so checksum tổng với DB và so từng giá
+  trị của một đoạn CAMERA_INDEX_CHECK_ROWS dòng (lần sau so đoạn kế tiếp,
+  hết bảng thì quay lại đầu), lệch thì dựng lại trên luồng dựng index riêng. Trong lúc
+  đó caller quay về truy vấn SQL.
+
+Index chỉ trả lời các bộ lọc nó biểu diễn được; ``search_ids`` trả về None
+với các trường khác (phone, latlon, static_ip...) để CameraService dùng SQL.
+"""
+import re
+import threading
+import time
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+
+from background_jobs import start_index_rebuild
+from models import MULTI_VALUE_OPTIONS, Camera, db, options_to_mask
+from services import camera_events
+from services.cache_service import get_data_version
+from services.fulltext_service import FTS_FIELDS, fulltext_available, tokenize_query
+from text_utils import fold_text
+
+# Chuỗi ít giá trị phân biệt -> mã hóa từ điển
+DICTIONARY_FIELDS = ["system_type", "ward", "province", "manufacturer"]
+# Chuỗi tự do: lưu dạng đã chuẩn hóa để lọc, dạng gốc để hiển thị
+FOLDED_TEXT_FIELDS = ["owner_name", "organization_name", "address_street"]
+RAW_TEXT_FIELDS = ["owner_name", "organization_name", "address_street", "phone"]
+MASK_FIELDS = list(MULTI_VALUE_OPTIONS)
+
+# Trường tìm kiếm văn bản index trả lời được (xem CameraService.build_search_query)
+SEARCHABLE_TEXT_FIELDS = DICTIONARY_FIELDS[1:] + FOLDED_TEXT_FIELDS
+UNSUPPORTED_FILTERS = ["phone", "latlon", "static_ip", "ip_range"]
+
+DEFAULT_CHECK_INTERVAL = 60
+DEFAULT_CHECK_ROWS = 5000
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+_LOADED_COLUMNS = (
+    ["id", "latitude", "longitude", "latlon", "sharing_scope", "static_ip"]
+    + DICTIONARY_FIELDS
+    + RAW_TEXT_FIELDS
+    + [f"{field}_norm" for field in FOLDED_TEXT_FIELDS]
+    + [f"{field}_mask" for field in MASK_FIELDS]
+)
+
+
+def _parse_latlon(latlon):
+    try:
+        lat, lon = latlon.split(",")
+        return float(lat.strip()), float(lon.strip())
+    except (AttributeError, ValueError):
+        return None, None
+
+
+class _TextColumn:
+    """
+    Các chuỗi của một cột nối thành một chuỗi duy nhất, ngăn bởi "\\x00".
+
+    Tìm chuỗi con trên cả cột bằng một lần quét regex literal (chạy trong C)
+    rồi đổi vị trí khớp -> số dòng bằng ``np.searchsorted``: chi phí theo số
+    lần khớp chứ không theo số dòng, không có vòng lặp Python trên từng dòng.
+    """
+
+    def __init__(self, texts):
+        lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+        # Dòng i bắt đầu tại starts[i] (sau dấu ngăn đứng trước nó)
+        self.starts = np.cumsum(lengths + 1) - lengths
+        self.text = "\x00" + "\x00".join(texts)
+
+    def _mask(self, literal, shift=0):
+        pattern = re.compile(re.escape(literal))
+        positions = np.fromiter((match.start() for match in pattern.finditer(self.text)), dtype=np.int64)
+        mask = np.zeros(len(self.starts), dtype=bool)
+        mask[np.searchsorted(self.starts, positions + shift, side="right") - 1] = True
+        return mask
+
+    def contains(self, literal):
+        return self._mask(literal)
+
+    def startswith(self, literal):
+        return self._mask("\x00" + literal, shift=1)
+
+
+class _TextSearch:
+    """Cột chuỗi đã chuẩn hóa và cột "từ" tương ứng (dựng khi cần) để so khớp."""
+
+    def __init__(self, texts):
+        self._texts = texts
+        self.folded = _TextColumn(texts)
+        self._words = None
+
+    @property
+    def words(self):
+        """Mỗi dòng dạng " từ1 từ2 ...": token là tiền tố của một từ <=> chứa " " + token."""
+        if self._words is None:
+            self._words = _TextColumn([" " + " ".join(_TOKEN_RE.findall(text)) for text in self._texts])
+        return self._words
+
+
+class _Dictionary:
+    """Mã hóa chuỗi -> số nguyên (chỉ thêm, nên mã cũ luôn còn hiệu lực)."""
+
+    def __init__(self):
+        self.values = []
+        self.folded = []
+        self._codes = {}
+
+    def encode(self, value):
+        if value is None or value == "":
+            return -1
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+            self.folded.append(fold_text(value) or "")
+        return code
+
+    def decode(self, code):
+        return self.values[code] if code >= 0 else None
+
+    def matching_codes(self, matcher):
+        return np.flatnonzero(matcher(_TextSearch(list(self.folded)))).astype(np.int32)
+
+    def decoded(self, codes):
+        """Mảng object giá trị gốc theo mã (mã -1 -> None)."""
+        return np.array(self.values + [None], dtype=object)[codes]
+
+
+class _Snapshot:
+    """Tập mảng bất biến; cập nhật tạo snapshot mới rồi hoán đổi tham chiếu."""
+
+    def __init__(self, arrays, dictionaries):
+        self.arrays = arrays
+        self.dictionaries = dictionaries
+        self._text_search = {}
+
+    def __len__(self):
+        return len(self.arrays["id"])
+
+    @classmethod
+    def from_rows(cls, rows, dictionaries=None):
+        """Dựng từ các mapping cột -> giá trị (kết quả query hoặc camera_events.snapshot)."""
+        if dictionaries is None:
+            dictionaries = {field: _Dictionary() for field in DICTIONARY_FIELDS}
+        columns = {name: [] for name in cls.array_names()}
+        for row in rows:
+            lat, lon = row.get("latitude"), row.get("longitude")
+            if lat is None or lon is None:
+                lat, lon = _parse_latlon(row.get("latlon"))
+            columns["id"].append(row["id"])
+            columns["lat"].append(np.nan if lat is None else lat)
+            columns["lon"].append(np.nan if lon is None else lon)
+            columns["has_latlon"].append(bool(row.get("latlon")))
+            columns["sharing"].append(bool(row.get("sharing_scope")))
+            columns["has_static_ip"].append(bool(row.get("static_ip")))
+            for field in DICTIONARY_FIELDS:
+                columns[f"{field}_code"].append(dictionaries[field].encode(row.get(field)))
+            for field in RAW_TEXT_FIELDS:
+                columns[field].append(row.get(field))
+            for field in FOLDED_TEXT_FIELDS:
+                columns[f"{field}_norm"].append(row.get(f"{field}_norm") or "")
+            for field in MASK_FIELDS:
+                columns[f"{field}_mask"].append(row.get(f"{field}_mask") or 0)
+
+        arrays = {}
+        for name, values in columns.items():
+            dtype = cls.array_dtype(name)
+            if dtype is object:
+                array = np.empty(len(values), dtype=object)
+                array[:] = values
+            else:
+                array = np.array(values, dtype=dtype)
+            arrays[name] = array
+        return cls(arrays, dictionaries)
+
+    @staticmethod
+    def array_names():
+        return (
+            ["id", "lat", "lon", "has_latlon", "sharing", "has_static_ip"]
+            + [f"{field}_code" for field in DICTIONARY_FIELDS]
+            + RAW_TEXT_FIELDS
+            + [f"{field}_norm" for field in FOLDED_TEXT_FIELDS]
+            + [f"{field}_mask" for field in MASK_FIELDS]
+        )
+
+    @staticmethod
+    def array_dtype(name):
+        if name == "id":
+            return np.int64
+        if name in ("lat", "lon"):
+            return np.float64
+        if name in ("has_latlon", "sharing", "has_static_ip"):
+            return bool
+        if name.endswith("_code"):
+            return np.int32
+        if name.endswith("_mask"):
+            return np.int64
+        return object
+
+    def text_search(self, field):
+        """_TextSearch của cột ``<field>_norm``, dựng lần đầu khi cần (snapshot bất biến)."""
+        search = self._text_search.get(field)
+        if search is None:
+            search = _TextSearch(list(self.arrays[f"{field}_norm"]))
+            self._text_search[field] = search
+        return search
+
+    def values(self, name, positions=slice(None)):
+        """Giá trị so sánh được của mảng ``name`` (mã từ điển được giải mã)."""
+        array = self.arrays[name][positions]
+        if name.endswith("_code"):
+            return self.dictionaries[name[:-len("_code")]].decoded(array)
+        return array
+
+    def with_changes(self, changes):
+        """Snapshot mới sau khi áp dụng danh sách CameraChange (upsert/xóa theo id)."""
+        upserts = {}
+        for change in changes:
+            upserts[change.camera_id] = change.new
+        touched = np.fromiter(upserts, dtype=np.int64, count=len(upserts))
+        keep = ~np.isin(self.arrays["id"], touched)
+        added = _Snapshot.from_rows(
+            [row for row in upserts.values() if row is not None], self.dictionaries
+        )
+        merged = {
+            name: np.concatenate([array[keep], added.arrays[name]])
+            for name, array in self.arrays.items()
+        }
+        order = np.argsort(merged["id"], kind="stable")
+        return _Snapshot({name: array[order] for name, array in merged.items()}, self.dictionaries)
+
+
+class CameraIndex:
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._rebuilding = False
+        self.version = None
+        self.checked_at = 0.0
+        # id bắt đầu đoạn dòng sẽ so ở lần kiểm tra kế tiếp (xem check_consistency)
+        self._check_from = 0
+
+    @property
+    def ready(self):
+        return self._snapshot is not None
+
+    # ----- Dựng / cập nhật -----
+
+    def rebuild(self):
+        """Nạp lại toàn bộ từ DB (một query, chỉ các cột cần thiết)."""
+        # Đọc version trước khi nạp: ghi xen giữa sẽ làm index "cũ" và được dựng lại
+        version = get_data_version()
+        columns = [getattr(Camera, name) for name in _LOADED_COLUMNS]
+        rows = db.session.query(*columns).order_by(Camera.id).all()
+        snapshot = _Snapshot.from_rows(row._mapping for row in rows)
+        with self._lock:
+            self._snapshot = snapshot
+            self.version = version
+            self.checked_at = time.monotonic()
+        return len(snapshot)
+
+    def apply_changes(self, changes, data_version):
+        """Listener của camera_events: cập nhật tăng dần theo các thay đổi đã commit."""
+        with self._lock:
+            if self._snapshot is None:
+                return
+            # Bỏ lỡ thay đổi (ví dụ worker khác ghi) -> vẫn áp dụng nhưng để dựng lại
+            missed = (
+                self.version is not None
+                and data_version is not None
+                and data_version != self.version + 1
+            )
+            self._snapshot = self._snapshot.with_changes(changes)
+            if data_version is not None:
+                self.version = data_version
+        if missed:
+            self.schedule_rebuild(current_app._get_current_object())
+
+    def schedule_rebuild(self, app):
+        """Dựng lại index trên luồng dựng index riêng (bỏ qua nếu đang dựng)."""
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+
+        def _run():
+            try:
+                with app.app_context():
+                    self.rebuild()
+            except Exception as exc:  # noqa: BLE001
+                app.logger.error(f"Camera index rebuild failed: {exc}", exc_info=True)
+            finally:
+                with self._lock:
+                    self._rebuilding = False
+
+        start_index_rebuild(_run)
+
+    def is_stale(self, data_version):
+        # data_version = 0 nghĩa là không có cache -> không so được, dựa vào check định kỳ
+        return bool(data_version) and self.version is not None and data_version != self.version
+
+    def check_consistency(self, max_rows=DEFAULT_CHECK_ROWS):
+        """
+        So index với DB: checksum tổng (số dòng, max/sum id, tổng bitmask) rồi
+        so từng giá trị các cột đã index của ``max_rows`` dòng kế tiếp.
+
+        Checksum tổng bắt được thêm/xóa; so từng dòng bắt được sửa văn bản,
+        tọa độ, ward, system_type... Các lần gọi liên tiếp quét lần lượt hết bảng.
+
+        Returns:
+            True nếu khớp
+        """
+        aggregates = [
+            func.count(Camera.id),
+            func.coalesce(func.max(Camera.id), 0),
+            func.coalesce(func.sum(Camera.id), 0),
+        ] + [func.coalesce(func.sum(getattr(Camera, f"{field}_mask")), 0) for field in MASK_FIELDS]
+        expected = tuple(int(value) for value in db.session.query(*aggregates).one())
+
+        arrays = self._snapshot.arrays
+        ids = arrays["id"]
+        actual = (
+            len(ids),
+            int(ids.max()) if len(ids) else 0,
+            int(ids.sum()),
+        ) + tuple(int(arrays[f"{field}_mask"].sum()) for field in MASK_FIELDS)
+        self.checked_at = time.monotonic()
+        return actual == expected and self._check_rows(max_rows)
+
+    def _check_rows(self, max_rows):
+        """So toàn bộ giá trị của đoạn ``max_rows`` dòng bắt đầu từ id ``_check_from``."""
+        start = self._check_from
+        columns = [getattr(Camera, name) for name in _LOADED_COLUMNS]
+        rows = (
+            db.session.query(*columns)
+            .filter(Camera.id >= start)
+            .order_by(Camera.id)
+            .limit(max_rows)
+            .all()
+        )
+        expected = _Snapshot.from_rows(row._mapping for row in rows)
+        last_chunk = len(rows) < max_rows
+        self._check_from = 0 if last_chunk else rows[-1].id + 1
+
+        snapshot = self._snapshot
+        ids = snapshot.arrays["id"]
+        low = int(np.searchsorted(ids, start, side="left"))
+        high = len(ids) if last_chunk else int(np.searchsorted(ids, rows[-1].id, side="right"))
+        if high - low != len(expected):
+            return False
+        positions = slice(low, high)
+        return all(
+            np.array_equal(
+                snapshot.values(name, positions),
+                expected.values(name),
+                equal_nan=_Snapshot.array_dtype(name) is np.float64,
+            )
+            for name in _Snapshot.array_names()
+        )
+
+    # ----- Truy vấn -----
+
+    def __len__(self):
+        return len(self._snapshot)
+
+    def search_ids(self, filters):
+        """
+        Lọc theo bộ lọc tìm kiếm camera (cùng ngữ nghĩa CameraService.build_search_query).
+
+        Returns:
+            mảng id tăng dần, hoặc None nếu bộ lọc có trường index không hỗ trợ
+        """
+        selected = self.search_mask(filters)
+        if selected is None:
+            return None
+        return self._snapshot.arrays["id"][selected]
+
+    def search_mask(self, filters):
+        """Như ``search_ids`` nhưng trả về mảng bool theo vị trí trong snapshot."""
+        if any(filters.get(field) for field in UNSUPPORTED_FILTERS):
+            return None
+        snapshot = self._snapshot
+        arrays = snapshot.arrays
+        selected = np.ones(len(snapshot), dtype=bool)
+
+        for field in SEARCHABLE_TEXT_FIELDS:
+            value = filters.get(field)
+            if not value:
+                continue
+            matcher = _text_matcher(field, value, filters.get("match"))
+            if matcher is None:
+                return None
+            if field in snapshot.dictionaries:
+                codes = snapshot.dictionaries[field].matching_codes(matcher)
+                selected &= np.isin(arrays[f"{field}_code"], codes)
+            else:
+                selected &= matcher(snapshot.text_search(field))
+
+        for field in MASK_FIELDS:
+            values = filters.get(field) or []
+            if not values:
+                continue
+            if any(value not in MULTI_VALUE_OPTIONS[field] for value in values):
+                return None
+            bits = options_to_mask(field, values)
+            selected &= (arrays[f"{field}_mask"] & bits) == bits
+
+        return selected
+
+    def value_counts(self, field, missing_label=None, selected=None):
+        """
+        Đếm theo giá trị của trường mã hóa từ điển.
+
+        Args:
+            missing_label: nếu có, camera thiếu giá trị được đếm dưới nhãn này
+            selected: mảng bool (từ search_mask) để chỉ đếm các camera đã lọc
+
+        Returns:
+            dict {value: count} (chỉ các giá trị có count > 0)
+        """
+        snapshot = self._snapshot
+        codes = snapshot.arrays[f"{field}_code"]
+        if selected is not None:
+            codes = codes[selected]
+        dictionary = snapshot.dictionaries[field]
+        counts = np.bincount(codes[codes >= 0], minlength=len(dictionary.values))
+        result = {
+            dictionary.values[code]: int(count)
+            for code, count in enumerate(counts)
+            if count
+        }
+        missing = int((codes < 0).sum())
+        if missing_label is not None and missing:
+            result[missing_label] = result.get(missing_label, 0) + missing
+        return result
+
+    def option_counts(self, field_names, selected=None):
+        """Giống CameraService.get_option_counts nhưng đếm trên mảng bitmask."""
+        arrays = self._snapshot.arrays
+        result = {}
+        for field in field_names:
+            masks = arrays[f"{field}_mask"]
+            if selected is not None:
+                masks = masks[selected]
+            counts = {}
+            for bit, option in enumerate(MULTI_VALUE_OPTIONS[field]):
+                count = int(((masks >> bit) & 1).sum())
+                if count:
+                    counts[option] = count
+            result[field] = counts
+        return result
+
+    def facet_counts(self, selected, fields, option_fields):
+        """Số đếm theo facet trên tập camera đã lọc (xem CameraService.get_facet_counts)."""
+        facets = {
+            field: self.value_counts(
+                field,
+                missing_label="Chưa phân loại" if field == "system_type" else None,
+                selected=selected,
+            )
+            for field in fields
+        }
+        facets.update(self.option_counts(option_fields, selected=selected))
+        return {"total": int(selected.sum()), "facets": facets}
+
+    def summary(self):
+        """Các số đếm tổng quát cho dashboard."""
+        arrays = self._snapshot.arrays
+        return {
+            "total": len(arrays["id"]),
+            "with_latlon": int(arrays["has_latlon"].sum()),
+            "with_sharing": int(arrays["sharing"].sum()),
+            "with_static_ip": int(arrays["has_static_ip"].sum()),
+        }
+
+    def map_points(self):
+        """Các camera có tọa độ, dạng dict cho trang bản đồ (theo id tăng dần)."""
+        snapshot = self._snapshot
+        arrays = snapshot.arrays
+        located = np.flatnonzero(~np.isnan(arrays["lat"]) & ~np.isnan(arrays["lon"]))
+        dictionaries = snapshot.dictionaries
+        points = []
+        for i in located:
+            points.append({
+                "id": int(arrays["id"][i]),
+                "lat": float(arrays["lat"][i]),
+                "lon": float(arrays["lon"][i]),
+                "system_type": dictionaries["system_type"].decode(arrays["system_type_code"][i]),
+                "owner": arrays["owner_name"][i],
+                "org": arrays["organization_name"][i],
+                "address": arrays["address_street"][i],
+                "ward": dictionaries["ward"].decode(arrays["ward_code"][i]),
+                "province": dictionaries["province"].decode(arrays["province_code"][i]),
+                "phone": arrays["phone"][i],
+                "manufacturer": dictionaries["manufacturer"].decode(arrays["manufacturer_code"][i]),
+            })
+        return points
+
+
+def _text_matcher(field, value, match):
+    """
+    Hàm ``matcher(_TextSearch) -> mảng bool`` so khớp trên chuỗi đã chuẩn hóa,
+    cùng ngữ nghĩa với SQL: prefix (match=prefix), token prefix (full-text)
+    hoặc chứa chuỗi (LIKE).
+    """
+    folded = fold_text(value)
+    if not folded:
+        return None
+    if match == "prefix":
+        return lambda search: search.folded.startswith(folded)
+    tokens = tokenize_query(value)
+    if field in FTS_FIELDS and tokens and fulltext_available():
+        def _matches_tokens(search):
+            matched = search.words.contains(" " + tokens[0])
+            for token in tokens[1:]:
+                matched &= search.words.contains(" " + token)
+            return matched
+        return _matches_tokens
+    return lambda search: search.folded.contains(folded)
+
+
+def init_camera_index(app):
+    """Tạo index, đăng ký listener ghi camera và dựng lần đầu."""
+    index = CameraIndex()
+    app.extensions["camera_index"] = index
+    camera_events.register_listener(index.apply_changes)
+    with app.app_context():
+        try:
+            count = index.rebuild()
+            app.logger.info(f"Camera index built: {count} cameras")
+        except SQLAlchemyError as exc:
+            # Bảng chưa tồn tại (lần chạy đầu) -> dựng lại khi có request
+            db.session.rollback()
+            app.logger.warning(f"Camera index not built: {exc}")
+    return index
+
+
+def get_camera_index():
+    """
+    Index sẵn sàng và khớp dữ liệu, hoặc None (tắt / đang dựng / lệch với DB).
+    """
+    app = current_app
+    if not app.config.get("CAMERA_INDEX_ENABLED"):
+        return None
+    index = app.extensions.get("camera_index")
+    if index is None:
+        return None
+    if not index.ready or index.is_stale(get_data_version()):
+        index.schedule_rebuild(app._get_current_object())
+        return None
+
+    interval = app.config.get("CAMERA_INDEX_CHECK_INTERVAL", DEFAULT_CHECK_INTERVAL)
+    check_rows = app.config.get("CAMERA_INDEX_CHECK_ROWS", DEFAULT_CHECK_ROWS)
+    if time.monotonic() - index.checked_at > interval and not index.check_consistency(check_rows):
+        app.logger.warning("Camera index drifted from database, rebuilding")
+        index.schedule_rebuild(app._get_current_object())
+        return None
+    return index
@@ -1,47 +1,283 @@
-from sqlalchemy import func
+import json
+from itertools import permutations
 
-from models import Camera, db
+from sqlalchemy import and_, bindparam, case, func
+
+from models import MULTI_VALUE_OPTIONS, SEARCH_NORMALIZED_FIELDS, Camera, db, options_to_mask
 from security_utils import log_audit
 from import_data import convert_latlon
+from ip_utils import parse_ip_range
+from services.fulltext_service import fulltext_criterion, fulltext_fields, fulltext_params
+from services import camera_events
+from services.cache_service import cached_by_filters, cached_count
+from services.camera_index import get_camera_index
+from services.projections import apply_projection
+from services.sql_stats import record_criteria_cache
+from services.pagination import (
+    COUNT_EXACT,
+    COUNT_NONE,
+    IdListPagination,
+    count_query,
+    keyset_paginate,
+    keyset_paginate_ids,
+)
+from text_utils import fold_text, normalize_phone
+
+
+# Điều kiện WHERE đã dựng theo (dialect, shape bộ lọc), xem _search_criteria
+CRITERIA_CACHE_SIZE = 512
+_criteria_cache = {}
+
+# Facet của trang kết quả tìm kiếm: trường một giá trị và trường nhiều lựa chọn
+FACET_FIELDS = ["system_type", "ward", "manufacturer"]
+FACET_OPTION_FIELDS = ["monitoring_modes", "storage_types"]
+
+
+def _search_plan(filters, dialect):
+    """
+    Tách bộ lọc tìm kiếm thành (shape, params).
+
+    ``shape`` là tuple các bước ``(kind, target)`` chỉ mô tả cấu trúc điều
+    kiện; giá trị nằm trong ``params`` theo tên bindparam ``s{i}`` (và
+    ``s{i}_hi`` cho cận trên). Cùng tổ hợp bộ lọc cho cùng shape, nên biểu
+    thức SQL được dùng lại và câu lệnh trúng compiled cache của SQLAlchemy.
+    """
+    steps = []
+    params = {}
+
+    def add(kind, target, value, high=None):
+        name = f"s{len(steps)}"
+        steps.append((kind, target))
+        params[name] = value
+        if high is not None:
+            params[f"{name}_hi"] = high
+
+    def add_prefix(column_name, prefix):
+        # "Bắt đầu bằng" dùng được B-tree index: PostgreSQL LIKE 'prefix%'
+        # (index text_pattern_ops), backend khác dùng khoảng [prefix, prefix + U+10FFFF)
+        if dialect == "postgresql":
+            escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            add("prefix_like", column_name, f"{escaped}%")
+        else:
+            add("prefix_range", column_name, prefix, prefix + "\U0010ffff")
+
+    text_fields = [
+        "owner_name",
+        "organization_name",
+        "address_street",
+        "ward",
+        "province",
+        "phone",
+        "manufacturer",
+        "latlon",
+        "static_ip",
+    ]
+    text_values = {field: filters.get(field) for field in text_fields if filters.get(field)}
+    handled_fields = set()
+
+    if filters.get("match") == "prefix":
+        # Tìm theo tiền tố trên cột chuẩn hóa -> index range scan
+        for field, value in text_values.items():
+            folded = fold_text(value)
+            if field in SEARCH_NORMALIZED_FIELDS and folded:
+                add_prefix(f"{field}_norm", folded)
+                handled_fields.add(field)
+    else:
+        # Ưu tiên full-text index (FTS5 / tsvector)
+        fields = fulltext_fields(text_values)
+        if fields:
+            name = f"s{len(steps)}"
+            steps.append(("fulltext", tuple(fields)))
+            params.update(fulltext_params({field: text_values[field] for field in fields}, name))
+            handled_fields.update(fields)
+
+    # Số điện thoại: nhập từ đầu số (0..., +84...) -> tiền tố trên cột chỉ gồm
+    # chữ số (index range scan); nhập một phần không có số 0 đầu ("912", vài số
+    # cuối) -> tìm chuỗi con như trước để "912" vẫn khớp "0912..."
+    phone_digits = normalize_phone(text_values.get("phone"))
+    if phone_digits:
+        if phone_digits.startswith("0"):
+            add_prefix("phone_norm", phone_digits)
+        else:
+            add("like", "phone_norm", f"%{phone_digits}%")
+        handled_fields.add("phone")
+
+    for field, value in text_values.items():
+        if field in handled_fields:
+            continue
+        folded = fold_text(value)
+        if field in SEARCH_NORMALIZED_FIELDS and folded:
+            # Không có full-text index: vẫn không phân biệt dấu nhờ cột chuẩn hóa
+            add("like", f"{field}_norm", f"%{folded}%")
+        else:
+            add("ilike", field, f"%{value}%")
+
+    # Dải IP (CIDR / khoảng) -> BETWEEN trên cột static_ip_num có index
+    if filters.get("ip_range"):
+        low, high = parse_ip_range(filters["ip_range"])
+        add("between", "static_ip_num", low, high)
+
+    for field in MULTI_VALUE_OPTIONS:
+        values = filters.get(field, [])
+        if values:
+            # Giá trị trong danh mục -> so khớp bitmask (phép toán số nguyên)
+            bits = options_to_mask(field, values)
+            if bits:
+                add("mask", f"{field}_mask", bits)
+            # Giá trị ngoài danh mục vẫn tìm trong JSON text như trước
+            for val in values:
+                if val not in MULTI_VALUE_OPTIONS[field]:
+                    add("ilike", field, f"%{val}%")
+
+    return tuple(steps), params
+
+
+def _build_criterion(position, kind, target):
+    name = f"s{position}"
+    if kind == "fulltext":
+        return fulltext_criterion(target, name)
+
+    column = getattr(Camera, target)
+    value = bindparam(name, type_=column.type)
+    if kind == "prefix_range":
+        return and_(column >= value, column < bindparam(f"{name}_hi", type_=column.type))
+    if kind == "prefix_like":
+        return column.like(value, escape="\\")
+    if kind == "like":
+        return column.like(value)
+    if kind == "ilike":
+        return column.ilike(value)
+    if kind == "between":
+        return column.between(value, bindparam(f"{name}_hi", type_=column.type))
+    if kind == "mask":
+        return column.op("&")(value) == value
+    raise ValueError(f"Unknown search step: {kind}")
+
+
+def _search_criteria(dialect, shape):
+    """Danh sách điều kiện WHERE cho shape, dựng một lần rồi lấy từ cache."""
+    key = (dialect, shape)
+    criteria = _criteria_cache.get(key)
+    if criteria is not None:
+        record_criteria_cache(hit=True)
+        return criteria
+
+    record_criteria_cache(hit=False)
+    criteria = [_build_criterion(i, kind, target) for i, (kind, target) in enumerate(shape)]
+    if len(_criteria_cache) >= CRITERIA_CACHE_SIZE:
+        _criteria_cache.clear()
+    _criteria_cache[key] = criteria
+    return criteria
+
+
+def _option_sum_columns(field_names):
+    """Các biểu thức SUM(CASE bit) đếm từng option, kèm khóa (field, option) tương ứng."""
+    columns = []
+    keys = []
+    for field in field_names:
+        mask_column = getattr(Camera, f"{field}_mask")
+        for bit, option in enumerate(MULTI_VALUE_OPTIONS[field]):
+            columns.append(func.sum(case((mask_column.op("&")(1 << bit) != 0, 1), else_=0)))
+            keys.append((field, option))
+    return columns, keys
+
+
+def _catalogue_json_texts(field):
+    """Mọi chuỗi JSON set_json() có thể ghi khi list chỉ gồm giá trị trong danh mục."""
+    options = MULTI_VALUE_OPTIONS[field]
+    texts = {""}
+    for size in range(len(options) + 1):
+        for values in permutations(options, size):
+            texts.add(json.dumps(list(values), ensure_ascii=False))
+    return texts
+
+
+def _parse_option_values(text):
+    try:
+        values = json.loads(text)
+    except (TypeError, ValueError):
+        return []
+    return values if isinstance(values, list) else []
 
 
 class CameraService:
     @staticmethod
-    def search_cameras(filters, page=1, per_page=50):
+    def build_search_query(filters):
+        """
+        Tạo query (chưa sắp xếp/phân trang) cho bộ lọc tìm kiếm camera.
+
+        Điều kiện WHERE được dựng một lần cho mỗi "hình dạng" bộ lọc (xem
+        _search_plan) với bindparam, rồi giá trị được gắn qua ``Query.params``.
+        """
+        dialect = db.engine.dialect.name
+        shape, params = _search_plan(filters, dialect)
         query = Camera.query
+        if shape:
+            query = query.filter(*_search_criteria(dialect, shape)).params(params)
+        return query
+
+    @staticmethod
+    def search_cameras(filters, page=1, per_page=50, cursor=None, count_mode=COUNT_EXACT,
+                       columns=None):
+        """
+        Tìm kiếm camera theo bộ lọc.
+
+        Mặc định phân trang bằng OFFSET (``page``). Khi truyền ``cursor``
+        (kể cả chuỗi rỗng cho trang đầu) thì dùng keyset pagination theo
+        Camera.id DESC; ``count_mode`` quyết định cách tính tổng.
+
+        Tổng số kết quả được cache theo chữ ký bộ lọc + data version, nên
+        chuyển trang không phải COUNT(*) lại.
+
+        ``columns`` là tập cột cần nạp (xem services.projections), ví dụ
+        "list" cho bảng kết quả; mặc định nạp đủ.
 
-        text_fields = [
-            "owner_name",
-            "organization_name",
-            "address_street",
-            "ward",
-            "province",
-            "phone",
-            "manufacturer",
-            "latlon",
-            "static_ip",
-        ]
-        for field in text_fields:
-            value = filters.get(field)
-            if value:
-                query = query.filter(getattr(Camera, field).ilike(f"%{value}%"))
-
-        json_fields = [
-            "monitoring_modes",
-            "storage_types",
-            "camera_types",
-            "form_factors",
-            "network_types",
-            "install_areas",
-        ]
-        for field in json_fields:
-            values = filters.get(field, [])
-            if values:
-                for val in values:
-                    query = query.filter(getattr(Camera, field).ilike(f"%{val}%"))
-
-        pagination = query.order_by(Camera.id.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
+        Khi bật index trong bộ nhớ (CAMERA_INDEX_ENABLED) và bộ lọc nằm trong
+        khả năng của index, việc lọc/đếm chạy trên index; SQL chỉ nạp các
+        camera của trang hiện tại.
+
+        Returns:
+            (items, total, pagination)
+        """
+        index = get_camera_index()
+        ids = index.search_ids(filters) if index else None
+        if ids is not None:
+            def loader(page_ids):
+                return CameraService._load_in_order(page_ids, columns)
+
+            if cursor is not None:
+                pagination = keyset_paginate_ids(
+                    ids, loader, cursor=cursor, per_page=per_page, count_mode=count_mode,
+                )
+            else:
+                pagination = IdListPagination(
+                    page=page, per_page=per_page, max_per_page=None, error_out=False,
+                    ids=ids[::-1], loader=loader,
+                )
+            return pagination.items, pagination.total, pagination
+
+        query = CameraService.build_search_query(filters)
+        page_query = apply_projection(query, columns)
+
+        if cursor is not None:
+            pagination = keyset_paginate(
+                page_query, Camera.id, cursor=cursor, per_page=per_page, count_mode=COUNT_NONE
+            )
+            if count_mode != COUNT_NONE:
+                total, is_estimate = cached_count(
+                    f"camera_search:cursor:{count_mode}",
+                    filters,
+                    lambda: list(count_query(query, count_mode)),
+                )
+                pagination.total = total
+                pagination.total_is_estimate = is_estimate
+            return pagination.items, pagination.total, pagination
+
+        pagination = page_query.order_by(Camera.id.desc()).paginate(
+            page=page, per_page=per_page, error_out=False, count=False
+        )
+        pagination.total = cached_count(
+            "camera_search:exact", filters, lambda: query.order_by(None).count()
         )
         return pagination.items, pagination.total, pagination
 
@@ -50,10 +286,17 @@ class CameraService:
         return Camera.query.get(camera_id)
 
     @staticmethod
-    def get_cameras_by_ids(ids):
+    def get_cameras_by_ids(ids, columns=None):
         if not ids:
             return []
-        return Camera.query.filter(Camera.id.in_(ids)).all()
+        return apply_projection(Camera.query, columns).filter(Camera.id.in_(ids)).all()
+
+    @staticmethod
+    def _load_in_order(ids, columns=None):
+        """Nạp camera theo danh sách id (từ index), giữ nguyên thứ tự của ``ids``."""
+        ids = [int(camera_id) for camera_id in ids]
+        by_id = {camera.id: camera for camera in CameraService.get_cameras_by_ids(ids, columns)}
+        return [by_id[camera_id] for camera_id in ids if camera_id in by_id]
 
     @staticmethod
     def create_camera(camera_data, json_fields, user_id=None):
@@ -66,8 +309,12 @@ class CameraService:
         for field_name, value in json_fields.items():
             cam.set_json(field_name, value)
         cam.set_latlon_components()
+        cam.set_search_components()
         db.session.add(cam)
+        db.session.flush()
+        new = camera_events.snapshot(cam)
         db.session.commit()
+        camera_events.publish([camera_events.CameraChange("create", cam.id, None, new)])
         if user_id:
             log_audit("create", "camera", cam.id, {"action": "create"}, user=None)
         return cam
@@ -83,13 +330,17 @@ class CameraService:
             converted = convert_latlon(latlon_value)
             camera_data["latlon"] = converted or latlon_value
 
+        old = camera_events.snapshot(camera)
         for key, value in camera_data.items():
             setattr(camera, key, value)
 
         for field_name, value in json_fields.items():
             camera.set_json(field_name, value)
         camera.set_latlon_components()
+        camera.set_search_components()
+        new = camera_events.snapshot(camera)
         db.session.commit()
+        camera_events.publish([camera_events.CameraChange("update", camera.id, old, new)])
         if user_id:
             log_audit("edit", "camera", camera.id, {"action": "update"}, user=None)
         return camera
@@ -99,12 +350,156 @@ class CameraService:
         camera = Camera.query.get(camera_id)
         if not camera:
             return False
+        old = camera_events.snapshot(camera)
         db.session.delete(camera)
         db.session.commit()
+        camera_events.publish([camera_events.CameraChange("delete", camera_id, old, None)])
         if user_id:
             log_audit("delete", "camera", camera_id, {"action": "delete"}, user=None)
         return True
 
+    @staticmethod
+    def _backfill(apply_func, batch_size):
+        """Duyệt toàn bộ camera theo lô (theo id), gọi apply_func và commit từng lô."""
+        updated = 0
+        last_id = 0
+        while True:
+            batch = (
+                Camera.query.filter(Camera.id > last_id)
+                .order_by(Camera.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not batch:
+                break
+            changes = []
+            for camera in batch:
+                old = camera_events.snapshot(camera)
+                apply_func(camera)
+                changes.append(
+                    camera_events.CameraChange("update", camera.id, old, camera_events.snapshot(camera))
+                )
+            db.session.commit()
+            camera_events.publish(changes)
+            updated += len(batch)
+            last_id = batch[-1].id
+        return updated
+
+    @staticmethod
+    def backfill_search_columns(batch_size=500):
+        """Điền lại các cột tìm kiếm chuẩn hóa cho toàn bộ camera, theo từng lô."""
+        return CameraService._backfill(lambda camera: camera.set_search_components(), batch_size)
+
+    @staticmethod
+    def backfill_option_masks(batch_size=500):
+        """Tính lại các cột bitmask từ JSON cho toàn bộ camera, theo từng lô."""
+        return CameraService._backfill(lambda camera: camera.set_option_masks(), batch_size)
+
+    @staticmethod
+    def backfill_geohash(batch_size=500):
+        """Tính lại cột geohash từ latitude/longitude cho toàn bộ camera, theo từng lô."""
+        return CameraService._backfill(lambda camera: camera.set_geohash(), batch_size)
+
+    @staticmethod
+    def get_option_counts(field_names):
+        """
+        Đếm số camera theo từng giá trị của các trường nhiều lựa chọn
+        trong một câu query duy nhất (SUM trên phép AND bitmask).
+
+        Giá trị ngoài danh mục (không có bit) được cộng thêm từ JSON, xem
+        get_unlisted_option_counts.
+
+        Returns:
+            dict {field: {option: count}} (chỉ gồm các option có count > 0)
+        """
+        columns, keys = _option_sum_columns(field_names)
+        counts = {field: {} for field in field_names}
+        if columns:
+            row = db.session.query(*columns).one()
+            for (field, option), value in zip(keys, row):
+                if value:
+                    counts[field][option] = int(value)
+        for field, unlisted in CameraService.get_unlisted_option_counts(field_names).items():
+            for option, count in unlisted.items():
+                counts[field][option] = counts[field].get(option, 0) + count
+        return counts
+
+    @staticmethod
+    def get_unlisted_option_counts(field_names):
+        """
+        Đếm các giá trị nằm ngoài MULTI_VALUE_OPTIONS (không có bit trong cột mask).
+
+        Chỉ đọc những chuỗi JSON khác mọi tổ hợp giá trị trong danh mục, gom
+        theo chuỗi (GROUP BY) nên số dòng phải json.loads rất nhỏ.
+
+        Returns:
+            dict {field: {value: count}}
+        """
+        counts = {field: {} for field in field_names}
+        for field in field_names:
+            column = getattr(Camera, field)
+            options = MULTI_VALUE_OPTIONS[field]
+            rows = (
+                db.session.query(column, func.count())
+                .filter(column.isnot(None), column.notin_(_catalogue_json_texts(field)))
+                .group_by(column)
+                .all()
+            )
+            for text, count in rows:
+                for value in set(_parse_option_values(text)):
+                    if value and isinstance(value, str) and value not in options:
+                        counts[field][value] = counts[field].get(value, 0) + count
+        return counts
+
+    @staticmethod
+    def get_facet_counts(filters):
+        """
+        Đếm kết quả tìm kiếm theo từng facet (FACET_FIELDS, FACET_OPTION_FIELDS).
+
+        Một câu aggregate duy nhất: GROUP BY tổ hợp các trường facet kèm SUM
+        bitmask cho từng option, rồi cộng dồn ra từng facet. Khi có index
+        trong bộ nhớ thì đếm trên mảng đã lọc. Kết quả được cache theo chữ ký
+        bộ lọc + data version.
+
+        Returns:
+            {"total": int, "facets": {field: {value: count}}}
+        """
+        return cached_by_filters("camera_facets", filters, lambda: CameraService._compute_facet_counts(filters))
+
+    @staticmethod
+    def _compute_facet_counts(filters):
+        index = get_camera_index()
+        selected = index.search_mask(filters) if index else None
+        if selected is not None:
+            return index.facet_counts(selected, FACET_FIELDS, FACET_OPTION_FIELDS)
+
+        group_columns = [getattr(Camera, field) for field in FACET_FIELDS]
+        option_columns, option_keys = _option_sum_columns(FACET_OPTION_FIELDS)
+        rows = (
+            CameraService.build_search_query(filters)
+            .order_by(None)
+            .with_entities(*group_columns, func.count(Camera.id), *option_columns)
+            .group_by(*group_columns)
+            .all()
+        )
+
+        total = 0
+        facets = {field: {} for field in FACET_FIELDS + FACET_OPTION_FIELDS}
+        for row in rows:
+            group_values = row[:len(FACET_FIELDS)]
+            count = row[len(FACET_FIELDS)]
+            option_values = row[len(FACET_FIELDS) + 1:]
+            total += count
+            for field, value in zip(FACET_FIELDS, group_values):
+                if field == "system_type":
+                    value = value or "Chưa phân loại"
+                if value:
+                    facets[field][value] = facets[field].get(value, 0) + count
+            for (field, option), value in zip(option_keys, option_values):
+                if value:
+                    facets[field][option] = facets[field].get(option, 0) + int(value)
+        return {"total": total, "facets": facets}
+
     @staticmethod
     def get_wards_with_counts():
         return (
@@ -115,5 +510,5 @@ class CameraService:
         )
 
     @staticmethod
-    def get_cameras_by_ward(ward):
-        return Camera.query.filter_by(ward=ward).all()
+    def get_cameras_by_ward(ward, columns=None):
+        return apply_projection(Camera.query, columns).filter_by(ward=ward).all()
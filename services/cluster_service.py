@@ -0,0 +1,352 @@
+"""
+Gom cụm (clustering) marker bản đồ phía server.
+
+Tọa độ camera được chiếu sang Web Mercator chuẩn hóa [0, 1) và lượng tử hóa
+thành ô lưới ở độ phân giải mịn nhất (``MAX_LEVEL`` bit mỗi trục). Ô ở zoom z
+là ô mịn dịch phải ``MAX_LEVEL - (z + CELL_BITS)`` bit, nên lưới lồng nhau
+giữa các zoom (cụm ở zoom z là hợp của 4 cụm ở zoom z+1) - cùng ý tưởng với
+supercluster nhưng dùng lưới cố định thay vì bán kính.
+
+Mỗi zoom giữ dict ô -> ``_Cell`` (số camera, tổng lat/lon để lấy tâm, tổng id
+để biết id khi ô chỉ có một camera, số camera và tổng lat/lon theo system_type). Cùng lưới
+này phục vụ heatmap mật độ (``heatmap``), không cần bảng tổng hợp riêng. Ghi camera
+chỉ trừ điểm cũ và cộng điểm mới vào ô tương ứng ở mọi zoom (listener của
+``services.camera_events``); lệch data version (worker khác ghi) thì dựng lại.
+"""
+import math
+import threading
+import time
+
+from models import Camera, db
+from services.cache_service import get_data_version
+
+# Ô lưới rộng 256 / 2^CELL_BITS = 64 pixel màn hình ở mọi zoom
+CELL_BITS = 2
+# Từ zoom này trở lên trả về từng camera thay vì cụm
+MAX_CLUSTER_ZOOM = 17
+MAX_LEVEL = MAX_CLUSTER_ZOOM + CELL_BITS
+# Ô heatmap ở zoom z là ô cụm của zoom z + HEATMAP_EXTRA_LEVELS (32 pixel)
+HEATMAP_EXTRA_LEVELS = 1
+MAX_LATITUDE = 85.05112878
+# Nhãn của camera không có system_type (gộp với camera lưu đúng nhãn này)
+UNCLASSIFIED = "Chưa phân loại"
+# Khi không có cache (data version = 0) thì dựng lại theo tuổi index
+FALLBACK_MAX_AGE = 300
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def _parse_latlon(latlon):
+    try:
+        lat, lon = latlon.split(",")
+        return float(lat.strip()), float(lon.strip())
+    except (AttributeError, ValueError):
+        return None, None
+
+
+def point_coordinates(row):
+    """(lat, lon) từ mapping cột camera: latitude/longitude, nếu thiếu thì latlon."""
+    lat, lon = row.get("latitude"), row.get("longitude")
+    if lat is None or lon is None:
+        lat, lon = _parse_latlon(row.get("latlon"))
+    if lat is None or lon is None or not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None, None
+    return lat, lon
+
+
+def mercator(lat, lon):
+    """Tọa độ Web Mercator chuẩn hóa (x, y) trong [0, 1], y tăng về phía nam."""
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    x = (lon + 180.0) / 360.0
+    sin_lat = math.sin(math.radians(lat))
+    y = 0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)
+    return x, y
+
+
+def _cell_limit(level):
+    return (1 << level) - 1
+
+
+def fine_cell(lat, lon):
+    """Ô lưới mịn nhất (MAX_LEVEL) chứa điểm."""
+    x, y = mercator(lat, lon)
+    limit = _cell_limit(MAX_LEVEL)
+    scale = 1 << MAX_LEVEL
+    return min(int(x * scale), limit), min(int(y * scale), limit)
+
+
+class _Cell:
+    __slots__ = ("count", "lat_sum", "lon_sum", "id_sum", "systems")
+
+    def __init__(self):
+        self.count = 0
+        self.lat_sum = 0.0
+        self.lon_sum = 0.0
+        self.id_sum = 0
+        # system_type -> [số camera, tổng lat, tổng lon]
+        self.systems = {}
+
+    def add(self, point, sign):
+        camera_id, lat, lon, system_type = point
+        self.count += sign
+        self.lat_sum += sign * lat
+        self.lon_sum += sign * lon
+        self.id_sum += sign * camera_id
+        system = self.systems.get(system_type)
+        if system is None:
+            system = self.systems[system_type] = [0, 0.0, 0.0]
+        system[0] += sign
+        system[1] += sign * lat
+        system[2] += sign * lon
+        if not system[0]:
+            del self.systems[system_type]
+
+    def system_counts(self):
+        return {system_type: system[0] for system_type, system in self.systems.items()}
+
+
+def _keys_in_bbox(cells, level, bbox):
+    """Các ô (ở ``level``) có camera và giao với bbox."""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    x0, y1 = mercator(min_lat, min_lon)
+    x1, y0 = mercator(max_lat, max_lon)
+    scale = 1 << level
+    limit = _cell_limit(level)
+    cx0, cx1 = max(0, int(x0 * scale)), min(limit, int(x1 * scale))
+    cy0, cy1 = max(0, int(y0 * scale)), min(limit, int(y1 * scale))
+
+    # Khung nhìn thường chỉ vài trăm ô -> tra từng ô; bbox quá lớn thì quét cả lưới
+    area = (cx1 - cx0 + 1) * (cy1 - cy0 + 1) if cx1 >= cx0 and cy1 >= cy0 else 0
+    if area <= len(cells):
+        return [
+            (cx, cy) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1)
+            if (cx, cy) in cells
+        ]
+    return [
+        key for key in cells
+        if cx0 <= key[0] <= cx1 and cy0 <= key[1] <= cy1
+    ]
+
+
+class ClusterIndex:
+    """Lưới cụm phân cấp theo zoom, cập nhật tăng dần."""
+
+    def __init__(self, rows=()):
+        # id -> (id, lat, lon, system_type), id -> ô mịn, ô mịn -> tập id
+        self._points = {}
+        self._fine_cells = {}
+        self._members = {}
+        # zoom -> {(cx, cy): _Cell}; zoom >= MAX_CLUSTER_ZOOM dùng chung lưới mịn nhất
+        self._levels = {zoom: {} for zoom in range(MAX_CLUSTER_ZOOM + 1)}
+        self._lock = threading.Lock()
+        self.version = None
+        self.built_at = time.monotonic()
+        for row in rows:
+            self._upsert(row)
+
+    def __len__(self):
+        return len(self._points)
+
+    # ----- Cập nhật -----
+
+    def _insert(self, point, fine):
+        for zoom, cells in self._levels.items():
+            shift = MAX_LEVEL - min(zoom + CELL_BITS, MAX_LEVEL)
+            key = (fine[0] >> shift, fine[1] >> shift)
+            cell = cells.get(key)
+            if cell is None:
+                cell = cells[key] = _Cell()
+            cell.add(point, 1)
+
+    def _remove(self, camera_id):
+        point = self._points.pop(camera_id, None)
+        if point is None:
+            return
+        fine = self._fine_cells.pop(camera_id)
+        members = self._members[fine]
+        members.discard(camera_id)
+        if not members:
+            del self._members[fine]
+        for zoom, cells in self._levels.items():
+            shift = MAX_LEVEL - min(zoom + CELL_BITS, MAX_LEVEL)
+            key = (fine[0] >> shift, fine[1] >> shift)
+            cell = cells[key]
+            cell.add(point, -1)
+            if not cell.count:
+                del cells[key]
+
+    def _upsert(self, row):
+        lat, lon = point_coordinates(row)
+        if lat is None:
+            return
+        point = (row["id"], lat, lon, row.get("system_type") or UNCLASSIFIED)
+        fine = fine_cell(lat, lon)
+        self._points[point[0]] = point
+        self._fine_cells[point[0]] = fine
+        self._members.setdefault(fine, set()).add(point[0])
+        self._insert(point, fine)
+
+    def apply_changes(self, changes, data_version=None):
+        """Áp dụng danh sách CameraChange (old/new là snapshot cột)."""
+        with self._lock:
+            for change in changes:
+                self._remove(change.camera_id)
+                if change.new is not None:
+                    self._upsert(change.new)
+            if data_version:
+                self.version = data_version
+
+    # ----- Truy vấn -----
+
+    def clusters(self, bbox, zoom):
+        """
+        Cụm và điểm đơn trong khung nhìn.
+
+        Args:
+            bbox: (min_lon, min_lat, max_lon, max_lat)
+            zoom: mức zoom bản đồ (số nguyên >= 0)
+
+        Returns:
+            list dict: cụm có ``count`` > 1 kèm ``systems`` (system_type -> số
+            camera); ô chỉ có một camera trả về ``id`` của camera đó.
+        """
+        zoom = max(0, int(zoom))
+        level = min(zoom + CELL_BITS, MAX_LEVEL)
+        cells = self._levels[min(zoom, MAX_CLUSTER_ZOOM)]
+
+        with self._lock:
+            keys = _keys_in_bbox(cells, level, bbox)
+            results = []
+            for key in keys:
+                cell = cells[key]
+                if zoom > MAX_CLUSTER_ZOOM and cell.count > 1:
+                    results.extend(self._cell_points(key))
+                    continue
+                results.append(self._cell_entry(key, level, cell))
+        return results
+
+    def heatmap(self, bbox, zoom, system=None):
+        """
+        Lưới mật độ camera trong khung nhìn (dùng chung lưới cụm đã tổng hợp).
+
+        Ô heatmap mịn hơn ô cụm ``HEATMAP_EXTRA_LEVELS`` cấp (32 pixel màn hình).
+
+        Args:
+            bbox: (min_lon, min_lat, max_lon, max_lat)
+            zoom: mức zoom bản đồ (số nguyên >= 0)
+            system: chỉ đếm camera của system_type này (None = mọi hệ thống)
+
+        Returns:
+            list dict (lat, lon tâm các camera trong ô - chỉ tính camera của
+            ``system`` nếu có, count, systems: system_type -> số camera)
+        """
+        grid_zoom = min(max(0, int(zoom)) + HEATMAP_EXTRA_LEVELS, MAX_CLUSTER_ZOOM)
+        level = min(grid_zoom + CELL_BITS, MAX_LEVEL)
+        cells = self._levels[grid_zoom]
+
+        results = []
+        with self._lock:
+            for key in _keys_in_bbox(cells, level, bbox):
+                cell = cells[key]
+                if system is None:
+                    count, lat_sum, lon_sum = cell.count, cell.lat_sum, cell.lon_sum
+                    systems = cell.system_counts()
+                else:
+                    if system not in cell.systems:
+                        continue
+                    count, lat_sum, lon_sum = cell.systems[system]
+                    systems = {system: count}
+                results.append({
+                    "lat": lat_sum / count,
+                    "lon": lon_sum / count,
+                    "count": count,
+                    "systems": systems,
+                })
+        return results
+
+    def _cell_entry(self, key, level, cell):
+        entry = {
+            "lat": cell.lat_sum / cell.count,
+            "lon": cell.lon_sum / cell.count,
+            "count": cell.count,
+            "systems": cell.system_counts(),
+        }
+        if cell.count == 1:
+            entry["id"] = cell.id_sum
+        else:
+            entry["cluster"] = f"{level}/{key[0]}/{key[1]}"
+        return entry
+
+    def _cell_points(self, key):
+        # Chỉ dùng khi zoom sâu hơn MAX_CLUSTER_ZOOM: vài camera cùng một ô mịn
+        return [
+            {
+                "lat": lat,
+                "lon": lon,
+                "count": 1,
+                "systems": {system_type: 1},
+                "id": camera_id,
+            }
+            for camera_id, lat, lon, system_type in (
+                self._points[member] for member in sorted(self._members.get(key, ()))
+            )
+        ]
+
+
+def _build_index():
+    version = get_data_version()
+    rows = (
+        db.session.query(
+            Camera.id, Camera.latitude, Camera.longitude, Camera.latlon, Camera.system_type
+        )
+        .filter(
+            (Camera.latitude.isnot(None) & Camera.longitude.isnot(None))
+            | Camera.latlon.isnot(None)
+        )
+        .all()
+    )
+    index = ClusterIndex(row._mapping for row in rows)
+    index.version = version
+    return index
+
+
+def get_cluster_index():
+    """Index cụm của DB hiện tại, dựng (lại) nếu chưa có hoặc data version đã đổi."""
+    version = get_data_version()
+    key = str(db.engine.url)
+    index = _indexes.get(key)
+    if index is not None:
+        fresh = index.version == version and (
+            version or time.monotonic() - index.built_at < FALLBACK_MAX_AGE
+        )
+        if fresh:
+            return index
+
+    with _lock:
+        index = _indexes.get(key)
+        if index is not None and index.version == version and version:
+            return index
+        index = _build_index()
+        _indexes[key] = index
+        return index
+
+
+def apply_camera_changes(changes, data_version=None):
+    """Listener của camera_events: cập nhật index cụm đã dựng (nếu có)."""
+    index = _indexes.get(str(db.engine.url))
+    if index is None:
+        return
+    if index.version and data_version and data_version != index.version + 1:
+        # Bỏ lỡ thay đổi -> lần đọc sau dựng lại
+        _indexes.pop(str(db.engine.url), None)
+        return
+    index.apply_changes(changes, data_version)
+
+
+def get_clusters(bbox, zoom):
+    return get_cluster_index().clusters(bbox, zoom)
+
+
+def get_heatmap(bbox, zoom, system=None):
+    return get_cluster_index().heatmap(bbox, zoom, system=system)
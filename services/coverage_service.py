@@ -0,0 +1,513 @@
+"""
+Phân tích vùng trống camera (coverage gap): ô nào không có camera trong bán
+kính ``radius_m`` mét.
+
+Vùng phân tích (khung bao, đa giác / geofence như phường, hoặc hành lang quanh
+tuyến ``/map/route``) được raster hóa thành lưới ô vuông ``cell_m`` mét trên
+mặt phẳng cục bộ (equirectangular quanh vĩ độ giữa vùng; sai số dưới 1% ở quy
+mô một tỉnh):
+
+1. Mask vùng: đa giác tô theo scanline (chẵn-lẻ, lỗ được trừ); hành lang tuyến
+   là các ô cách các điểm lấy mẫu dày trên tuyến không quá ``buffer_m``.
+2. Khoảng cách tới camera gần nhất: camera được nạp một lần theo khung bao vùng
+   nới thêm ``radius_m`` (``bbox_criteria``, R*Tree nếu có); mỗi camera "đóng
+   dấu" khoảng cách chính xác tới tâm các ô trong cửa sổ bán kính quanh nó bằng
+   ``np.minimum.at`` (vector hóa theo camera cho mỗi độ lệch ô), nên chi phí tỉ
+   lệ với số camera x (radius / cell)^2 thay vì số ô x số camera.
+3. Ô trống được gom thành vùng liên thông (4 láng giềng, gán nhãn theo từng
+   đoạn liên tiếp trên hàng) rồi dò biên thành đa giác GeoJSON.
+
+Chạy trong background job (``start_job``): ``plan_coverage`` kiểm tra tham số
+và kích thước lưới ngay trong request, ``run_coverage`` tính trong job.
+"""
+import math
+from collections import namedtuple
+
+import numpy as np
+
+from models import Camera
+from services.geofence_service import parse_polygons, polygon_bounds
+from services.spatial_index import bbox_criteria
+
+EARTH_RADIUS_M = 6371000
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+DEFAULT_RADIUS_M = 100
+MAX_RADIUS_M = 5000
+DEFAULT_CELL_M = 25
+MIN_CELL_M = 5
+MAX_CELL_M = 1000
+# Cửa sổ đóng dấu tối đa (radius / cell) mỗi phía
+MAX_RADIUS_CELLS = 50
+# ~ 100 x 100 km với ô 50 m
+MAX_GRID_CELLS = 4000000
+MAX_GAP_POLYGONS = 500
+
+CoveragePlan = namedtuple(
+    "CoveragePlan",
+    ["polygons", "route", "buffer_m", "radius_m", "cell_m",
+     "min_lat", "min_lon", "lat_ref", "rows", "cols"],
+)
+
+
+def plan_coverage(polygons=None, route_points=None, buffer_m=None,
+                  radius_m=DEFAULT_RADIUS_M, cell_m=DEFAULT_CELL_M):
+    """
+    Kiểm tra tham số và dựng lưới cho một lần phân tích.
+
+    Args:
+        polygons: đa giác từ ``parse_polygons`` (bbox / phường / geofence)
+        route_points: list [lat, lon] của tuyến (thay cho polygons)
+        buffer_m: bề rộng hành lang mỗi bên tuyến (m)
+        radius_m: khoảng cách tối đa để một ô được coi là có camera phủ (m)
+        cell_m: cạnh ô lưới (m)
+
+    Raises:
+        ValueError: nếu thiếu vùng, tham số ngoài giới hạn hoặc lưới quá lớn
+    """
+    if not 0 < radius_m <= MAX_RADIUS_M:
+        raise ValueError(f"radius phải trong khoảng (0, {MAX_RADIUS_M}] mét")
+    if not MIN_CELL_M <= cell_m <= MAX_CELL_M:
+        raise ValueError(f"cell phải trong khoảng [{MIN_CELL_M}, {MAX_CELL_M}] mét")
+    if radius_m / cell_m > MAX_RADIUS_CELLS:
+        raise ValueError(f"radius tối đa {MAX_RADIUS_CELLS} lần cell, hãy tăng cell")
+
+    if route_points is not None:
+        if len(route_points) < 2:
+            raise ValueError("Tuyến cần ít nhất 2 điểm")
+        if not buffer_m or not 0 < buffer_m <= MAX_RADIUS_M:
+            raise ValueError(f"buffer phải trong khoảng (0, {MAX_RADIUS_M}] mét")
+        if buffer_m / cell_m > MAX_RADIUS_CELLS:
+            raise ValueError(f"buffer tối đa {MAX_RADIUS_CELLS} lần cell, hãy tăng cell")
+        route = np.array(route_points, dtype=np.float64).reshape(-1, 2)
+        lat_pad = buffer_m / METERS_PER_DEGREE
+        max_abs_lat = min(float(np.abs(route[:, 0]).max()) + lat_pad, 89.9)
+        lon_pad = buffer_m / (METERS_PER_DEGREE * math.cos(math.radians(max_abs_lat)))
+        min_lat, max_lat = float(route[:, 0].min()) - lat_pad, float(route[:, 0].max()) + lat_pad
+        min_lon, max_lon = float(route[:, 1].min()) - lon_pad, float(route[:, 1].max()) + lon_pad
+        polygons = None
+    elif polygons:
+        route = None
+        boxes = polygon_bounds(polygons)
+        min_lat, max_lat = min(box[0] for box in boxes), max(box[1] for box in boxes)
+        min_lon, max_lon = min(box[2] for box in boxes), max(box[3] for box in boxes)
+    else:
+        raise ValueError("Thiếu vùng phân tích (bbox, geometry, geofence_id hoặc route)")
+
+    lat_ref = (min_lat + max_lat) / 2
+    rows = max(1, math.ceil((max_lat - min_lat) * METERS_PER_DEGREE / cell_m))
+    cols = max(1, math.ceil(
+        (max_lon - min_lon) * METERS_PER_DEGREE * math.cos(math.radians(lat_ref)) / cell_m
+    ))
+    if rows * cols > MAX_GRID_CELLS:
+        raise ValueError(
+            f"Vùng quá lớn ({rows * cols} ô, tối đa {MAX_GRID_CELLS}), hãy tăng cell"
+        )
+    return CoveragePlan(
+        polygons, route, buffer_m, float(radius_m), float(cell_m),
+        min_lat, min_lon, lat_ref, rows, cols,
+    )
+
+
+def _to_grid(plan, lats, lons):
+    """(x, y) mét trong lưới từ lat/lon."""
+    scale_x = METERS_PER_DEGREE * math.cos(math.radians(plan.lat_ref))
+    xs = (np.asarray(lons, dtype=np.float64) - plan.min_lon) * scale_x
+    ys = (np.asarray(lats, dtype=np.float64) - plan.min_lat) * METERS_PER_DEGREE
+    return xs, ys
+
+
+def _to_lonlat(plan, xs, ys):
+    scale_x = METERS_PER_DEGREE * math.cos(math.radians(plan.lat_ref))
+    lons = plan.min_lon + np.asarray(xs, dtype=np.float64) * plan.cell_m / scale_x
+    lats = plan.min_lat + np.asarray(ys, dtype=np.float64) * plan.cell_m / METERS_PER_DEGREE
+    return lons, lats
+
+
+def _stamp_distances(plan, xs, ys, radius):
+    """
+    Khoảng cách (m) từ tâm mỗi ô tới điểm gần nhất trong ``radius``; inf nếu
+    không có điểm nào trong bán kính.
+    """
+    rows, cols, cell = plan.rows, plan.cols, plan.cell_m
+    distances = np.full(rows * cols, np.inf, dtype=np.float32)
+    if not len(xs):
+        return distances.reshape(rows, cols)
+    point_rows = np.floor(ys / cell).astype(np.int64)
+    point_cols = np.floor(xs / cell).astype(np.int64)
+    reach = int(math.ceil(radius / cell))
+    for dr in range(-reach, reach + 1):
+        for dc in range(-reach, reach + 1):
+            # Cận dưới khoảng cách từ một điểm trong ô gốc tới tâm ô lệch (dr, dc)
+            gap_r, gap_c = max(abs(dr) - 0.5, 0), max(abs(dc) - 0.5, 0)
+            if (gap_r * gap_r + gap_c * gap_c) * cell * cell > radius * radius:
+                continue
+            cell_rows = point_rows + dr
+            cell_cols = point_cols + dc
+            inside = (cell_rows >= 0) & (cell_rows < rows) & (cell_cols >= 0) & (cell_cols < cols)
+            d = np.hypot((cell_cols + 0.5) * cell - xs, (cell_rows + 0.5) * cell - ys)
+            inside &= d <= radius
+            np.minimum.at(
+                distances, cell_rows[inside] * cols + cell_cols[inside],
+                d[inside].astype(np.float32),
+            )
+    return distances.reshape(rows, cols)
+
+
+def _polygon_mask(plan):
+    """Mask ô có tâm nằm trong đa giác (scanline chẵn-lẻ theo từng hàng)."""
+    mask = np.zeros((plan.rows, plan.cols), dtype=bool)
+    centers_y = (np.arange(plan.rows) + 0.5) * plan.cell_m
+    for polygon in plan.polygons:
+        inside = np.zeros_like(mask)
+        x1s, y1s, x2s, y2s = [], [], [], []
+        for ring in polygon:
+            xs, ys = _to_grid(plan, ring[:, 1], ring[:, 0])
+            x1s.append(xs)
+            y1s.append(ys)
+            x2s.append(np.roll(xs, -1))
+            y2s.append(np.roll(ys, -1))
+        x1, y1 = np.concatenate(x1s), np.concatenate(y1s)
+        x2, y2 = np.concatenate(x2s), np.concatenate(y2s)
+        first = max(0, int(np.floor(y1.min() / plan.cell_m)))
+        last = min(plan.rows - 1, int(np.ceil(y1.max() / plan.cell_m)))
+        for row in range(first, last + 1):
+            y = centers_y[row]
+            straddles = (y1 > y) != (y2 > y)
+            if not straddles.any():
+                continue
+            ax, ay, bx, by = x1[straddles], y1[straddles], x2[straddles], y2[straddles]
+            crossings = np.sort(ax + (y - ay) * (bx - ax) / (by - ay))
+            # Cột có tâm trong [x_vào, x_ra)
+            starts = np.ceil(crossings[0::2] / plan.cell_m - 0.5).astype(np.int64)
+            ends = np.ceil(crossings[1::2] / plan.cell_m - 0.5).astype(np.int64)
+            for start, end in zip(np.clip(starts, 0, plan.cols), np.clip(ends, 0, plan.cols)):
+                inside[row, start:end] ^= True
+        mask |= inside
+    return mask
+
+
+def _route_mask(plan):
+    """Mask ô cách tuyến không quá buffer_m (lấy mẫu tuyến dày nửa ô)."""
+    xs, ys = _to_grid(plan, plan.route[:, 0], plan.route[:, 1])
+    sample_xs, sample_ys = [xs[:1]], [ys[:1]]
+    step = plan.cell_m / 2
+    for i in range(len(xs) - 1):
+        length = math.hypot(xs[i + 1] - xs[i], ys[i + 1] - ys[i])
+        count = max(1, int(math.ceil(length / step)))
+        t = np.arange(1, count + 1) / count
+        sample_xs.append(xs[i] + t * (xs[i + 1] - xs[i]))
+        sample_ys.append(ys[i] + t * (ys[i + 1] - ys[i]))
+    distances = _stamp_distances(
+        plan, np.concatenate(sample_xs), np.concatenate(sample_ys), plan.buffer_m
+    )
+    return np.isfinite(distances)
+
+
+def _runs(grid):
+    """
+    Các đoạn ô True liên tiếp trên từng hàng.
+
+    Returns:
+        (rows, starts, ends): đoạn [start, end) trên hàng ``rows``, theo thứ tự hàng rồi cột
+    """
+    padded = np.zeros((grid.shape[0], grid.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = grid
+    diff = np.diff(padded, axis=1)
+    rows, starts = np.nonzero(diff == 1)
+    # np.nonzero duyệt theo hàng rồi cột -> start/end thứ k cùng thuộc một đoạn
+    ends = np.nonzero(diff == -1)[1]
+    return rows, starts, ends
+
+
+def _label_runs(grid):
+    """
+    Gán nhãn vùng liên thông (4 láng giềng) cho các ô True.
+
+    Returns:
+        (run_rows, run_starts, run_ends, labels): các đoạn của ``_runs`` và nhãn
+        vùng của từng đoạn
+    """
+    run_rows, starts, ends = _runs(grid)
+    count = len(run_rows)
+    if not count:
+        return run_rows, starts, ends, np.zeros(0, dtype=np.int64)
+
+    # Cặp đoạn chồng nhau giữa hai hàng liền kề
+    rows = grid.shape[0]
+    row_offsets = np.searchsorted(run_rows, np.arange(rows + 1))
+    pairs_a, pairs_b = [], []
+    for row in range(rows - 1):
+        a0, a1 = row_offsets[row], row_offsets[row + 1]
+        b0, b1 = row_offsets[row + 1], row_offsets[row + 2]
+        if a0 == a1 or b0 == b1:
+            continue
+        next_starts, next_ends = starts[b0:b1], ends[b0:b1]
+        low = np.searchsorted(next_ends, starts[a0:a1], side="right")
+        high = np.searchsorted(next_starts, ends[a0:a1], side="left")
+        lengths = np.maximum(high - low, 0)
+        if not lengths.any():
+            continue
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        pairs_a.append(np.repeat(np.arange(a0, a1), lengths))
+        pairs_b.append(b0 + np.repeat(low, lengths) + offsets)
+
+    labels = np.arange(count)
+    if pairs_a:
+        a, b = np.concatenate(pairs_a), np.concatenate(pairs_b)
+        # Lan truyền nhãn nhỏ nhất + nhảy con trỏ tới khi ổn định
+        while True:
+            low = np.minimum(labels[a], labels[b])
+            updated = labels.copy()
+            np.minimum.at(updated, labels[a], low)
+            np.minimum.at(updated, labels[b], low)
+            while True:
+                jumped = updated[updated]
+                if np.array_equal(jumped, updated):
+                    break
+                updated = jumped
+            if np.array_equal(updated, labels):
+                break
+            labels = updated
+    return run_rows, starts, ends, labels
+
+
+def _boundary_edges(components):
+    """
+    Cạnh biên có hướng của mọi vùng, vùng nằm bên trái hướng đi (biên ngoài
+    ngược chiều kim đồng hồ, lỗ cùng chiều). Các cạnh đơn vị thẳng hàng được
+    gộp nên cạnh chỉ gặp nhau ở góc.
+
+    Args:
+        components: lưới nhãn vùng, -1 là ô ngoài vùng
+
+    Returns:
+        (component, x0, y0, x1, y1, direction): các mảng, hướng 0..3 = phải,
+        lên, trái, xuống
+    """
+    inside = components >= 0
+    below = np.zeros_like(inside)
+    below[1:] = inside[:-1]
+    above = np.zeros_like(inside)
+    above[:-1] = inside[1:]
+    left = np.zeros_like(inside)
+    left[:, 1:] = inside[:, :-1]
+    right = np.zeros_like(inside)
+    right[:, :-1] = inside[:, 1:]
+
+    parts = []
+    # Cạnh dưới (đi sang phải) và cạnh trên (đi sang trái)
+    rows, starts, ends = _runs(inside & ~below)
+    parts.append((components[rows, starts], starts, rows, ends, rows, 0))
+    rows, starts, ends = _runs(inside & ~above)
+    parts.append((components[rows, starts], ends, rows + 1, starts, rows + 1, 2))
+    # Cạnh trái (đi xuống) và cạnh phải (đi lên), gộp theo cột
+    cols, starts, ends = _runs((inside & ~left).T)
+    parts.append((components[starts, cols], cols, ends, cols, starts, 3))
+    cols, starts, ends = _runs((inside & ~right).T)
+    parts.append((components[starts, cols], cols + 1, starts, cols + 1, ends, 1))
+
+    return tuple(
+        np.concatenate([
+            np.full(len(part[0]), part[5]) if index == 5 else part[index]
+            for part in parts
+        ])
+        for index in range(6)
+    )
+
+
+def _trace_rings(x0, y0, x1, y1, directions):
+    """Nối cạnh biên của một vùng thành các vòng khép kín (list đỉnh)."""
+    outgoing = {}
+    for index, vertex in enumerate(zip(x0.tolist(), y0.tolist())):
+        outgoing.setdefault(vertex, []).append(index)
+    ends = list(zip(x1.tolist(), y1.tolist()))
+    starts = list(zip(x0.tolist(), y0.tolist()))
+    directions = directions.tolist()
+    used = [False] * len(ends)
+
+    rings = []
+    for first in range(len(ends)):
+        if used[first]:
+            continue
+        used[first] = True
+        outgoing[starts[first]].remove(first)
+        ring = [starts[first]]
+        edge = first
+        while True:
+            end = ends[edge]
+            options = outgoing.get(end) or []
+            if end == ring[0]:
+                options = options + [first]
+            if len(options) > 1:
+                # Đỉnh chung của hai ô chỉ chạm góc: rẽ trái để mỗi ô thuộc một vòng riêng
+                turn_left = (directions[edge] + 1) % 4
+                options = [option for option in options if directions[option] == turn_left] or options
+            if not options:
+                break
+            chosen = options[0]
+            if chosen == first:
+                break
+            used[chosen] = True
+            outgoing[end].remove(chosen)
+            ring.append(end)
+            edge = chosen
+        rings.append(ring)
+    return rings
+
+
+def _signed_area(ring):
+    xs = np.array([point[0] for point in ring], dtype=np.float64)
+    ys = np.array([point[1] for point in ring], dtype=np.float64)
+    return 0.5 * float(np.dot(xs, np.roll(ys, -1)) - np.dot(ys, np.roll(xs, -1)))
+
+
+def _gap_polygons(plan, gaps, max_polygons):
+    """
+    Vùng trống liên thông thành đa giác GeoJSON, lớn nhất trước.
+
+    Returns:
+        (tổng số vùng trống, list Feature của ``max_polygons`` vùng lớn nhất)
+    """
+    run_rows, starts, ends, labels = _label_runs(gaps)
+    if not len(labels):
+        return 0, []
+    lengths = ends - starts
+    _, inverse = np.unique(labels, return_inverse=True)
+    sizes = np.bincount(inverse, weights=lengths).astype(np.int64)
+    order = np.argsort(-sizes, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+
+    # Lưới nhãn theo thứ hạng kích thước; chỉ giữ các vùng sẽ trả về
+    run_rank = rank[inverse]
+    keep = run_rank < max_polygons
+    components = np.full(gaps.shape, -1, dtype=np.int64)
+    kept_lengths = lengths[keep]
+    offsets = np.arange(kept_lengths.sum()) - np.repeat(np.cumsum(kept_lengths) - kept_lengths, kept_lengths)
+    cells = np.repeat(run_rows[keep] * gaps.shape[1] + starts[keep], kept_lengths) + offsets
+    components.ravel()[cells] = np.repeat(run_rank[keep], kept_lengths)
+
+    edge_components, x0, y0, x1, y1, directions = _boundary_edges(components)
+    edge_order = np.argsort(edge_components, kind="stable")
+    bounds = np.searchsorted(edge_components[edge_order], np.arange(min(max_polygons, len(sizes)) + 1))
+
+    features = []
+    for component in range(len(bounds) - 1):
+        selected = edge_order[bounds[component]:bounds[component + 1]]
+        exterior, holes = None, []
+        for ring in _trace_rings(x0[selected], y0[selected], x1[selected], y1[selected], directions[selected]):
+            if exterior is None and _signed_area(ring) > 0:
+                exterior = ring
+            else:
+                holes.append(ring)
+        coordinates = []
+        for ring in [exterior] + holes:
+            lons, lats = _to_lonlat(plan, [point[0] for point in ring], [point[1] for point in ring])
+            points = np.round(np.column_stack((lons, lats)), 6).tolist()
+            coordinates.append(points + points[:1])
+        cell_count = int(sizes[order[component]])
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "Polygon", "coordinates": coordinates},
+            "properties": {
+                "cells": cell_count,
+                "area_m2": round(cell_count * plan.cell_m * plan.cell_m),
+            },
+        })
+    return len(sizes), features
+
+
+def run_coverage(app, plan, max_polygons=MAX_GAP_POLYGONS):
+    """
+    Thực hiện phân tích (chạy trong background job).
+
+    Returns:
+        dict: số ô / diện tích, ``coverage_percent``, thống kê khoảng cách và
+        ``gaps`` (GeoJSON FeatureCollection các vùng trống, lớn nhất trước)
+    """
+    with app.app_context():
+        if plan.route is not None:
+            area = _route_mask(plan)
+        else:
+            area = _polygon_mask(plan)
+
+        # Camera quanh vùng: khung bao lưới nới thêm bán kính phủ
+        max_lon, max_lat = _to_lonlat(plan, [plan.cols], [plan.rows])
+        lat_pad = plan.radius_m / METERS_PER_DEGREE
+        max_abs_lat = min(max(abs(plan.min_lat), abs(float(max_lat[0]))) + lat_pad, 89.9)
+        lon_pad = plan.radius_m / (METERS_PER_DEGREE * math.cos(math.radians(max_abs_lat)))
+        rows = (
+            Camera.query.with_entities(Camera.latitude, Camera.longitude)
+            .filter(*bbox_criteria(
+                plan.min_lat - lat_pad, float(max_lat[0]) + lat_pad,
+                plan.min_lon - lon_pad, float(max_lon[0]) + lon_pad,
+            ))
+            .all()
+        )
+
+    xs, ys = _to_grid(plan, [row[0] for row in rows], [row[1] for row in rows])
+    distances = _stamp_distances(plan, xs, ys, plan.radius_m)
+    covered = area & np.isfinite(distances)
+    gaps = area & ~covered
+
+    total_cells = int(area.sum())
+    covered_cells = int(covered.sum())
+    cell_area_km2 = plan.cell_m * plan.cell_m / 1e6
+    covered_distances = distances[covered]
+    gap_count, features = _gap_polygons(plan, gaps, max_polygons)
+    return {
+        "radius_m": plan.radius_m,
+        "cell_m": plan.cell_m,
+        "grid": [plan.rows, plan.cols],
+        "cameras": len(rows),
+        "total_cells": total_cells,
+        "covered_cells": covered_cells,
+        "gap_cells": total_cells - covered_cells,
+        "coverage_percent": round(100.0 * covered_cells / total_cells, 2) if total_cells else 0.0,
+        "area_km2": round(total_cells * cell_area_km2, 3),
+        "gap_area_km2": round((total_cells - covered_cells) * cell_area_km2, 3),
+        "mean_distance_m": round(float(covered_distances.mean()), 1) if covered_cells else None,
+        "gap_count": gap_count,
+        "gaps": {"type": "FeatureCollection", "features": features},
+    }
+
+
+def parse_area(payload, geofence_lookup=None):
+    """
+    Vùng phân tích từ JSON request: ``geometry`` (GeoJSON), ``geofence_id``,
+    ``bbox`` [min_lon, min_lat, max_lon, max_lat] hoặc ``route`` [[lat, lon], ...].
+
+    Returns:
+        (polygons, route_points): một trong hai là None
+
+    Raises:
+        ValueError: nếu vùng không hợp lệ
+    """
+    if payload.get("route") is not None:
+        route = payload["route"]
+        try:
+            points = [[float(point[0]), float(point[1])] for point in route]
+        except (TypeError, ValueError, IndexError):
+            raise ValueError("route phải là danh sách [lat, lon]")
+        return None, points
+    if payload.get("geometry") is not None:
+        return parse_polygons(payload["geometry"]), None
+    if payload.get("geofence_id") is not None:
+        geofence = geofence_lookup(payload["geofence_id"]) if geofence_lookup else None
+        if geofence is None:
+            raise ValueError("Không tìm thấy geofence")
+        return parse_polygons(geofence.get_geometry()), None
+    if payload.get("bbox") is not None:
+        bbox = payload["bbox"]
+        if isinstance(bbox, str):
+            bbox = bbox.split(",")
+        try:
+            min_lon, min_lat, max_lon, max_lat = (float(value) for value in bbox)
+        except (TypeError, ValueError):
+            raise ValueError("bbox phải có dạng [min_lon, min_lat, max_lon, max_lat]")
+        if not (min_lon < max_lon and min_lat < max_lat):
+            raise ValueError("bbox không hợp lệ")
+        return parse_polygons({"type": "Polygon", "coordinates": [[
+            [min_lon, min_lat], [max_lon, min_lat], [max_lon, max_lat], [min_lon, max_lat],
+        ]]}), None
+    raise ValueError("Thiếu vùng phân tích (bbox, geometry, geofence_id hoặc route)")
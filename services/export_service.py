@@ -7,6 +7,7 @@ import pandas as pd
 
 from models import Camera
 from security_utils import log_audit
+from services.projections import apply_projection
 
 
 def json_to_text(val):
@@ -22,7 +23,8 @@ def json_to_text(val):
 
 
 def build_export_bytes(selected_fields, field_labels, user_id=None):
-    cameras = Camera.query.all()
+    # Chỉ nạp các cột được chọn export
+    cameras = apply_projection(Camera.query, selected_fields).all()
     rows = []
 
     for cam in cameras:
@@ -0,0 +1,199 @@
+"""
+Full-text index cho các trường văn bản của camera.
+
+Index được xây trên các cột đã chuẩn hóa ``<field>_norm`` (không dấu, xem
+``text_utils.fold_text``) để "dong ve" khớp với "Đông Vệ".
+
+- SQLite: bảng ảo FTS5 (external content trỏ vào bảng ``camera``), được
+  đồng bộ bằng trigger nên mọi đường ghi (CameraService, process_import,
+  auto-fix...) đều cập nhật index mà không cần code riêng.
+- PostgreSQL: GIN index trên ``to_tsvector('simple', coalesce(col, ''))``
+  cho từng cột; PostgreSQL tự duy trì index khi ghi.
+
+Nếu index chưa được tạo (chưa chạy ``migrate_fulltext.py``), ``fulltext_fields``
+trả về danh sách rỗng và CameraService quay về tìm kiếm ``ilike`` như cũ.
+"""
+import re
+
+from sqlalchemy import String, and_, bindparam, column, func, select, table, text
+
+from models import SEARCH_NORMALIZED_FIELDS, Camera, db
+from services.availability import AvailabilityCache
+from text_utils import fold_text
+
+FTS_TABLE = "camera_fts"
+FTS_FIELDS = list(SEARCH_NORMALIZED_FIELDS)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Cache trạng thái index theo engine URL để không phải hỏi catalog mỗi request
+# ("chưa có" chỉ được cache ngắn hạn, xem services.availability)
+_availability = AvailabilityCache()
+
+
+def tokenize_query(value):
+    """Tách chuỗi tìm kiếm thành các token đã chuẩn hóa (không dấu, chữ thường)."""
+    folded = fold_text(value)
+    if not folded:
+        return []
+    return _TOKEN_RE.findall(folded)
+
+
+def _norm_column(field):
+    return f"{field}_norm"
+
+
+def _pg_index_name(field):
+    return f"ix_camera_fts_{field}"
+
+
+def _sqlite_ddl():
+    columns = [_norm_column(f) for f in FTS_FIELDS]
+    cols = ", ".join(columns)
+    new_vals = ", ".join(f"new.{c}" for c in columns)
+    old_vals = ", ".join(f"old.{c}" for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"{cols}, content='camera', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2')",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON camera BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, {cols}) VALUES (new.id, {new_vals}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON camera BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {cols} ON camera BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {cols}) VALUES ('delete', old.id, {old_vals}); "
+        f"INSERT INTO {FTS_TABLE}(rowid, {cols}) VALUES (new.id, {new_vals}); END",
+    ]
+
+
+def drop_fulltext_index(engine=None):
+    """Xóa full-text index (bảng FTS, trigger, GIN index) nếu có."""
+    engine = engine or db.engine
+    dialect = engine.dialect.name
+
+    with engine.begin() as conn:
+        if dialect == "sqlite":
+            for suffix in ("ai", "ad", "au"):
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}"))
+            conn.execute(text(f"DROP TABLE IF EXISTS {FTS_TABLE}"))
+        elif dialect == "postgresql":
+            for field in FTS_FIELDS:
+                conn.execute(text(f"DROP INDEX IF EXISTS {_pg_index_name(field)}"))
+
+    _availability.invalidate(engine)
+
+
+def ensure_fulltext_index(engine=None, rebuild=False, recreate=False):
+    """
+    Tạo full-text index nếu chưa có (idempotent).
+
+    Args:
+        engine: SQLAlchemy engine (mặc định db.engine)
+        rebuild: Với SQLite, nạp lại toàn bộ nội dung FTS từ bảng camera
+        recreate: Xóa và tạo lại index (dùng khi cấu trúc index thay đổi)
+
+    Returns:
+        True nếu dialect được hỗ trợ và index đã sẵn sàng, False nếu không.
+    """
+    engine = engine or db.engine
+    dialect = engine.dialect.name
+    if recreate:
+        drop_fulltext_index(engine)
+
+    with engine.begin() as conn:
+        if dialect == "sqlite":
+            existed = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": FTS_TABLE},
+            ).first()
+            for statement in _sqlite_ddl():
+                conn.execute(text(statement))
+            # Bảng mới tạo chưa có dữ liệu của các camera đã tồn tại
+            if rebuild or not existed:
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        elif dialect == "postgresql":
+            for field in FTS_FIELDS:
+                conn.execute(text(
+                    f"CREATE INDEX IF NOT EXISTS {_pg_index_name(field)} ON camera "
+                    f"USING gin (to_tsvector('simple', coalesce({_norm_column(field)}, '')))"
+                ))
+        else:
+            return False
+
+    _availability.invalidate(engine)
+    return True
+
+
+def fulltext_available(engine=None):
+    """Kiểm tra full-text index đã được tạo trên database hiện tại chưa."""
+    return _availability.get(engine or db.engine, _index_exists)
+
+
+def _index_exists(engine):
+    dialect = engine.dialect.name
+    with engine.connect() as conn:
+        if dialect == "sqlite":
+            return conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                {"name": FTS_TABLE},
+            ).first() is not None
+        if dialect == "postgresql":
+            return conn.execute(
+                text("SELECT 1 FROM pg_indexes WHERE indexname = :name"),
+                {"name": _pg_index_name(FTS_FIELDS[0])},
+            ).first() is not None
+    return False
+
+
+def build_match_query(field_values):
+    """
+    Tạo biểu thức MATCH của FTS5: mỗi token là một prefix query giới hạn theo cột,
+    ví dụ ``owner_name_norm : "nguyen"* AND ward_norm : "dong"*``.
+    """
+    clauses = []
+    for field, value in field_values.items():
+        for token in tokenize_query(value):
+            clauses.append(f'{_norm_column(field)} : "{token}"*')
+    return " AND ".join(clauses)
+
+
+def fulltext_fields(field_values, engine=None):
+    """Các trường trong ``field_values`` được full-text index xử lý (rỗng nếu chưa có index)."""
+    fields = [
+        field for field in FTS_FIELDS
+        if field_values.get(field) and tokenize_query(field_values[field])
+    ]
+    if not fields or not fulltext_available(engine):
+        return []
+    return fields
+
+
+def fulltext_criterion(fields, name, engine=None):
+    """
+    Điều kiện full-text dùng bindparam (giá trị lấy từ ``fulltext_params``), để
+    cùng tập trường luôn sinh cùng một câu SQL và trúng compiled cache.
+    """
+    engine = engine or db.engine
+    if engine.dialect.name == "sqlite":
+        fts = table(FTS_TABLE, column("rowid"))
+        subquery = select(fts.c.rowid).where(text(f"{FTS_TABLE} MATCH :{name}"))
+        return Camera.id.in_(subquery)
+
+    criteria = []
+    for field in fields:
+        vector = func.to_tsvector("simple", func.coalesce(getattr(Camera, _norm_column(field)), ""))
+        ts_query = func.to_tsquery("simple", bindparam(f"{name}_{field}", type_=String))
+        criteria.append(vector.op("@@")(ts_query))
+    return and_(*criteria)
+
+
+def fulltext_params(field_values, name, engine=None):
+    """Giá trị bindparam cho ``fulltext_criterion`` với cùng ``name``."""
+    engine = engine or db.engine
+    if engine.dialect.name == "sqlite":
+        return {name: build_match_query(field_values)}
+    return {
+        f"{name}_{field}": " & ".join(f"{token}:*" for token in tokenize_query(value))
+        for field, value in field_values.items()
+    }
+
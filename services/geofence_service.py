@@ -0,0 +1,402 @@
+"""
+Tìm camera trong đa giác (GeoJSON Polygon / MultiPolygon) và geofence đã lưu.
+
+Tìm kiếm theo đa giác:
+
+1. Lọc sơ bộ theo khung bao từng đa giác (``multi_bbox_criteria``: R*Tree trên
+   SQLite, index latitude/longitude nếu chưa có R*Tree). PostgreSQL lọc chính
+   xác luôn bằng ``ST_Within``.
+2. Kiểm tra điểm trong đa giác (ray casting, quy tắc chẵn-lẻ) vector hóa bằng
+   NumPy cho ma trận camera x cạnh; lỗ (vòng trong) được trừ ra.
+
+Điểm nằm trên biên (cạnh hoặc đỉnh của vòng ngoài / lỗ) không tính là bên
+trong, giống ``ST_Within``: tập geofence tính lại toàn bộ trên PostgreSQL
+(``ST_Within``) và cập nhật tăng dần bằng NumPy dùng cùng một vị từ.
+
+Geofence: đa giác có tên được lưu trong bảng ``geofence`` kèm tập id camera
+nằm trong đó (``geofence_camera``), giống saved search: tạo / refresh tính lại
+toàn bộ, listener của ``services.camera_events`` chỉ kiểm tra lại các camera
+vừa thay đổi (từ snapshot, không cần query camera).
+
+Tọa độ GeoJSON theo thứ tự [lon, lat]; đa giác được xét trên mặt phẳng
+lat/lon (như ST_Within với SRID 4326).
+"""
+import json
+
+import numpy as np
+from sqlalchemy import and_, insert, or_, text
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import Camera, Geofence, GeofenceCamera, db
+from services.projections import projection_columns
+from services.spatial_index import multi_bbox_criteria
+
+MAX_POLYGON_VERTICES = 10000
+# Giới hạn kích thước ma trận điểm x cạnh mỗi lần tính
+PIP_CHUNK_CELLS = 2000000
+# Số id tối đa trong một mệnh đề IN khi cập nhật tăng dần
+CHANGE_CHUNK_SIZE = 500
+
+
+def _parse_ring(ring, label):
+    try:
+        points = np.array(ring, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError(f"{label}: tọa độ không hợp lệ")
+    if points.ndim != 2 or points.shape[1] < 2:
+        raise ValueError(f"{label}: tọa độ phải là danh sách [lon, lat]")
+    points = points[:, :2]
+    if not np.isfinite(points).all():
+        raise ValueError(f"{label}: tọa độ không hợp lệ")
+    if not ((-180 <= points[:, 0]) & (points[:, 0] <= 180)
+            & (-90 <= points[:, 1]) & (points[:, 1] <= 90)).all():
+        raise ValueError(f"{label}: tọa độ ngoài phạm vi")
+    # Vòng GeoJSON khép kín (điểm cuối = điểm đầu); bỏ điểm lặp, cạnh cuối được tự nối lại
+    if len(points) > 1 and (points[0] == points[-1]).all():
+        points = points[:-1]
+    if len(points) < 3:
+        raise ValueError(f"{label}: vòng cần ít nhất 3 đỉnh")
+    return points
+
+
+def _polygon_coordinates(geojson):
+    """list tọa độ Polygon (list vòng) từ Geometry / Feature / FeatureCollection."""
+    if not isinstance(geojson, dict):
+        raise ValueError("GeoJSON phải là object")
+    kind = geojson.get("type")
+    if kind == "FeatureCollection":
+        polygons = []
+        for feature in geojson.get("features") or []:
+            polygons.extend(_polygon_coordinates(feature))
+        return polygons
+    if kind == "Feature":
+        return _polygon_coordinates(geojson.get("geometry"))
+    coordinates = geojson.get("coordinates")
+    if not isinstance(coordinates, list) or not coordinates:
+        raise ValueError("GeoJSON thiếu coordinates")
+    if kind == "Polygon":
+        return [coordinates]
+    if kind == "MultiPolygon":
+        return coordinates
+    raise ValueError(f"Chỉ hỗ trợ Polygon / MultiPolygon (nhận: {kind})")
+
+
+def parse_polygons(geojson):
+    """
+    Đa giác từ GeoJSON.
+
+    Args:
+        geojson: Polygon, MultiPolygon, Feature hoặc FeatureCollection chứa chúng
+
+    Returns:
+        list đa giác, mỗi đa giác là list vòng (mảng (k, 2) [lon, lat]),
+        vòng đầu là biên ngoài, các vòng sau là lỗ
+
+    Raises:
+        ValueError: nếu GeoJSON không hợp lệ hoặc quá nhiều đỉnh
+    """
+    polygons = []
+    vertices = 0
+    for position, rings in enumerate(_polygon_coordinates(geojson)):
+        if not isinstance(rings, list) or not rings:
+            raise ValueError(f"Đa giác #{position} không có vòng nào")
+        parsed = [
+            _parse_ring(ring, f"Đa giác #{position}, vòng #{index}")
+            for index, ring in enumerate(rings)
+        ]
+        vertices += sum(len(ring) for ring in parsed)
+        polygons.append(parsed)
+    if not polygons:
+        raise ValueError("GeoJSON không có đa giác nào")
+    if vertices > MAX_POLYGON_VERTICES:
+        raise ValueError(f"Tối đa {MAX_POLYGON_VERTICES} đỉnh")
+    return polygons
+
+
+def to_geojson(polygons):
+    """MultiPolygon GeoJSON (vòng khép kín) từ kết quả ``parse_polygons``."""
+    return {
+        "type": "MultiPolygon",
+        "coordinates": [
+            [np.vstack((ring, ring[:1])).tolist() for ring in polygon]
+            for polygon in polygons
+        ],
+    }
+
+
+def polygon_bounds(polygons):
+    """list khung bao (min_lat, max_lat, min_lon, max_lon) của từng đa giác."""
+    boxes = []
+    for polygon in polygons:
+        outer = polygon[0]
+        boxes.append((
+            float(outer[:, 1].min()), float(outer[:, 1].max()),
+            float(outer[:, 0].min()), float(outer[:, 0].max()),
+        ))
+    return boxes
+
+
+def _points_in_ring(lons, lats, ring):
+    """(bên trong theo quy tắc chẵn-lẻ, nằm trên biên) của các điểm so với một vòng."""
+    inside = np.zeros(len(lons), dtype=bool)
+    on_boundary = np.zeros(len(lons), dtype=bool)
+    x1, y1 = ring[:, 0], ring[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    step = max(1, PIP_CHUNK_CELLS // len(ring))
+    for start in range(0, len(lons), step):
+        px = lons[start:start + step, None]
+        py = lats[start:start + step, None]
+        straddles = (y1 > py) != (y2 > py)
+        # Cạnh nằm ngang không bao giờ straddles, mẫu số thay 1 để tránh chia 0
+        dy = np.where(y2 != y1, y2 - y1, 1.0)
+        crossing_x = x1 + (py - y1) * (x2 - x1) / dy
+        crossings = np.count_nonzero(straddles & (px < crossing_x), axis=1)
+        inside[start:start + step] = crossings % 2 == 1
+        # Thẳng hàng với cạnh (tích chéo bằng 0) và nằm trong khung bao của cạnh
+        collinear = (px - x1) * (y2 - y1) == (py - y1) * (x2 - x1)
+        within = (
+            (np.minimum(x1, x2) <= px) & (px <= np.maximum(x1, x2))
+            & (np.minimum(y1, y2) <= py) & (py <= np.maximum(y1, y2))
+        )
+        on_boundary[start:start + step] = (collinear & within).any(axis=1)
+    return inside, on_boundary
+
+
+def points_in_polygons(lats, lons, polygons):
+    """Mảng bool: điểm nằm trong phần trong của ít nhất một đa giác (trừ lỗ và biên)."""
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    result = np.zeros(len(lats), dtype=bool)
+    for polygon, (min_lat, max_lat, min_lon, max_lon) in zip(polygons, polygon_bounds(polygons)):
+        candidates = np.flatnonzero(
+            ~result & (lats >= min_lat) & (lats <= max_lat) & (lons >= min_lon) & (lons <= max_lon)
+        )
+        if not len(candidates):
+            continue
+        inside, on_boundary = _points_in_ring(lons[candidates], lats[candidates], polygon[0])
+        inside &= ~on_boundary
+        for hole in polygon[1:]:
+            in_hole, on_hole = _points_in_ring(lons[candidates], lats[candidates], hole)
+            inside &= ~(in_hole | on_hole)
+        result[candidates[inside]] = True
+    return result
+
+
+def _query_rows(polygons, columns, extra_criteria=()):
+    """Camera trong các đa giác (lọc khung bao trong DB rồi kiểm tra chính xác)."""
+    query = Camera.query.with_entities(*columns).filter(
+        Camera.latitude.isnot(None),
+        Camera.longitude.isnot(None),
+        *multi_bbox_criteria(polygon_bounds(polygons)),
+        *extra_criteria,
+    )
+    if db.engine.dialect.name == "postgresql":
+        rows = query.filter(text(
+            "ST_Within("
+            "ST_SetSRID(ST_MakePoint(camera.longitude, camera.latitude), 4326), "
+            "ST_SetSRID(ST_GeomFromGeoJSON(:geometry), 4326)"
+            ")"
+        )).params(geometry=json.dumps(to_geojson(polygons))).order_by(Camera.id).all()
+        return rows
+
+    rows = query.order_by(Camera.id).all()
+    if not rows:
+        return []
+    inside = points_in_polygons(
+        [row.latitude for row in rows], [row.longitude for row in rows], polygons
+    )
+    return [row for row, keep in zip(rows, inside.tolist()) if keep]
+
+
+def _position(snapshot):
+    """(lat, lon) từ snapshot camera; None nếu không có snapshot hoặc thiếu tọa độ."""
+    if snapshot is None or snapshot.get("latitude") is None or snapshot.get("longitude") is None:
+        return None
+    return (snapshot["latitude"], snapshot["longitude"])
+
+
+def _in_bounds(geofence, position):
+    return (position is not None
+            and geofence.min_lat <= position[0] <= geofence.max_lat
+            and geofence.min_lon <= position[1] <= geofence.max_lon)
+
+
+def camera_dict(row):
+    return {
+        "id": row.id,
+        "lat": row.latitude,
+        "lon": row.longitude,
+        "system": row.system_type or "Chưa phân loại",
+        "owner": row.owner_name,
+        "org": row.organization_name,
+        "address": row.address_street,
+        "ward": row.ward,
+        "province": row.province,
+    }
+
+
+def cameras_in_polygons(polygons):
+    """
+    Camera nằm trong các đa giác (kết quả ``parse_polygons``).
+
+    Returns:
+        list dict camera, sắp theo id
+    """
+    return [camera_dict(row) for row in _query_rows(polygons, projection_columns("map"))]
+
+
+class GeofenceService:
+    @staticmethod
+    def list_all():
+        return Geofence.query.order_by(Geofence.name).all()
+
+    @staticmethod
+    def get(geofence_id):
+        if not geofence_id:
+            return None
+        return db.session.get(Geofence, geofence_id)
+
+    @staticmethod
+    def create(user_id, name, geojson):
+        """
+        Lưu geofence và tính tập camera.
+
+        Raises:
+            ValueError: nếu thiếu tên hoặc GeoJSON không hợp lệ
+        """
+        name = (name or "").strip()
+        if not name:
+            raise ValueError("Thiếu tên geofence")
+        polygons = parse_polygons(geojson)
+        boxes = polygon_bounds(polygons)
+        geofence = Geofence(
+            name=name,
+            geometry=json.dumps(to_geojson(polygons)),
+            min_lat=min(box[0] for box in boxes),
+            max_lat=max(box[1] for box in boxes),
+            min_lon=min(box[2] for box in boxes),
+            max_lon=max(box[3] for box in boxes),
+            created_by=user_id,
+        )
+        db.session.add(geofence)
+        db.session.flush()
+        GeofenceService.refresh(geofence)
+        return geofence
+
+    @staticmethod
+    def delete(geofence):
+        GeofenceCamera.query.filter_by(geofence_id=geofence.id).delete(synchronize_session=False)
+        db.session.delete(geofence)
+        db.session.commit()
+
+    @staticmethod
+    def refresh(geofence):
+        """Tính lại toàn bộ tập camera. Returns: số camera."""
+        polygons = parse_polygons(geofence.get_geometry())
+        camera_ids = [row.id for row in _query_rows(polygons, [Camera.id, Camera.latitude, Camera.longitude])]
+        GeofenceCamera.query.filter_by(geofence_id=geofence.id).delete(synchronize_session=False)
+        if camera_ids:
+            db.session.execute(
+                insert(GeofenceCamera),
+                [{"geofence_id": geofence.id, "camera_id": camera_id} for camera_id in camera_ids],
+            )
+        geofence.camera_count = len(camera_ids)
+        geofence.refreshed_at = db.func.now()
+        db.session.commit()
+        return geofence.camera_count
+
+    @staticmethod
+    def get_cameras(geofence):
+        """Camera trong geofence, đọc từ tập đã materialize (sắp theo id)."""
+        rows = (
+            Camera.query.with_entities(*projection_columns("map"))
+            .join(GeofenceCamera, GeofenceCamera.camera_id == Camera.id)
+            .filter(GeofenceCamera.geofence_id == geofence.id)
+            .order_by(Camera.id)
+            .all()
+        )
+        return [camera_dict(row) for row in rows]
+
+    @staticmethod
+    def apply_camera_changes(changes, data_version=None):
+        """
+        Listener của camera_events: cập nhật tăng dần tập camera của các geofence.
+
+        Chỉ xét camera đổi vị trí (tạo, xóa hoặc đổi tọa độ), và chỉ nạp các
+        geofence có khung bao chứa vị trí cũ hoặc mới của chúng: camera nằm
+        ngoài khung bao cả trước lẫn sau khi ghi không thể vào / ra geofence.
+        """
+        # id -> (vị trí trước, vị trí sau); vị trí là (lat, lon) hoặc None nếu
+        # chưa có / đã xóa / không có tọa độ. Nhiều thay đổi của cùng camera:
+        # lấy vị trí trước của thay đổi đầu và vị trí sau của thay đổi cuối.
+        moves = {}
+        for change in changes:
+            before = moves[change.camera_id][0] if change.camera_id in moves else _position(change.old)
+            moves[change.camera_id] = (before, _position(change.new))
+        moves = {camera_id: move for camera_id, move in moves.items() if move[0] != move[1]}
+        if not moves:
+            return
+
+        points = sorted({point for move in moves.values() for point in move if point is not None})
+        geofences = {}
+        for start in range(0, len(points), CHANGE_CHUNK_SIZE):
+            chunk = points[start:start + CHANGE_CHUNK_SIZE]
+            for geofence in Geofence.query.filter(or_(*[
+                and_(Geofence.min_lat <= lat, Geofence.max_lat >= lat,
+                     Geofence.min_lon <= lon, Geofence.max_lon >= lon)
+                for lat, lon in chunk
+            ])):
+                geofences[geofence.id] = geofence
+        if not geofences:
+            return
+
+        try:
+            for geofence_id in sorted(geofences):
+                geofence = geofences[geofence_id]
+                relevant = sorted(
+                    camera_id for camera_id, (before, after) in moves.items()
+                    if _in_bounds(geofence, before) or _in_bounds(geofence, after)
+                )
+                polygons = None
+                for start in range(0, len(relevant), CHANGE_CHUNK_SIZE):
+                    chunk = relevant[start:start + CHANGE_CHUNK_SIZE]
+                    located = [camera_id for camera_id in chunk if _in_bounds(geofence, moves[camera_id][1])]
+                    matched = set()
+                    if located:
+                        if polygons is None:
+                            polygons = parse_polygons(geofence.get_geometry())
+                        inside = points_in_polygons(
+                            [moves[camera_id][1][0] for camera_id in located],
+                            [moves[camera_id][1][1] for camera_id in located],
+                            polygons,
+                        )
+                        matched = {camera_id for camera_id, keep in zip(located, inside.tolist()) if keep}
+                    GeofenceService._apply_chunk(geofence, chunk, matched)
+            db.session.commit()
+        except SQLAlchemyError:
+            db.session.rollback()
+            raise
+
+    @staticmethod
+    def _apply_chunk(geofence, changed_ids, matched):
+        existing = {
+            row[0]
+            for row in db.session.query(GeofenceCamera.camera_id).filter(
+                GeofenceCamera.geofence_id == geofence.id,
+                GeofenceCamera.camera_id.in_(changed_ids),
+            )
+        }
+        to_add = matched - existing
+        to_remove = existing - matched
+        if to_remove:
+            GeofenceCamera.query.filter(
+                GeofenceCamera.geofence_id == geofence.id,
+                GeofenceCamera.camera_id.in_(to_remove),
+            ).delete(synchronize_session=False)
+        if to_add:
+            db.session.execute(
+                insert(GeofenceCamera),
+                [{"geofence_id": geofence.id, "camera_id": camera_id} for camera_id in to_add],
+            )
+        if to_add or to_remove:
+            geofence.camera_count = (geofence.camera_count or 0) + len(to_add) - len(to_remove)
@@ -5,6 +5,7 @@ from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from models import Camera, db
 from parse_m2 import parse_m2_to_records
 from security_utils import log_audit
+from services import camera_events
 
 
 def process_import(
@@ -19,6 +20,18 @@ def process_import(
     errors = 0
     error_details = []
     batch_count = 0
+    batch_cameras = []
+
+    def commit_batch():
+        # Flush để có id, chụp snapshot trước commit (tránh reload từng bản ghi)
+        db.session.flush()
+        changes = [
+            camera_events.CameraChange("create", cam.id, None, camera_events.snapshot(cam))
+            for cam in batch_cameras
+        ]
+        db.session.commit()
+        batch_cameras.clear()
+        camera_events.publish(changes)
 
     with app.app_context():
         records = parse_m2_to_records(filepath)
@@ -83,13 +96,15 @@ def process_import(
                 cam.set_json("network_types", record.get("network_types", []))
                 cam.set_json("install_areas", record.get("install_areas", []))
                 cam.set_latlon_components()
+                cam.set_search_components()
 
                 db.session.add(cam)
+                batch_cameras.append(cam)
                 success += 1
                 batch_count += 1
 
                 if batch_count >= batch_size:
-                    db.session.commit()
+                    commit_batch()
                     batch_count = 0
             except (ValueError, TypeError, AttributeError) as exc:
                 errors += 1
@@ -112,6 +127,7 @@ def process_import(
                     exc_info=True,
                 )
                 db.session.rollback()
+                batch_cameras.clear()
                 camera_info = ""
                 if record.get("system_type"):
                     camera_info = f" - Hệ thống: {record.get('system_type')}"
@@ -121,7 +137,7 @@ def process_import(
                 continue
 
         if batch_count > 0:
-            db.session.commit()
+            commit_batch()
 
         if user_id:
             log_audit(
@@ -0,0 +1,111 @@
+"""
+Mã hóa Mapbox Vector Tile (MVT 2.1) cho lớp điểm.
+
+Chỉ cần kiểu hình học POINT nên encoder protobuf được viết tay (varint,
+length-delimited) thay vì thêm phụ thuộc mapbox-vector-tile/protobuf.
+Đặc tả: https://github.com/mapbox/vector-tile-spec/tree/master/2.1
+"""
+import struct
+
+DEFAULT_EXTENT = 4096
+
+# Kiểu wire protobuf
+_VARINT = 0
+_FIXED64 = 1
+_LENGTH_DELIMITED = 2
+
+# GeomType.POINT và lệnh MoveTo (id 1) với count 1
+_POINT = 1
+_MOVE_TO_ONE = (1 & 0x7) | (1 << 3)
+
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 31)
+
+
+def _key(field, wire_type):
+    return _varint((field << 3) | wire_type)
+
+
+def _field_varint(field, value):
+    return _key(field, _VARINT) + _varint(value)
+
+
+def _field_bytes(field, payload):
+    return _key(field, _LENGTH_DELIMITED) + _varint(len(payload)) + payload
+
+
+def _packed(field, values):
+    return _field_bytes(field, b"".join(_varint(value) for value in values))
+
+
+def _encode_value(value):
+    # Value.string_value = 1, double_value = 3, int_value = 4, bool_value = 7
+    if isinstance(value, bool):
+        return _field_varint(7, int(value))
+    if isinstance(value, int) and value >= 0:
+        return _field_varint(4, value)
+    if isinstance(value, float):
+        return _key(3, _FIXED64) + struct.pack("<d", value)
+    return _field_bytes(1, str(value).encode("utf-8"))
+
+
+def encode_point_layer(name, features, extent=DEFAULT_EXTENT):
+    """
+    Một layer MVT gồm các điểm.
+
+    Args:
+        name: tên layer
+        features: iterable (feature_id, x, y, properties) với x/y là tọa độ
+            nguyên trong tile (0..extent, có thể lệch ra ngoài trong vùng buffer)
+            và properties là dict giá trị str/int/float/bool (None bị bỏ qua)
+
+    Returns:
+        bytes của message Layer
+    """
+    keys, key_index = [], {}
+    values, value_index = [], {}
+    encoded_features = []
+    for feature_id, x, y, properties in features:
+        tags = []
+        for key, value in properties.items():
+            if value is None:
+                continue
+            if key not in key_index:
+                key_index[key] = len(keys)
+                keys.append(key)
+            value_key = (type(value).__name__, value)
+            if value_key not in value_index:
+                value_index[value_key] = len(values)
+                values.append(value)
+            tags.extend((key_index[key], value_index[value_key]))
+        feature = _field_varint(1, feature_id)
+        if tags:
+            feature += _packed(2, tags)
+        feature += _field_varint(3, _POINT)
+        feature += _packed(4, [_MOVE_TO_ONE, _zigzag(int(x)), _zigzag(int(y))])
+        encoded_features.append(feature)
+
+    layer = _field_varint(15, 2) + _field_bytes(1, name.encode("utf-8"))
+    layer += b"".join(_field_bytes(2, feature) for feature in encoded_features)
+    layer += b"".join(_field_bytes(3, key.encode("utf-8")) for key in keys)
+    layer += b"".join(_field_bytes(4, _encode_value(value)) for value in values)
+    layer += _field_varint(5, extent)
+    return layer
+
+
+def encode_tile(layers):
+    """Tile từ các layer đã mã hóa (Tile.layers = 3)."""
+    return b"".join(_field_bytes(3, layer) for layer in layers)
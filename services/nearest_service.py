@@ -0,0 +1,279 @@
+"""
+Tìm k camera gần một điểm nhất (``/map/api/nearest``).
+
+Tọa độ camera được đổi sang vector đơn vị 3D (x, y, z trên mặt cầu): khoảng
+cách Euclid (dây cung) giữa hai vector tăng đơn điệu theo khoảng cách mặt cầu
+(haversine), nên KD-tree thông thường trên 3 chiều cho đúng thứ tự gần-xa mà
+không bị méo theo vĩ độ hay đứt ở kinh tuyến 180. Khoảng cách trả về được đổi
+từ dây cung sang mét.
+
+KD-tree là các mảng NumPy tĩnh (dựng một lần, lá ``LEAF_SIZE`` điểm được tính
+vector hóa). Khi data version đổi, cây mới được dựng trên luồng dựng index
+riêng (``background_jobs.start_index_rebuild``); trong lúc đó request vẫn
+dùng cây cũ.
+"""
+import heapq
+import threading
+import time
+
+import numpy as np
+from flask import current_app
+
+from background_jobs import start_index_rebuild
+from models import Camera, db
+from services.cache_service import get_data_version
+from services.cluster_service import point_coordinates
+
+EARTH_RADIUS_M = 6371000
+LEAF_SIZE = 16
+DEFAULT_K = 10
+MAX_K = 100
+UNCLASSIFIED = "Chưa phân loại"
+# Khi không có cache (data version = 0) thì dựng lại theo tuổi cây
+FALLBACK_MAX_AGE = 300
+
+_indexes = {}
+_rebuilding = set()
+_lock = threading.Lock()
+
+
+def unit_vectors(lat, lon):
+    """Mảng (n, 3) vector đơn vị từ mảng lat/lon (độ)."""
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+def chord_to_meters(chord):
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.minimum(np.asarray(chord) / 2, 1.0))
+
+
+class KDTree:
+    """KD-tree tĩnh trên các điểm 3D, truy vấn k láng giềng gần nhất."""
+
+    def __init__(self, points):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        self.order = np.arange(len(points))
+        # Mỗi node: [start, end, chiều cắt (-1 nếu là lá), giá trị cắt, con trái, con phải]
+        self.starts, self.ends, self.dims, self.splits, self.lefts, self.rights = [], [], [], [], [], []
+        if len(points):
+            self._build(points)
+        self.points = points[self.order]
+
+    def _add_node(self, start, end):
+        self.starts.append(start)
+        self.ends.append(end)
+        self.dims.append(-1)
+        self.splits.append(0.0)
+        self.lefts.append(-1)
+        self.rights.append(-1)
+        return len(self.starts) - 1
+
+    def _build(self, points):
+        stack = [self._add_node(0, len(points))]
+        while stack:
+            node = stack.pop()
+            start, end = self.starts[node], self.ends[node]
+            if end - start <= LEAF_SIZE:
+                continue
+            segment = self.order[start:end]
+            coords = points[segment]
+            dim = int(np.argmax(coords.max(axis=0) - coords.min(axis=0)))
+            mid = (end - start) // 2
+            partition = np.argpartition(coords[:, dim], mid)
+            self.order[start:end] = segment[partition]
+            self.dims[node] = dim
+            self.splits[node] = float(points[self.order[start + mid], dim])
+            left = self._add_node(start, start + mid)
+            right = self._add_node(start + mid, end)
+            self.lefts[node], self.rights[node] = left, right
+            stack.extend((left, right))
+
+    def query(self, target, k, mask=None):
+        """
+        k điểm gần ``target`` nhất.
+
+        Args:
+            target: vector 3D
+            k: số điểm cần lấy
+            mask: mảng bool theo thứ tự điểm trong cây (``points``), None = mọi điểm
+
+        Returns:
+            list (khoảng cách dây cung, chỉ số điểm gốc), gần nhất trước
+        """
+        if not self.starts or k <= 0:
+            return []
+        target = np.asarray(target, dtype=np.float64)
+        # Max-heap k kết quả tốt nhất: (-d2, position)
+        best = []
+        # Min-heap node cần thăm theo cận dưới khoảng cách: (d2_lower, node)
+        pending = [(0.0, 0)]
+        while pending:
+            lower, node = heapq.heappop(pending)
+            if len(best) == k and lower >= -best[0][0]:
+                break
+            dim = self.dims[node]
+            if dim < 0:
+                start, end = self.starts[node], self.ends[node]
+                diff = self.points[start:end] - target
+                d2 = np.einsum("ij,ij->i", diff, diff)
+                positions = np.arange(start, end)
+                if mask is not None:
+                    keep = mask[start:end]
+                    d2, positions = d2[keep], positions[keep]
+                for distance, position in zip(d2.tolist(), positions.tolist()):
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, position))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, position))
+                continue
+            gap = float(target[dim]) - self.splits[node]
+            near, far = (self.lefts[node], self.rights[node]) if gap < 0 else (self.rights[node], self.lefts[node])
+            heapq.heappush(pending, (lower, near))
+            heapq.heappush(pending, (max(lower, gap * gap), far))
+
+        results = sorted((-negative, position) for negative, position in best)
+        return [(float(np.sqrt(d2)), int(self.order[position])) for d2, position in results]
+
+
+class NearestIndex:
+    """KD-tree cùng thuộc tính camera để lọc (system_type, sharing_scope)."""
+
+    def __init__(self, rows):
+        ids, lats, lons, systems, shared = [], [], [], [], []
+        for row in rows:
+            lat, lon = point_coordinates(row)
+            if lat is None:
+                continue
+            ids.append(row["id"])
+            lats.append(lat)
+            lons.append(lon)
+            systems.append(row.get("system_type") or UNCLASSIFIED)
+            shared.append(bool(row.get("sharing_scope")))
+        self.ids = np.array(ids, dtype=np.int64)
+        self.lats = np.array(lats, dtype=np.float64)
+        self.lons = np.array(lons, dtype=np.float64)
+        self.system_names = sorted(set(systems))
+        codes = {name: code for code, name in enumerate(self.system_names)}
+        self.system_codes = np.array([codes[name] for name in systems], dtype=np.int32)
+        self.shared = np.array(shared, dtype=bool)
+        self.tree = KDTree(unit_vectors(self.lats, self.lons))
+        # Mask lọc tính theo thứ tự điểm trong cây, cache theo bộ lọc (index bất biến)
+        self._masks = {}
+        self.version = None
+        self.built_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _mask(self, system=None, shared=None):
+        if system is None and shared is None:
+            return None
+        if system is not None and system not in self.system_names:
+            return np.zeros(len(self.ids), dtype=bool)
+        key = (system, shared)
+        mask = self._masks.get(key)
+        if mask is None:
+            order = self.tree.order
+            mask = np.ones(len(self.ids), dtype=bool)
+            if system is not None:
+                mask &= self.system_codes[order] == self.system_names.index(system)
+            if shared is not None:
+                mask &= self.shared[order] == bool(shared)
+            self._masks[key] = mask
+        return mask
+
+    def nearest(self, lat, lon, k=DEFAULT_K, system=None, shared=None):
+        """
+        k camera gần (lat, lon) nhất, có thể lọc theo system_type / sharing_scope.
+
+        Returns:
+            list dict (id, lat, lon, system, distance mét), gần nhất trước
+        """
+        mask = self._mask(system, shared)
+        if mask is not None and not mask.any():
+            return []
+        target = unit_vectors([lat], [lon])[0]
+        results = []
+        for chord, i in self.tree.query(target, k, mask):
+            results.append({
+                "id": int(self.ids[i]),
+                "lat": float(self.lats[i]),
+                "lon": float(self.lons[i]),
+                "system": self.system_names[self.system_codes[i]],
+                "distance": round(float(chord_to_meters(chord))),
+            })
+        return results
+
+
+def _build_index():
+    version = get_data_version()
+    rows = (
+        db.session.query(
+            Camera.id, Camera.latitude, Camera.longitude, Camera.latlon,
+            Camera.system_type, Camera.sharing_scope,
+        )
+        .filter(
+            (Camera.latitude.isnot(None) & Camera.longitude.isnot(None))
+            | Camera.latlon.isnot(None)
+        )
+        .all()
+    )
+    index = NearestIndex(row._mapping for row in rows)
+    index.version = version
+    return index
+
+
+def _schedule_rebuild(app, key):
+    with _lock:
+        if key in _rebuilding:
+            return
+        _rebuilding.add(key)
+
+    def _run():
+        try:
+            with app.app_context():
+                _indexes[key] = _build_index()
+        except Exception as exc:  # noqa: BLE001
+            # Giữ cây cũ, lần gọi sau sẽ thử dựng lại
+            app.logger.error(f"Nearest index rebuild failed: {exc}", exc_info=True)
+        finally:
+            with _lock:
+                _rebuilding.discard(key)
+
+    start_index_rebuild(_run)
+
+
+def get_nearest_index():
+    """
+    Cây của DB hiện tại. Lần đầu dựng đồng bộ; khi data version đổi thì dựng
+    lại ở background và tạm trả về cây cũ.
+    """
+    version = get_data_version()
+    key = str(db.engine.url)
+    index = _indexes.get(key)
+    if index is None:
+        with _lock:
+            index = _indexes.get(key)
+            if index is None:
+                index = _indexes[key] = _build_index()
+        return index
+
+    outdated = index.version != version if version else (
+        time.monotonic() - index.built_at >= FALLBACK_MAX_AGE
+    )
+    if outdated:
+        _schedule_rebuild(current_app._get_current_object(), key)
+    return index
+
+
+def nearest_cameras(lat, lon, k=DEFAULT_K, system=None, shared=None):
+    """
+    Raises:
+        ValueError: nếu tọa độ không hợp lệ
+    """
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError("Tọa độ không hợp lệ")
+    k = max(1, min(k or DEFAULT_K, MAX_K))
+    return get_nearest_index().nearest(lat, lon, k, system=system, shared=shared)
@@ -0,0 +1,272 @@
+"""
+Phân trang theo con trỏ (keyset / seek pagination).
+
+Thay vì ``OFFSET n`` (càng về sau càng chậm), mỗi trang lọc theo khóa của
+phần tử cuối trang trước (``WHERE id < :last_id ORDER BY id DESC LIMIT n``),
+nên trang sâu cũng rẻ như trang đầu. Con trỏ được mã hóa base64 để client
+coi là chuỗi "opaque".
+
+Con trỏ mang kèm số thứ tự trang nên ``KeysetPagination`` có cùng các thuộc
+tính ``page``/``pages``/``prev_num``/``next_num``/``iter_pages`` với
+Pagination của Flask-SQLAlchemy và dùng chung template; ``cursor_for`` đổi
+số trang (trang đầu, trước, sau) thành con trỏ để dựng link.
+"""
+import base64
+import json
+import math
+
+import numpy as np
+from flask_sqlalchemy.pagination import Pagination
+
+COUNT_EXACT = "exact"
+COUNT_ESTIMATE = "estimate"
+COUNT_NONE = "none"
+
+DEFAULT_COUNT_CAP = 1000
+
+
+def encode_cursor(key, direction="next", page=None):
+    """Mã hóa (key, direction, số trang đích) thành chuỗi con trỏ an toàn cho URL."""
+    payload = {"k": key, "d": direction}
+    if page is not None:
+        payload["p"] = page
+    payload = json.dumps(payload, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _decode(cursor):
+    """(key, direction, page) của con trỏ; (None, "next", 1) nếu rỗng hoặc không hợp lệ."""
+    if not cursor:
+        return None, "next", 1
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        key = payload["k"]
+        direction = payload.get("d", "next")
+        page = payload.get("p")
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return None, "next", 1
+    # Khóa là id số nguyên; giá trị khác (chuỗi, bool, ...) coi như con trỏ hỏng
+    if not _is_int(key):
+        return None, "next", 1
+    if direction not in ("next", "prev"):
+        direction = "next"
+    if not _is_int(page) or page < 1:
+        page = None
+    return key, direction, page
+
+
+def decode_cursor(cursor):
+    """
+    Giải mã con trỏ.
+
+    Returns:
+        (key, direction); (None, "next") nếu con trỏ rỗng hoặc không hợp lệ
+        (tức là trang đầu tiên).
+    """
+    key, direction, _ = _decode(cursor)
+    return key, direction
+
+
+class KeysetPagination:
+    """Kết quả một trang keyset: items, con trỏ trang trước/sau và tổng (tùy chọn)."""
+
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None,
+                 total=None, total_is_estimate=False, page=1):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+        self.total_is_estimate = total_is_estimate
+        self.page = page
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    @property
+    def prev_num(self):
+        return self.page - 1 if self.has_prev else None
+
+    @property
+    def next_num(self):
+        return self.page + 1 if self.has_next else None
+
+    @property
+    def pages(self):
+        """Số trang: theo tổng nếu đếm chính xác, nếu không thì chỉ biết tới trang kế tiếp."""
+        known = self.next_num or self.page
+        if self.total is None or self.total_is_estimate:
+            return known
+        return max(math.ceil(self.total / self.per_page), known)
+
+    def iter_pages(self, left_edge=2, left_current=2, right_current=4, right_edge=2):
+        """
+        Như Pagination.iter_pages nhưng chỉ gồm các trang đi tới được bằng con
+        trỏ: trang đầu, trang trước, trang hiện tại, trang sau (None = dấu "...").
+        """
+        pages = [1]
+        for number in (self.prev_num, self.page, self.next_num):
+            if number and number > pages[-1]:
+                if number > pages[-1] + 1:
+                    pages.append(None)
+                pages.append(number)
+        return iter(pages)
+
+    def cursor_for(self, page_num):
+        """
+        Con trỏ dẫn tới trang ``page_num``: "" cho trang đầu, con trỏ trước/sau
+        cho trang liền kề; None nếu trang đó không đi tới trực tiếp được.
+        """
+        if page_num == 1:
+            return ""
+        if page_num == self.prev_num:
+            return self.prev_cursor
+        if page_num == self.next_num:
+            return self.next_cursor
+        return None
+
+
+def count_query(query, count_mode=COUNT_EXACT, cap=DEFAULT_COUNT_CAP):
+    """
+    Đếm số dòng của query theo chế độ:
+    - "exact": COUNT(*) đầy đủ
+    - "estimate": đếm tối đa ``cap`` dòng (dừng sớm), trả về cờ ước lượng khi chạm trần
+    - "none": không đếm
+
+    Returns:
+        (total, is_estimate)
+    """
+    if count_mode == COUNT_NONE:
+        return None, False
+    unordered = query.order_by(None)
+    if count_mode == COUNT_ESTIMATE:
+        total = unordered.limit(cap).count()
+        return total, total >= cap
+    return unordered.count(), False
+
+
+def keyset_paginate(query, key_column, cursor=None, per_page=50,
+                    count_mode=COUNT_EXACT, count_cap=DEFAULT_COUNT_CAP):
+    """
+    Phân trang query theo ``key_column`` giảm dần (ví dụ Camera.id DESC).
+
+    Args:
+        query: Query chưa có ORDER BY
+        key_column: Cột khóa duy nhất, tăng dần theo thời gian (thường là id)
+        cursor: Con trỏ nhận từ trang trước (None/"" = trang đầu)
+        per_page: Số phần tử mỗi trang
+        count_mode: "exact", "estimate" hoặc "none" (xem count_query)
+
+    Returns:
+        KeysetPagination
+    """
+    key, direction, page = _decode(cursor)
+    key_name = key_column.key
+
+    if direction == "prev" and key is not None:
+        # Đi lùi: lấy các phần tử ngay trên key theo thứ tự tăng rồi đảo lại
+        rows = (
+            query.filter(key_column > key)
+            .order_by(key_column.asc())
+            .limit(per_page + 1)
+            .all()
+        )
+        has_prev = len(rows) > per_page
+        rows = list(reversed(rows[:per_page]))
+        has_next = True
+    else:
+        if key is not None:
+            query_page = query.filter(key_column < key)
+        else:
+            query_page = query
+        rows = query_page.order_by(key_column.desc()).limit(per_page + 1).all()
+        has_next = len(rows) > per_page
+        rows = rows[:per_page]
+        has_prev = key is not None
+
+    page = _page_number(page, key, has_prev)
+    next_cursor = encode_cursor(getattr(rows[-1], key_name), "next", page + 1) if rows and has_next else None
+    prev_cursor = encode_cursor(getattr(rows[0], key_name), "prev", page - 1) if rows and has_prev else None
+
+    total, is_estimate = count_query(query, count_mode, count_cap)
+    return KeysetPagination(
+        rows,
+        per_page,
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor,
+        total=total,
+        total_is_estimate=is_estimate,
+        page=page,
+    )
+
+
+def _page_number(page, key, has_prev):
+    """Số trang hiện tại: trang đầu là 1; con trỏ cũ/không có số trang thì giữ tối thiểu 2."""
+    if key is None or not has_prev:
+        return 1
+    return max(page or 2, 2)
+
+
+class IdListPagination(Pagination):
+    """
+    Phân trang OFFSET trên danh sách id đã lọc sẵn (ví dụ từ index trong bộ nhớ).
+
+    Nhận ``ids`` (đã sắp theo thứ tự hiển thị) và ``loader(page_ids)`` trả về
+    các bản ghi của trang theo đúng thứ tự đó.
+    """
+
+    def _query_items(self):
+        ids = self._query_args["ids"]
+        start = self._query_offset
+        return self._query_args["loader"](ids[start:start + self.per_page])
+
+    def _query_count(self):
+        return len(self._query_args["ids"])
+
+
+def keyset_paginate_ids(ids, loader, cursor=None, per_page=50, count_mode=COUNT_EXACT):
+    """
+    Keyset pagination trên mảng id tăng dần đã lọc sẵn, trả về theo id giảm dần
+    (cùng thứ tự và định dạng con trỏ với ``keyset_paginate``).
+
+    Tổng luôn chính xác vì chỉ là độ dài mảng (trừ khi count_mode="none").
+    """
+    key, direction, page = _decode(cursor)
+
+    if direction == "prev" and key is not None:
+        start = int(np.searchsorted(ids, key, side="right"))
+        window = ids[start:start + per_page + 1]
+        has_prev = len(window) > per_page
+        page_ids = window[:per_page][::-1]
+        has_next = True
+    else:
+        end = len(ids) if key is None else int(np.searchsorted(ids, key, side="left"))
+        window = ids[max(end - per_page - 1, 0):end][::-1]
+        has_next = len(window) > per_page
+        page_ids = window[:per_page]
+        has_prev = key is not None
+
+    rows = loader([int(i) for i in page_ids])
+    page = _page_number(page, key, has_prev)
+    next_cursor = encode_cursor(rows[-1].id, "next", page + 1) if rows and has_next else None
+    prev_cursor = encode_cursor(rows[0].id, "prev", page - 1) if rows and has_prev else None
+
+    total = None if count_mode == COUNT_NONE else len(ids)
+    return KeysetPagination(
+        rows,
+        per_page,
+        next_cursor=next_cursor,
+        prev_cursor=prev_cursor,
+        total=total,
+        page=page,
+    )
@@ -0,0 +1,86 @@
+"""
+Tập cột (projection) khi nạp camera.
+
+Trang danh sách, bản đồ và export chỉ cần vài cột, trong khi ``Camera`` có
+hơn 40 cột gồm mật khẩu, mã xác minh và sáu cột JSON. Các hàm ở đây chuyển
+tên tập cột ("list", "map", "marker", "popup", "export", "detail") hoặc danh
+sách tên trường thành ``load_only`` (ORM, các cột khác bị defer) hoặc danh
+sách cột cho ``with_entities`` (Core select, trả về Row nhẹ hơn đối tượng ORM).
+
+Truy cập cột bị defer trên đối tượng ORM báo lỗi khi bật PROJECTION_RAISELOAD
+(mặc định, trừ production) để tập cột thiếu lộ ra ngay; khi tắt thì lazy load,
+tốn thêm một query mỗi dòng - nên tập cột cần khớp với những gì template hiển thị.
+"""
+from flask import current_app
+from sqlalchemy.orm import load_only
+
+from models import Camera
+
+COLUMN_SETS = {
+    # Bảng kết quả tìm kiếm / danh sách chỉnh sửa
+    "list": [
+        "id", "owner_name", "organization_name", "address_street", "ward", "province",
+        "phone", "camera_index", "system_type", "manufacturer", "latlon", "latitude",
+        "longitude", "static_ip", "sharing_scope",
+    ],
+    # Marker và popup bản đồ
+    "map": [
+        "id", "latitude", "longitude", "latlon", "system_type", "owner_name",
+        "organization_name", "address_street", "ward", "province", "phone", "manufacturer",
+    ],
+    # Marker theo khung nhìn (/map/api/cameras): chỉ tọa độ và hệ thống
+    "marker": ["id", "latitude", "longitude", "system_type"],
+    # Popup bản đồ, nạp theo lô khi người dùng bấm marker
+    "popup": [
+        "id", "owner_name", "organization_name", "address_street", "ward", "province",
+        "phone", "manufacturer", "system_type",
+    ],
+    # Các trường có thể export (không gồm mật khẩu và cột nội bộ)
+    "export": [
+        "id", "owner_name", "organization_name", "address_street", "ward", "province",
+        "phone", "camera_index", "system_type", "monitoring_modes", "storage_types",
+        "retention_days", "manufacturer", "camera_types", "form_factors", "network_types",
+        "install_areas", "latlon", "login_user", "login_domain", "static_ip", "ip_port",
+        "dvr_model", "camera_model", "resolution", "bandwidth", "serial_number",
+        "verification_code", "category", "sharing_scope",
+    ],
+    # Trang chi tiết / sửa: toàn bộ cột
+    "detail": None,
+}
+
+
+def resolve_column_names(columns):
+    """
+    Tên cột cần nạp: None nếu nạp đủ (columns=None hoặc "detail").
+
+    Args:
+        columns: tên tập cột trong COLUMN_SETS hoặc list tên trường
+
+    Raises:
+        ValueError: nếu tên tập cột không tồn tại
+    """
+    if columns is None:
+        return None
+    if isinstance(columns, str):
+        if columns not in COLUMN_SETS:
+            raise ValueError(f"Unknown column set: {columns}")
+        return COLUMN_SETS[columns]
+    names = [name for name in columns if name in Camera.__table__.columns]
+    return ["id"] + [name for name in names if name != "id"]
+
+
+def projection_columns(columns):
+    """Danh sách cột Camera cho ``with_entities`` / ``select``."""
+    names = resolve_column_names(columns)
+    if names is None:
+        return [getattr(Camera, column.key) for column in Camera.__table__.columns]
+    return [getattr(Camera, name) for name in names]
+
+
+def apply_projection(query, columns):
+    """Thêm ``load_only`` vào query ORM theo tập cột (không đổi gì nếu nạp đủ)."""
+    names = resolve_column_names(columns)
+    if names is None:
+        return query
+    raiseload = current_app.config.get("PROJECTION_RAISELOAD", False)
+    return query.options(load_only(*[getattr(Camera, name) for name in names], raiseload=raiseload))
@@ -0,0 +1,148 @@
+"""
+Tìm camera quanh nhiều điểm cùng lúc (``POST /map/api/radius/batch``).
+
+Thay vì một query cho mỗi tâm như ``/map/radius``:
+
+1. Một query duy nhất lấy camera nằm trong khung bao của ít nhất một tâm
+   (``multi_bbox_criteria``: các khung nối OR trong một lần duyệt R*Tree).
+2. Ma trận khoảng cách haversine camera x tâm tính bằng NumPy, so với bán kính
+   từng tâm để ra kết quả mỗi tâm.
+
+Kết quả gồm danh sách (id, khoảng cách) theo từng tâm và tập camera hợp (không
+trùng lặp) kèm thông tin hiển thị, để camera thuộc nhiều vùng chỉ trả về một lần.
+"""
+import math
+
+import numpy as np
+
+from models import Camera
+from services.projections import projection_columns
+from services.spatial_index import multi_bbox_criteria
+
+EARTH_RADIUS_M = 6371000
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+MAX_BATCH_CENTERS = 100
+MAX_BATCH_RADIUS_M = 10000
+
+
+def parse_centers(payload):
+    """
+    Chuẩn hóa danh sách tâm từ JSON request.
+
+    Args:
+        payload: {"centers": [{"lat", "lon", "radius"?, "id"?}, ...], "radius"?: mặc định}
+
+    Returns:
+        list dict (id, lat, lon, radius); id mặc định là vị trí trong danh sách
+
+    Raises:
+        ValueError: nếu dữ liệu thiếu hoặc ngoài giới hạn
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("Body phải là JSON object")
+    centers = payload.get("centers")
+    if not isinstance(centers, list) or not centers:
+        raise ValueError("Thiếu danh sách centers")
+    if len(centers) > MAX_BATCH_CENTERS:
+        raise ValueError(f"Tối đa {MAX_BATCH_CENTERS} tâm mỗi lần")
+    default_radius = payload.get("radius")
+
+    parsed = []
+    for position, center in enumerate(centers):
+        if not isinstance(center, dict):
+            raise ValueError(f"Tâm #{position} phải là object")
+        try:
+            lat = float(center["lat"])
+            lon = float(center["lon"])
+            radius = float(center.get("radius", default_radius))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Tâm #{position} thiếu lat/lon/radius hợp lệ")
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValueError(f"Tâm #{position}: tọa độ không hợp lệ")
+        if not 0 < radius <= MAX_BATCH_RADIUS_M:
+            raise ValueError(f"Tâm #{position}: radius phải trong khoảng (0, {MAX_BATCH_RADIUS_M}] mét")
+        parsed.append({"id": center.get("id", position), "lat": lat, "lon": lon, "radius": radius})
+    return parsed
+
+
+def _bounding_box(lat, lon, radius_m):
+    lat_delta = radius_m / METERS_PER_DEGREE
+    max_abs_lat = min(abs(lat) + lat_delta, 89.9)
+    lon_delta = radius_m / (METERS_PER_DEGREE * math.cos(math.radians(max_abs_lat)))
+    return lat - lat_delta, lat + lat_delta, lon - lon_delta, lon + lon_delta
+
+
+def haversine_matrix(point_lats, point_lons, center_lats, center_lons):
+    """Mảng (n điểm, m tâm) khoảng cách haversine (m)."""
+    phi1 = np.radians(np.asarray(point_lats, dtype=np.float64))[:, None]
+    lam1 = np.radians(np.asarray(point_lons, dtype=np.float64))[:, None]
+    phi2 = np.radians(np.asarray(center_lats, dtype=np.float64))[None, :]
+    lam2 = np.radians(np.asarray(center_lons, dtype=np.float64))[None, :]
+    a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin((lam2 - lam1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def batch_radius_search(centers):
+    """
+    Camera trong bán kính của từng tâm.
+
+    Args:
+        centers: list dict (id, lat, lon, radius), xem ``parse_centers``
+
+    Returns:
+        dict {"centers": [{id, lat, lon, radius, count, cameras: [{id, distance}]}],
+              "cameras": [camera hợp, sắp theo id, kèm ``centers`` chứa nó]}
+    """
+    rows = (
+        Camera.query.with_entities(*projection_columns("map"))
+        .filter(*multi_bbox_criteria([
+            _bounding_box(center["lat"], center["lon"], center["radius"]) for center in centers
+        ]))
+        .order_by(Camera.id)
+        .all()
+    )
+    rows = [row for row in rows if row.latitude is not None and row.longitude is not None]
+
+    results = [
+        {**center, "count": 0, "cameras": []}
+        for center in centers
+    ]
+    if not rows:
+        return {"centers": results, "cameras": []}
+
+    distances = haversine_matrix(
+        [row.latitude for row in rows],
+        [row.longitude for row in rows],
+        [center["lat"] for center in centers],
+        [center["lon"] for center in centers],
+    )
+    inside = distances <= np.array([center["radius"] for center in centers])[None, :]
+
+    # Camera -> danh sách id tâm chứa nó
+    memberships = {}
+    for column, result in enumerate(results):
+        hits = np.flatnonzero(inside[:, column])
+        hits = hits[np.argsort(distances[hits, column], kind="stable")]
+        result["cameras"] = [
+            {"id": rows[i].id, "distance": round(distance)}
+            for i, distance in zip(hits.tolist(), distances[hits, column].tolist())
+        ]
+        result["count"] = len(result["cameras"])
+        for i in hits.tolist():
+            memberships.setdefault(i, []).append(result["id"])
+
+    union = []
+    for i in sorted(memberships):
+        row = rows[i]
+        union.append({
+            "id": row.id,
+            "lat": row.latitude,
+            "lon": row.longitude,
+            "system": row.system_type or "Chưa phân loại",
+            "name": row.owner_name or row.organization_name,
+            "address": row.address_street,
+            "ward": row.ward,
+            "province": row.province,
+            "centers": memberships[i],
+        })
+    return {"centers": results, "cameras": union}
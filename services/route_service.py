@@ -0,0 +1,145 @@
+"""
+Camera dọc tuyến đường (``/map/route``).
+
+Tuyến (danh sách điểm [lat, lon]) được chia thành các đoạn liên tiếp
+``SEGMENTS_PER_CHUNK`` cạnh. Với mỗi đoạn:
+
+1. Lấy camera trong khung bao của đoạn nới thêm ``buffer_m`` (``bbox_criteria``,
+   dùng R*Tree nếu có) - hành lang quanh tuyến thay vì toàn bộ bảng.
+2. Chiếu camera và các cạnh sang mặt phẳng cục bộ (equirectangular quanh vĩ độ
+   giữa đoạn, sai số không đáng kể ở quy mô vài km) và tính khoảng cách chính xác
+   điểm - đoạn thẳng bằng NumPy cho cả ma trận camera x cạnh.
+
+Mỗi camera giữ khoảng cách nhỏ nhất tới tuyến và vị trí chiếu tương ứng dọc
+tuyến (mét tính từ điểm đầu), kết quả sắp theo vị trí đó.
+"""
+import math
+
+import numpy as np
+
+from models import Camera
+from services.projections import projection_columns
+from services.spatial_index import bbox_criteria
+
+EARTH_RADIUS_M = 6371000
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+DEFAULT_BUFFER_M = 50
+MAX_BUFFER_M = 2000
+SEGMENTS_PER_CHUNK = 32
+
+
+def _cumulative_lengths(lats, lons):
+    """Độ dài (m) từ điểm đầu tuyến tới mỗi điểm, theo phép chiếu cục bộ từng cạnh."""
+    mid_lat = np.radians((lats[:-1] + lats[1:]) / 2)
+    dx = np.diff(lons) * METERS_PER_DEGREE * np.cos(mid_lat)
+    dy = np.diff(lats) * METERS_PER_DEGREE
+    return np.concatenate(([0.0], np.cumsum(np.hypot(dx, dy))))
+
+
+def point_segment_distances(point_lats, point_lons, seg_lats, seg_lons):
+    """
+    Khoảng cách (m) nhỏ nhất từ mỗi điểm tới đường gấp khúc và tham số chiếu.
+
+    Args:
+        point_lats, point_lons: mảng (n,) tọa độ điểm
+        seg_lats, seg_lons: mảng (m + 1,) các đỉnh của m cạnh liên tiếp
+
+    Returns:
+        (distances, segment_index, t): mảng (n,) khoảng cách nhỏ nhất, chỉ số
+        cạnh gần nhất và vị trí chiếu trên cạnh đó (0..1)
+    """
+    lat0 = math.radians(float(np.mean(seg_lats)))
+    scale_x = METERS_PER_DEGREE * math.cos(lat0)
+    lon0, lat_ref = float(seg_lons[0]), float(seg_lats[0])
+
+    px = (np.asarray(point_lons) - lon0)[:, None] * scale_x
+    py = (np.asarray(point_lats) - lat_ref)[:, None] * METERS_PER_DEGREE
+    ax = (seg_lons[:-1] - lon0) * scale_x
+    ay = (seg_lats[:-1] - lat_ref) * METERS_PER_DEGREE
+    bx = (seg_lons[1:] - lon0) * scale_x
+    by = (seg_lats[1:] - lat_ref) * METERS_PER_DEGREE
+
+    dx, dy = bx - ax, by - ay
+    length2 = dx * dx + dy * dy
+    # Cạnh suy biến (hai đỉnh trùng nhau) -> t = 0, khoảng cách tới đỉnh
+    safe_length2 = np.where(length2 > 0, length2, 1.0)
+    t = ((px - ax) * dx + (py - ay) * dy) / safe_length2
+    t = np.clip(np.where(length2 > 0, t, 0.0), 0.0, 1.0)
+    distances = np.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+    nearest = np.argmin(distances, axis=1)
+    rows = np.arange(len(nearest))
+    return distances[rows, nearest], nearest, t[rows, nearest]
+
+
+def cameras_along_route(route_points, buffer_m=DEFAULT_BUFFER_M):
+    """
+    Camera trong phạm vi ``buffer_m`` mét quanh tuyến.
+
+    Args:
+        route_points: list [lat, lon] theo thứ tự đi
+        buffer_m: bề rộng hành lang mỗi bên tuyến (m)
+
+    Returns:
+        list dict camera kèm ``distance_to_route`` và ``distance_along_route``
+        (m), sắp theo vị trí dọc tuyến
+    """
+    if len(route_points) < 2:
+        return []
+    lats = np.array([point[0] for point in route_points], dtype=np.float64)
+    lons = np.array([point[1] for point in route_points], dtype=np.float64)
+    along = _cumulative_lengths(lats, lons)
+
+    # id -> (khoảng cách tới tuyến, vị trí dọc tuyến, row)
+    best = {}
+    lat_pad = buffer_m / METERS_PER_DEGREE
+    for start in range(0, len(route_points) - 1, SEGMENTS_PER_CHUNK):
+        end = min(start + SEGMENTS_PER_CHUNK, len(route_points) - 1)
+        chunk_lats, chunk_lons = lats[start:end + 1], lons[start:end + 1]
+        max_abs_lat = min(float(np.max(np.abs(chunk_lats))) + lat_pad, 89.9)
+        lon_pad = buffer_m / (METERS_PER_DEGREE * math.cos(math.radians(max_abs_lat)))
+
+        rows = (
+            Camera.query.with_entities(*projection_columns("map"))
+            .filter(*bbox_criteria(
+                float(chunk_lats.min()) - lat_pad, float(chunk_lats.max()) + lat_pad,
+                float(chunk_lons.min()) - lon_pad, float(chunk_lons.max()) + lon_pad,
+            ))
+            .all()
+        )
+        if not rows:
+            continue
+
+        distances, segments, t = point_segment_distances(
+            np.array([row.latitude for row in rows], dtype=np.float64),
+            np.array([row.longitude for row in rows], dtype=np.float64),
+            chunk_lats,
+            chunk_lons,
+        )
+        segment_starts = along[start:end][segments]
+        segment_lengths = along[start + 1:end + 1][segments] - segment_starts
+        positions = segment_starts + t * segment_lengths
+
+        for row, distance, position in zip(rows, distances.tolist(), positions.tolist()):
+            if distance > buffer_m:
+                continue
+            current = best.get(row.id)
+            if current is None or distance < current[0]:
+                best[row.id] = (distance, position, row)
+
+    results = []
+    for distance, position, row in sorted(best.values(), key=lambda item: (item[1], item[2].id)):
+        results.append({
+            "id": row.id,
+            "lat": row.latitude,
+            "lon": row.longitude,
+            "system": row.system_type or "Chưa phân loại",
+            "owner": row.owner_name,
+            "org": row.organization_name,
+            "address": row.address_street,
+            "ward": row.ward,
+            "province": row.province,
+            "distance_to_route": round(distance),
+            "distance_along_route": round(position),
+        })
+    return results
@@ -0,0 +1,366 @@
+"""
+Tính tuyến đường A -> B cho ``/map/route``.
+
+Thành phần:
+- ``OsrmRouter``: gọi OSRM HTTP qua một ``requests.Session`` dùng chung
+  (connection pool, không retry), timeout kết nối/đọc riêng.
+- ``OfflineRouter``: tìm đường (A*) trên đồ thị đường đọc từ file GeoJSON
+  (các LineString, thuộc tính tùy chọn ``oneway``, ``maxspeed`` km/h). Không
+  cần mạng - dùng cho triển khai nội bộ và làm router giả khi kiểm thử.
+- ``CircuitBreaker``: giới hạn số lời gọi đồng thời tới một router và ngắt
+  (trả lỗi ngay) sau nhiều lần lỗi liên tiếp, để router chậm không chiếm hết
+  worker WSGI.
+- ``RouteCache``: LRU lưu bền (file SQLite) các tuyến đã tính, khóa theo
+  backend + hai đầu mút làm tròn ``ROUTE_CACHE_PRECISION`` chữ số (~11 m).
+
+``get_router()`` ghép các thành phần theo cấu hình ``ROUTER_*``: router chính
+(OSRM hoặc offline) -> router offline dự phòng nếu có file đồ thị, mỗi router
+có cache riêng (tuyến offline tính lúc OSRM lỗi không được trả thay tuyến OSRM).
+"""
+import heapq
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+import numpy as np
+import requests
+from flask import current_app
+from requests.adapters import HTTPAdapter
+
+from services.nearest_service import EARTH_RADIUS_M, KDTree, chord_to_meters, unit_vectors
+
+Route = namedtuple("Route", ["points", "distance", "duration"])
+
+DEFAULT_OSRM_URL = "http://router.project-osrm.org"
+DEFAULT_CACHE_PATH = os.path.join("cache", "routes.sqlite")
+DEFAULT_CACHE_SIZE = 5000
+ROUTE_CACHE_PRECISION = 4
+# Tốc độ mặc định của cạnh không có maxspeed (km/h)
+DEFAULT_SPEED_KMH = 40
+
+
+class RoutingError(Exception):
+    """Không tìm được tuyến giữa hai điểm."""
+
+
+class RouterUnavailable(RoutingError):
+    """Router không phản hồi / đang bị ngắt mạch."""
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return EARTH_RADIUS_M * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+class OsrmRouter:
+    name = "osrm"
+
+    def __init__(self, base_url=DEFAULT_OSRM_URL, profile="driving", timeout=(3.05, 10), pool_size=10):
+        self.base_url = base_url.rstrip("/")
+        self.profile = profile
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def route(self, start, end):
+        # OSRM: lon,lat (chú ý thứ tự)
+        url = (
+            f"{self.base_url}/route/v1/{self.profile}/"
+            f"{start[1]},{start[0]};{end[1]},{end[0]}"
+        )
+        try:
+            response = self.session.get(
+                url, params={"overview": "full", "geometries": "geojson"}, timeout=self.timeout
+            )
+            data = response.json()
+        except (requests.RequestException, ValueError) as exc:
+            raise RouterUnavailable(f"OSRM không phản hồi: {exc}") from exc
+
+        if data.get("code") != "Ok" or not data.get("routes"):
+            if response.status_code >= 500:
+                raise RouterUnavailable(f"OSRM lỗi {response.status_code}")
+            raise RoutingError(data.get("message") or "Không thể tính toán tuyến đường")
+        route = data["routes"][0]
+        points = [[lat, lon] for lon, lat in route["geometry"]["coordinates"]]
+        return Route(points, route["distance"], route["duration"])
+
+
+class OfflineRouter:
+    """A* trên đồ thị đường nạp từ file GeoJSON."""
+
+    name = "offline"
+
+    def __init__(self, graph_path):
+        with open(graph_path, encoding="utf-8") as f:
+            self._load(json.load(f))
+
+    def _load(self, geojson):
+        node_ids = {}
+        lats, lons = [], []
+        # node -> list (neighbour, length_m, duration_s)
+        self.edges = []
+
+        def node_for(lon, lat):
+            key = (round(lat, 7), round(lon, 7))
+            node = node_ids.get(key)
+            if node is None:
+                node = node_ids[key] = len(lats)
+                lats.append(lat)
+                lons.append(lon)
+                self.edges.append([])
+            return node
+
+        for feature in geojson.get("features", []):
+            geometry = feature.get("geometry") or {}
+            lines = {
+                "LineString": [geometry.get("coordinates")],
+                "MultiLineString": geometry.get("coordinates"),
+            }.get(geometry.get("type"), [])
+            properties = feature.get("properties") or {}
+            oneway = properties.get("oneway") in (True, "yes", "1", 1)
+            speed = float(properties.get("maxspeed") or DEFAULT_SPEED_KMH) / 3.6
+            for line in lines or []:
+                previous = None
+                for lon, lat, *_ in line:
+                    node = node_for(lon, lat)
+                    if previous is not None and previous != node:
+                        length = haversine_m(lats[previous], lons[previous], lat, lon)
+                        self.edges[previous].append((node, length, length / speed))
+                        if not oneway:
+                            self.edges[node].append((previous, length, length / speed))
+                    previous = node
+
+        self.lats = np.array(lats, dtype=np.float64)
+        self.lons = np.array(lons, dtype=np.float64)
+        self.tree = KDTree(unit_vectors(self.lats, self.lons))
+        self.max_speed = max(
+            (length / duration for edges in self.edges for _, length, duration in edges if duration),
+            default=DEFAULT_SPEED_KMH / 3.6,
+        )
+
+    def _snap(self, point):
+        found = self.tree.query(unit_vectors([point[0]], [point[1]])[0], 1)
+        if not found:
+            raise RoutingError("Đồ thị đường rỗng")
+        chord, node = found[0]
+        return node, float(chord_to_meters(chord))
+
+    def route(self, start, end):
+        source, source_gap = self._snap(start)
+        target, target_gap = self._snap(end)
+        lats, lons = self.lats, self.lons
+
+        def heuristic(node):
+            # Thời gian tối thiểu: khoảng cách chim bay / tốc độ lớn nhất của đồ thị
+            return haversine_m(lats[node], lons[node], lats[target], lons[target]) / self.max_speed
+
+        best = {source: 0.0}
+        lengths = {source: 0.0}
+        previous = {}
+        pending = [(heuristic(source), 0.0, source)]
+        while pending:
+            _, cost, node = heapq.heappop(pending)
+            if node == target:
+                break
+            if cost > best.get(node, math.inf):
+                continue
+            for neighbour, length, duration in self.edges[node]:
+                new_cost = cost + duration
+                if new_cost < best.get(neighbour, math.inf):
+                    best[neighbour] = new_cost
+                    lengths[neighbour] = lengths[node] + length
+                    previous[neighbour] = node
+                    heapq.heappush(pending, (new_cost + heuristic(neighbour), new_cost, neighbour))
+        if target not in best:
+            raise RoutingError("Không có đường nối hai điểm trên đồ thị offline")
+
+        path = [target]
+        while path[-1] != source:
+            path.append(previous[path[-1]])
+        path.reverse()
+        points = [[float(lats[node]), float(lons[node])] for node in path]
+        # Nối hai đầu mút thực tế với nút gần nhất của đồ thị
+        points = [list(start)] + points + [list(end)]
+        distance = lengths[target] + source_gap + target_gap
+        duration = best[target] + (source_gap + target_gap) / (DEFAULT_SPEED_KMH / 3.6)
+        return Route(points, distance, duration)
+
+
+class CircuitBreaker:
+    """
+    Bọc một router: tối đa ``max_concurrency`` lời gọi cùng lúc, ngắt mạch
+    ``reset_timeout`` giây sau ``failure_threshold`` lỗi RouterUnavailable liên tiếp.
+    """
+
+    def __init__(self, router, failure_threshold=5, reset_timeout=30, max_concurrency=4):
+        self.router = router
+        self.name = router.name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half-open"
+            return "open"
+
+    def route(self, start, end):
+        if self.state == "open":
+            raise RouterUnavailable(f"Router {self.name} tạm ngắt do lỗi liên tiếp")
+        if not self._slots.acquire(blocking=False):
+            raise RouterUnavailable(f"Router {self.name} đang quá tải")
+        try:
+            result = self.router.route(start, end)
+        except RouterUnavailable:
+            with self._lock:
+                self._failures += 1
+                if self._failures >= self.failure_threshold or self._opened_at is not None:
+                    # Half-open thử lại thất bại -> mở lại ngay
+                    self._opened_at = time.monotonic()
+            raise
+        finally:
+            self._slots.release()
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+        return result
+
+
+class FallbackRouter:
+    """Thử lần lượt các router, chuyển sang router sau khi router trước không phản hồi."""
+
+    def __init__(self, routers):
+        self.routers = routers
+        self.name = "+".join(router.name for router in routers)
+
+    def route(self, start, end):
+        error = None
+        for router in self.routers:
+            try:
+                return router.route(start, end)
+            except RouterUnavailable as exc:
+                error = exc
+        raise error or RouterUnavailable("Không có router nào được cấu hình")
+
+
+class RouteCache:
+    """LRU lưu bền trong file SQLite (dùng chung giữa các worker)."""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_CACHE_SIZE):
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS route_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, used_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_route_cache_used_at ON route_cache(used_at)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    @staticmethod
+    def key(backend, start, end):
+        rounded = [round(value, ROUTE_CACHE_PRECISION) for value in (*start, *end)]
+        return f"{backend}:" + ",".join(f"{value:.{ROUTE_CACHE_PRECISION}f}" for value in rounded)
+
+    def get(self, key):
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT value FROM route_cache WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE route_cache SET used_at = ? WHERE key = ?", (time.time(), key))
+        except sqlite3.Error:
+            return None
+        points, distance, duration = json.loads(row[0])
+        return Route(points, distance, duration)
+
+    def put(self, key, route):
+        value = json.dumps([route.points, route.distance, route.duration])
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO route_cache(key, value, used_at) VALUES (?, ?, ?)",
+                    (key, value, time.time()),
+                )
+                conn.execute(
+                    "DELETE FROM route_cache WHERE key IN ("
+                    "SELECT key FROM route_cache ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+        except sqlite3.Error:
+            pass
+
+
+class CachedRouter:
+    """Cache kết quả của một router, khóa theo tên router đó."""
+
+    def __init__(self, router, cache):
+        self.router = router
+        self.cache = cache
+        self.name = router.name
+
+    def route(self, start, end):
+        key = self.cache.key(self.name, start, end)
+        route = self.cache.get(key)
+        if route is None:
+            route = self.router.route(start, end)
+            self.cache.put(key, route)
+        return route
+
+
+def build_router(config):
+    """Dựng router theo cấu hình (dict-like, ví dụ ``app.config``)."""
+    graph_path = config.get("ROUTER_GRAPH_FILE")
+    breaker_options = {
+        "failure_threshold": config.get("ROUTER_FAILURE_THRESHOLD", 5),
+        "reset_timeout": config.get("ROUTER_RESET_TIMEOUT", 30),
+        "max_concurrency": config.get("ROUTER_MAX_CONCURRENCY", 4),
+    }
+
+    routers = []
+    if config.get("ROUTER_BACKEND", "osrm") == "osrm":
+        osrm = OsrmRouter(
+            config.get("OSRM_URL") or DEFAULT_OSRM_URL,
+            timeout=(3.05, config.get("ROUTER_TIMEOUT", 10)),
+            pool_size=breaker_options["max_concurrency"],
+        )
+        routers.append(CircuitBreaker(osrm, **breaker_options))
+    if graph_path:
+        routers.append(OfflineRouter(graph_path))
+    if not routers:
+        raise RuntimeError("ROUTER_BACKEND=offline cần ROUTER_GRAPH_FILE")
+
+    cache_size = config.get("ROUTE_CACHE_SIZE", DEFAULT_CACHE_SIZE)
+    if cache_size:
+        # Cache từng router (bên trong FallbackRouter): khóa theo router đã trả lời
+        cache = RouteCache(config.get("ROUTE_CACHE_PATH") or DEFAULT_CACHE_PATH, cache_size)
+        routers = [CachedRouter(router, cache) for router in routers]
+    return routers[0] if len(routers) == 1 else FallbackRouter(routers)
+
+
+def get_router():
+    router = current_app.extensions.get("router")
+    if router is None:
+        router = current_app.extensions["router"] = build_router(current_app.config)
+    return router
@@ -0,0 +1,250 @@
+"""
+Saved search: bộ lọc tìm kiếm camera được lưu theo người dùng, kèm tập id
+camera khớp được materialize trong bảng ``saved_search_result``.
+
+- Tạo / refresh: một câu INSERT ... SELECT từ ``CameraService.build_search_query``.
+- Ghi camera: listener của ``services.camera_events`` chỉ kiểm tra lại các
+  camera vừa thay đổi, và chỉ với những saved search có trường lọc nằm trong
+  các cột vừa đổi (camera mới thì mọi saved search), rồi thêm/xóa dòng kết
+  quả và cập nhật ``result_count``. Camera bị xóa được gỡ khỏi mọi tập bằng
+  một câu DELETE chung.
+- Đọc: tổng có sẵn trong ``result_count``; trang kết quả và export đọc từ
+  tập đã materialize (JOIN) thay vì lọc lại.
+"""
+import json
+
+from sqlalchemy import func, insert, literal, select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from models import Camera, SavedSearch, SavedSearchResult, db
+from services.camera_service import CameraService
+from services.pagination import COUNT_NONE, keyset_paginate
+from services.projections import apply_projection
+
+# Số id tối đa trong một mệnh đề IN khi cập nhật tăng dần
+CHANGE_CHUNK_SIZE = 500
+
+# Bộ lọc không trùng tên cột camera -> các cột nó đọc
+_FILTER_COLUMNS = {
+    "ip_range": {"static_ip", "static_ip_num"},
+    "match": set(),
+}
+
+
+def _parse_filters(text):
+    """Như SavedSearch.get_filters nhưng trên chuỗi JSON đã đọc bằng query cột."""
+    try:
+        return json.loads(text or "{}")
+    except ValueError:
+        return {}
+
+
+def _filter_columns(filters):
+    """Các cột camera mà bộ lọc phụ thuộc (cột gốc và cột dẫn xuất _norm/_mask)."""
+    columns = set()
+    for field, value in filters.items():
+        if not value:
+            continue
+        if field in _FILTER_COLUMNS:
+            columns |= _FILTER_COLUMNS[field]
+        else:
+            columns |= {field, f"{field}_norm", f"{field}_mask"}
+    return columns
+
+
+def _changed_columns(changes):
+    """
+    Gộp các thay đổi theo camera.
+
+    Returns:
+        (touched, deleted): touched = {camera_id: tập cột đã đổi, None nếu là
+        camera mới}; deleted = tập id camera bị xóa (trạng thái cuối của lô)
+    """
+    touched = {}
+    deleted = set()
+    for change in changes:
+        camera_id = change.camera_id
+        if change.new is None:
+            deleted.add(camera_id)
+            touched.pop(camera_id, None)
+            continue
+        deleted.discard(camera_id)
+        if change.old is None or (camera_id in touched and touched[camera_id] is None):
+            touched[camera_id] = None
+            continue
+        columns = {key for key, value in change.new.items() if change.old.get(key) != value}
+        touched[camera_id] = touched.get(camera_id, set()) | columns
+    return touched, deleted
+
+
+class SavedSearchService:
+    @staticmethod
+    def list_for_user(user_id):
+        if not user_id:
+            return []
+        return (
+            SavedSearch.query.filter_by(user_id=user_id)
+            .order_by(SavedSearch.name)
+            .all()
+        )
+
+    @staticmethod
+    def get_for_user(saved_id, user_id):
+        if not saved_id or not user_id:
+            return None
+        return SavedSearch.query.filter_by(id=saved_id, user_id=user_id).first()
+
+    @staticmethod
+    def create(user_id, name, filters):
+        saved = SavedSearch(
+            user_id=user_id,
+            name=name,
+            filters=json.dumps(filters, ensure_ascii=False, sort_keys=True),
+        )
+        db.session.add(saved)
+        db.session.flush()
+        SavedSearchService.refresh(saved)
+        return saved
+
+    @staticmethod
+    def delete(saved):
+        SavedSearchResult.query.filter_by(saved_search_id=saved.id).delete(synchronize_session=False)
+        db.session.delete(saved)
+        db.session.commit()
+
+    @staticmethod
+    def refresh(saved):
+        """Tính lại toàn bộ tập kết quả (INSERT ... SELECT trong DB). Returns: số camera."""
+        SavedSearchResult.query.filter_by(saved_search_id=saved.id).delete(synchronize_session=False)
+        select_ids = (
+            CameraService.build_search_query(saved.get_filters())
+            .order_by(None)
+            .with_entities(literal(saved.id), Camera.id)
+            .statement
+        )
+        db.session.execute(
+            insert(SavedSearchResult).from_select(["saved_search_id", "camera_id"], select_ids)
+        )
+        saved.result_count = SavedSearchResult.query.filter_by(saved_search_id=saved.id).count()
+        saved.refreshed_at = db.func.now()
+        db.session.commit()
+        return saved.result_count
+
+    @staticmethod
+    def results_query(saved, columns=None):
+        """Query camera thuộc tập kết quả (JOIN saved_search_result), chưa sắp xếp."""
+        query = Camera.query.join(
+            SavedSearchResult, SavedSearchResult.camera_id == Camera.id
+        ).filter(SavedSearchResult.saved_search_id == saved.id)
+        return apply_projection(query, columns)
+
+    @staticmethod
+    def get_cameras(saved, columns=None):
+        """Toàn bộ camera của tập kết quả (theo id), ví dụ để export."""
+        return SavedSearchService.results_query(saved, columns).order_by(Camera.id).all()
+
+    @staticmethod
+    def search(saved, page=1, per_page=50, cursor=None, columns=None):
+        """
+        Trang kết quả của saved search, đọc từ tập đã materialize.
+
+        Returns:
+            (items, total, pagination) giống CameraService.search_cameras
+        """
+        query = SavedSearchService.results_query(saved, columns)
+
+        if cursor is not None:
+            pagination = keyset_paginate(
+                query, Camera.id, cursor=cursor, per_page=per_page, count_mode=COUNT_NONE
+            )
+        else:
+            pagination = query.order_by(Camera.id.desc()).paginate(
+                page=page, per_page=per_page, error_out=False, count=False
+            )
+        pagination.total = saved.result_count or 0
+        return pagination.items, pagination.total, pagination
+
+    @staticmethod
+    def apply_camera_changes(changes, data_version=None):
+        """
+        Listener của camera_events: cập nhật tăng dần các tập kết quả.
+
+        Với camera sửa, chỉ các saved search có trường lọc nằm trong các cột
+        vừa đổi mới được kiểm tra lại (mỗi saved search một query cho mỗi lô
+        CHANGE_CHUNK_SIZE id); sửa cột không liên quan thì không có query nào.
+        """
+        touched, deleted = _changed_columns(changes)
+        try:
+            if deleted:
+                SavedSearchService._remove_cameras(sorted(deleted))
+            if touched:
+                saved_rows = db.session.query(SavedSearch.id, SavedSearch.filters).all()
+                for saved_id, filters_text in saved_rows:
+                    filters = _parse_filters(filters_text)
+                    columns = _filter_columns(filters)
+                    changed_ids = sorted(
+                        camera_id for camera_id, changed in touched.items()
+                        if changed is None or changed & columns
+                    )
+                    for start in range(0, len(changed_ids), CHANGE_CHUNK_SIZE):
+                        SavedSearchService._apply_chunk(
+                            saved_id, filters, changed_ids[start:start + CHANGE_CHUNK_SIZE]
+                        )
+            db.session.commit()
+        except SQLAlchemyError:
+            db.session.rollback()
+            raise
+
+    @staticmethod
+    def _remove_cameras(camera_ids):
+        """Gỡ camera đã xóa khỏi mọi tập kết quả rồi đếm lại result_count."""
+        for start in range(0, len(camera_ids), CHANGE_CHUNK_SIZE):
+            SavedSearchResult.query.filter(
+                SavedSearchResult.camera_id.in_(camera_ids[start:start + CHANGE_CHUNK_SIZE])
+            ).delete(synchronize_session=False)
+        # Đếm lại từ bảng kết quả: đúng cả khi DB đã xóa theo ON DELETE CASCADE
+        # trước khi listener chạy (không còn biết saved search nào bị ảnh hưởng)
+        db.session.execute(
+            update(SavedSearch).values(
+                result_count=select(func.count())
+                .where(SavedSearchResult.saved_search_id == SavedSearch.id)
+                .scalar_subquery()
+            )
+        )
+
+    @staticmethod
+    def _apply_chunk(saved_id, filters, changed_ids):
+        rows = (
+            CameraService.build_search_query(filters)
+            .order_by(None)
+            .with_entities(Camera.id)
+            .filter(Camera.id.in_(changed_ids))
+            .all()
+        )
+        matched = {row[0] for row in rows}
+
+        existing = {
+            row[0]
+            for row in db.session.query(SavedSearchResult.camera_id).filter(
+                SavedSearchResult.saved_search_id == saved_id,
+                SavedSearchResult.camera_id.in_(changed_ids),
+            )
+        }
+        to_add = matched - existing
+        to_remove = existing - matched
+        if to_remove:
+            SavedSearchResult.query.filter(
+                SavedSearchResult.saved_search_id == saved_id,
+                SavedSearchResult.camera_id.in_(to_remove),
+            ).delete(synchronize_session=False)
+        if to_add:
+            db.session.execute(
+                insert(SavedSearchResult),
+                [{"saved_search_id": saved_id, "camera_id": camera_id} for camera_id in to_add],
+            )
+        if to_add or to_remove:
+            db.session.execute(
+                update(SavedSearch)
+                .where(SavedSearch.id == saved_id)
+                .values(result_count=func.coalesce(SavedSearch.result_count, 0) + len(to_add) - len(to_remove))
+            )
@@ -0,0 +1,227 @@
+"""
+Chỉ mục không gian cho tọa độ camera.
+
+- SQLite: bảng ảo R*Tree ``camera_rtree`` (id, min/max lat, min/max lon) phản
+  chiếu cột ``latitude``/``longitude``, được đồng bộ bằng trigger nên mọi
+  đường ghi đều cập nhật index (giống ``camera_fts``). Truy vấn khung chữ nhật
+  là một lần duyệt R*Tree thay vì hai range scan B-tree độc lập rồi giao nhau.
+- Mọi backend khác (PostgreSQL, SQLite chưa có R*Tree): nếu đã có cột
+  ``geohash`` và đã backfill xong (``migrate_geohash.py``) thì khung được phủ
+  bằng vài ô geohash và lọc bằng các khoảng ``geohash >= a AND geohash < b``
+  trên B-tree (xem ``geohash_utils``); nếu chưa thì dùng B-tree trên
+  latitude/longitude. Camera có tọa độ mà thiếu geohash (ghi ngoài
+  ``set_latlon_components``) sẽ bị lọc sót, nên điều kiện "đã backfill xong"
+  được kiểm tra lại định kỳ.
+
+``bbox_criteria`` (một khung) và ``multi_bbox_criteria`` (nhiều khung trong cùng
+một query) trả về điều kiện lọc cho ``Camera.query`` theo thứ tự ưu tiên
+R*Tree > geohash > BETWEEN trên hai cột. R*Tree lưu float 32 bit (làm tròn ra
+ngoài) và ô geohash phủ rộng hơn khung, nên vẫn giữ BETWEEN chính xác trên cột
+gốc để loại các điểm sát biên.
+"""
+from sqlalchemy import and_, column, false, inspect, or_, select, table, text
+
+from geohash_utils import cover_ranges
+from models import Camera, db
+from services.availability import AvailabilityCache
+
+RTREE_TABLE = "camera_rtree"
+
+# Cache trạng thái index theo engine URL để không phải hỏi catalog mỗi request
+# ("chưa có" chỉ được cache ngắn hạn, xem services.availability)
+_availability = AvailabilityCache()
+# Dữ liệu có thể mất tính đầy đủ sau khi đã kiểm tra -> kiểm tra lại cả kết quả "có"
+GEOHASH_RECHECK_SECONDS = 60
+_geohash_availability = AvailabilityCache(positive_ttl=GEOHASH_RECHECK_SECONDS)
+
+_rtree = table(
+    RTREE_TABLE,
+    column("id"), column("min_lat"), column("max_lat"), column("min_lon"), column("max_lon"),
+)
+
+# Chỉ camera có đủ tọa độ mới có mặt trong R*Tree
+_INSERT_NEW = (
+    f"INSERT INTO {RTREE_TABLE}(id, min_lat, max_lat, min_lon, max_lon) "
+    "SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude "
+    "WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL"
+)
+
+
+def _sqlite_ddl():
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {RTREE_TABLE} USING rtree("
+        "id, min_lat, max_lat, min_lon, max_lon)",
+        f"CREATE TRIGGER IF NOT EXISTS {RTREE_TABLE}_ai AFTER INSERT ON camera BEGIN "
+        f"{_INSERT_NEW}; END",
+        f"CREATE TRIGGER IF NOT EXISTS {RTREE_TABLE}_ad AFTER DELETE ON camera BEGIN "
+        f"DELETE FROM {RTREE_TABLE} WHERE id = old.id; END",
+        f"CREATE TRIGGER IF NOT EXISTS {RTREE_TABLE}_au AFTER UPDATE OF latitude, longitude ON camera BEGIN "
+        f"DELETE FROM {RTREE_TABLE} WHERE id = old.id; {_INSERT_NEW}; END",
+    ]
+
+
+def drop_spatial_index(engine=None):
+    """Xóa R*Tree và trigger nếu có."""
+    engine = engine or db.engine
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            for suffix in ("ai", "ad", "au"):
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {RTREE_TABLE}_{suffix}"))
+            conn.execute(text(f"DROP TABLE IF EXISTS {RTREE_TABLE}"))
+    _availability.invalidate(engine)
+
+
+def ensure_spatial_index(engine=None, rebuild=False):
+    """
+    Tạo R*Tree nếu chưa có (idempotent).
+
+    Args:
+        engine: SQLAlchemy engine (mặc định db.engine)
+        rebuild: nạp lại toàn bộ R*Tree từ bảng camera
+
+    Returns:
+        True nếu index đã sẵn sàng, False nếu dialect không dùng R*Tree.
+    """
+    engine = engine or db.engine
+    if engine.dialect.name != "sqlite":
+        return False
+
+    with engine.begin() as conn:
+        existed = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": RTREE_TABLE},
+        ).first()
+        for statement in _sqlite_ddl():
+            conn.execute(text(statement))
+        # Bảng mới tạo chưa có tọa độ của các camera đã tồn tại
+        if rebuild or not existed:
+            conn.execute(text(f"DELETE FROM {RTREE_TABLE}"))
+            conn.execute(text(
+                f"INSERT INTO {RTREE_TABLE}(id, min_lat, max_lat, min_lon, max_lon) "
+                "SELECT id, latitude, latitude, longitude, longitude FROM camera "
+                "WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+            ))
+
+    _availability.invalidate(engine)
+    return True
+
+
+def spatial_available(engine=None):
+    """Kiểm tra R*Tree đã được tạo trên database hiện tại chưa."""
+    return _availability.get(engine or db.engine, _rtree_exists)
+
+
+def _rtree_exists(engine):
+    if engine.dialect.name != "sqlite":
+        return False
+    with engine.connect() as conn:
+        return conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": RTREE_TABLE},
+        ).first() is not None
+
+
+def geohash_available(engine=None):
+    """
+    Kiểm tra có dùng được cột geohash: cột đã có và mọi camera có tọa độ đều đã
+    có geohash (``migrate_geohash.py`` đã backfill xong). Kết quả được cache
+    GEOHASH_RECHECK_SECONDS giây.
+    """
+    return _geohash_availability.get(engine or db.engine, _geohash_complete)
+
+
+def _geohash_complete(engine):
+    columns = [column["name"] for column in inspect(engine).get_columns("camera")]
+    if "geohash" not in columns:
+        return False
+    with engine.connect() as conn:
+        missing = conn.execute(
+            select(Camera.id)
+            .where(
+                Camera.geohash.is_(None),
+                Camera.latitude.isnot(None),
+                Camera.longitude.isnot(None),
+            )
+            .limit(1)
+        ).first()
+    return missing is None
+
+
+def geohash_criterion(boxes):
+    """
+    Điều kiện camera có geohash thuộc các khoảng phủ hợp các khung (``cover_ranges``).
+
+    Viết dạng ``id IN (subquery)`` giống R*Tree: nếu để chung WHERE với BETWEEN,
+    planner (SQLite) thường chọn index latitude và chỉ dùng geohash để lọc lại.
+    """
+    ranges = cover_ranges(boxes)
+    if not ranges:
+        return false()
+    cells = Camera.__table__.alias("camera_cells")
+    candidate_ids = select(cells.c.id).where(or_(*(
+        and_(cells.c.geohash >= start, cells.c.geohash < stop) if stop is not None
+        else cells.c.geohash >= start
+        for start, stop in ranges
+    )))
+    return Camera.id.in_(candidate_ids)
+
+
+def bbox_criteria(min_lat, max_lat, min_lon, max_lon, engine=None):
+    """
+    Điều kiện lọc camera có tọa độ trong khung chữ nhật.
+
+    Returns:
+        list biểu thức cho ``Camera.query.filter(*criteria)``
+    """
+    criteria = [
+        Camera.latitude.between(min_lat, max_lat),
+        Camera.longitude.between(min_lon, max_lon),
+    ]
+    if spatial_available(engine):
+        candidate_ids = select(_rtree.c.id).where(
+            _rtree.c.max_lat >= min_lat,
+            _rtree.c.min_lat <= max_lat,
+            _rtree.c.max_lon >= min_lon,
+            _rtree.c.min_lon <= max_lon,
+        )
+        criteria.insert(0, Camera.id.in_(candidate_ids))
+    elif geohash_available(engine):
+        criteria.insert(0, geohash_criterion([(min_lat, max_lat, min_lon, max_lon)]))
+    return criteria
+
+
+def multi_bbox_criteria(boxes, engine=None):
+    """
+    Điều kiện lọc camera nằm trong ít nhất một khung: một lần duyệt R*Tree với
+    các khung nối bằng OR thay vì một query mỗi khung.
+
+    Kết quả là tập ứng viên (R*Tree làm tròn ra ngoài), người gọi tự lọc chính
+    xác theo khoảng cách.
+
+    Args:
+        boxes: list (min_lat, max_lat, min_lon, max_lon)
+
+    Returns:
+        list biểu thức cho ``Camera.query.filter(*criteria)``
+    """
+    if spatial_available(engine):
+        candidate_ids = select(_rtree.c.id).where(or_(*(
+            and_(
+                _rtree.c.max_lat >= min_lat,
+                _rtree.c.min_lat <= max_lat,
+                _rtree.c.max_lon >= min_lon,
+                _rtree.c.min_lon <= max_lon,
+            )
+            for min_lat, max_lat, min_lon, max_lon in boxes
+        )))
+        return [Camera.id.in_(candidate_ids)]
+    criteria = [or_(*(
+        and_(
+            Camera.latitude.between(min_lat, max_lat),
+            Camera.longitude.between(min_lon, max_lon),
+        )
+        for min_lat, max_lat, min_lon, max_lon in boxes
+    ))]
+    if geohash_available(engine):
+        criteria.insert(0, geohash_criterion(boxes))
+    return criteria
@@ -0,0 +1,105 @@
+"""
+Bộ đếm hit/miss của cache câu lệnh SQL.
+
+- Compiled cache của SQLAlchemy: mỗi lần thực thi, ``ExecutionContext.cache_hit``
+  cho biết câu lệnh đã được compile sẵn (``cache_hit``), phải compile mới
+  (``cache_miss``) hay không cache được (``no_cache_key``, ``caching_disabled``...).
+- Cache điều kiện tìm kiếm của ``CameraService.build_search_query``: dựng
+  biểu thức WHERE mới hay dùng lại theo shape bộ lọc.
+
+Bộ đếm tính theo process (mỗi worker một bộ). Kích thước compiled cache đọc
+từ thuộc tính riêng ``Engine._compiled_cache`` nên chỉ báo trên các phiên bản
+SQLAlchemy đã kiểm tra (COMPILED_CACHE_VERSIONS), còn lại là None.
+"""
+import threading
+from collections import Counter
+
+import sqlalchemy
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Các phiên bản (major, minor) có Engine._compiled_cache là LRUCache (len, capacity)
+COMPILED_CACHE_VERSIONS = {(1, 4), (2, 0), (2, 1)}
+_SQLALCHEMY_VERSION = tuple(int(part) for part in sqlalchemy.__version__.split(".")[:2])
+
+_counts = Counter()
+_lock = threading.Lock()
+_installed = False
+
+
+def _record_execution(conn, cursor, statement, parameters, context, executemany):
+    outcome = getattr(context, "cache_hit", None)
+    if outcome is None:
+        return
+    with _lock:
+        _counts[f"compiled_{outcome.name.lower()}"] += 1
+
+
+def install_compiled_cache_stats():
+    """Đăng ký listener đếm kết quả compiled cache cho mọi Engine (idempotent)."""
+    global _installed
+    if _installed:
+        return
+    event.listen(Engine, "after_cursor_execute", _record_execution)
+    _installed = True
+
+
+def record_criteria_cache(hit):
+    with _lock:
+        _counts["criteria_hit" if hit else "criteria_miss"] += 1
+
+
+def reset_stats():
+    with _lock:
+        _counts.clear()
+
+
+def _compiled_cache(engine):
+    """Compiled cache (LRUCache) của engine, hoặc None nếu không đọc được an toàn."""
+    if engine is None or _SQLALCHEMY_VERSION not in COMPILED_CACHE_VERSIONS:
+        return None
+    cache = getattr(engine, "_compiled_cache", None)
+    return cache if hasattr(cache, "__len__") else None
+
+
+def _ratio(hits, misses):
+    total = hits + misses
+    return round(hits / total, 4) if total else None
+
+
+def get_stats(engine=None):
+    """
+    Số liệu hiện tại.
+
+    Returns:
+        dict gồm hits/misses/hit_ratio của compiled cache và cache điều kiện
+        tìm kiếm, các trạng thái khác, và kích thước compiled cache của engine.
+    """
+    with _lock:
+        counts = dict(_counts)
+
+    compiled_hits = counts.get("compiled_cache_hit", 0)
+    compiled_misses = counts.get("compiled_cache_miss", 0)
+    criteria_hits = counts.get("criteria_hit", 0)
+    criteria_misses = counts.get("criteria_miss", 0)
+
+    compiled_cache = _compiled_cache(engine)
+    return {
+        "compiled": {
+            "hits": compiled_hits,
+            "misses": compiled_misses,
+            "hit_ratio": _ratio(compiled_hits, compiled_misses),
+            "other": {
+                key[len("compiled_"):]: value
+                for key, value in counts.items()
+                if key.startswith("compiled_") and key not in ("compiled_cache_hit", "compiled_cache_miss")
+            },
+            "cache_size": len(compiled_cache) if compiled_cache is not None else None,
+            "cache_capacity": getattr(compiled_cache, "capacity", None),
+        },
+        "search_criteria": {
+            "hits": criteria_hits,
+            "misses": criteria_misses,
+            "hit_ratio": _ratio(criteria_hits, criteria_misses),
+        },
+    }
@@ -0,0 +1,144 @@
+"""
+Gợi ý (autocomplete) cho các ô tìm kiếm văn bản của camera.
+
+Mỗi trường có một ``PrefixIndex`` trong bộ nhớ: danh sách khóa đã chuẩn hóa
+(không dấu, xem ``text_utils.fold_text``) được sắp xếp, gồm cả hậu tố bắt đầu
+từ mỗi từ, để "dong" gợi ý được "Phường Đông Vệ". Tra cứu là hai lần bisect
+để lấy khoảng khóa có cùng tiền tố, rồi chọn top theo số camera bằng NumPy.
+
+Index được dựng lười theo từng trường (một câu GROUP BY) và dựng lại khi
+data version (``services.cache_service``) thay đổi.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+import numpy as np
+from sqlalchemy import func
+
+from models import Camera, db
+from services.cache_service import get_data_version
+from text_utils import fold_text
+
+SUGGEST_FIELDS = ["owner_name", "organization_name", "ward", "manufacturer"]
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+# Khi không có cache (data version = 0) thì dựng lại theo tuổi index
+FALLBACK_MAX_AGE = 300
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+class PrefixIndex:
+    """Index tiền tố trên các giá trị phân biệt của một trường, kèm số camera."""
+
+    def __init__(self, value_counts):
+        self.values = []
+        counts = []
+        entries = []
+        for value, count in value_counts:
+            folded = fold_text(value)
+            if not folded:
+                continue
+            value_id = len(self.values)
+            self.values.append(value)
+            counts.append(count)
+            # Khóa cho cả chuỗi và cho phần bắt đầu từ mỗi từ tiếp theo
+            words = folded.split(" ")
+            for i in range(len(words)):
+                entries.append((" ".join(words[i:]), value_id))
+        entries.sort()
+        self.keys = [key for key, _ in entries]
+        self.value_ids = np.array([value_id for _, value_id in entries], dtype=np.int64)
+        self.counts = np.array(counts, dtype=np.int64)
+        # Ô tìm kiếm rỗng: trả về các giá trị phổ biến nhất, tính sẵn
+        self.top_ids = np.argsort(-self.counts, kind="stable")[:MAX_LIMIT]
+        self.built_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.values)
+
+    def lookup(self, prefix, limit=DEFAULT_LIMIT):
+        """
+        Các giá trị có một từ bắt đầu bằng ``prefix`` (không phân biệt dấu),
+        sắp theo số camera giảm dần.
+
+        Returns:
+            list[(value, count)]
+        """
+        folded = fold_text(prefix)
+        if not folded:
+            return [(self.values[i], int(self.counts[i])) for i in self.top_ids[:limit]]
+        lo = bisect_left(self.keys, folded)
+        hi = bisect_left(self.keys, folded + "\U0010ffff", lo)
+        if lo >= hi:
+            return []
+
+        candidate_ids = self.value_ids[lo:hi]
+        candidate_counts = self.counts[candidate_ids]
+        # Một giá trị có thể khớp ở nhiều từ -> lấy dư rồi khử trùng lặp
+        take = min(len(candidate_ids), limit * 4)
+        if take < len(candidate_ids):
+            top = np.argpartition(-candidate_counts, take - 1)[:take]
+        else:
+            top = np.arange(len(candidate_ids))
+        top = top[np.lexsort((candidate_ids[top], -candidate_counts[top]))]
+
+        results = []
+        seen = set()
+        for position in top:
+            value_id = int(candidate_ids[position])
+            if value_id in seen:
+                continue
+            seen.add(value_id)
+            results.append((self.values[value_id], int(self.counts[value_id])))
+            if len(results) >= limit:
+                break
+        return results
+
+
+def _build_index(field):
+    column = getattr(Camera, field)
+    rows = (
+        db.session.query(column, func.count(Camera.id))
+        .filter(column.isnot(None), column != "")
+        .group_by(column)
+        .all()
+    )
+    return PrefixIndex(rows)
+
+
+def get_prefix_index(field):
+    """Index của trường, dựng (lại) nếu chưa có hoặc data version đã đổi."""
+    version = get_data_version()
+    key = (str(db.engine.url), field)
+    entry = _indexes.get(key)
+    if entry is not None:
+        built_version, index = entry
+        fresh = built_version == version and (
+            version or time.monotonic() - index.built_at < FALLBACK_MAX_AGE
+        )
+        if fresh:
+            return index
+
+    with _lock:
+        entry = _indexes.get(key)
+        if entry is not None and entry[0] == version and version:
+            return entry[1]
+        index = _build_index(field)
+        _indexes[key] = (version, index)
+        return index
+
+
+def suggest(field, prefix, limit=DEFAULT_LIMIT):
+    """
+    Gợi ý giá trị cho ô tìm kiếm.
+
+    Raises:
+        ValueError: nếu trường không hỗ trợ gợi ý
+    """
+    if field not in SUGGEST_FIELDS:
+        raise ValueError(f"Trường không hỗ trợ gợi ý: {field}")
+    limit = max(1, min(limit or DEFAULT_LIMIT, MAX_LIMIT))
+    return get_prefix_index(field).lookup(prefix or "", limit)
@@ -0,0 +1,337 @@
+"""
+Vector tile (MVT) cho lớp camera trên bản đồ: ``/map/tiles/{z}/{x}/{y}.mvt``.
+
+Mỗi tile chứa các camera có tọa độ nằm trong tile (cộng vùng đệm
+``TILE_BUFFER`` để marker sát mép không bị cắt), thuộc tính ``system``
+(system_type) và ``count``. Camera rơi vào cùng một điểm lưới của tile
+(``TILE_EXTENT``) và cùng hệ thống được gộp thành một feature, nên kích thước
+tile bị chặn bởi độ phân giải tile chứ không bởi số camera.
+
+Cache hai tầng:
+- Đĩa (``MAP_TILE_CACHE_DIR``/z/x/y.mvt), dùng chung giữa các worker; mỗi
+  tile kèm thời điểm dựng, tile dựng trước lần xóa gần nhất (file
+  ``invalidated_at`` ở thư mục gốc) không được lưu, xem ``TileCache``.
+- Bộ nhớ (LRU ``MAP_TILE_MEMORY_ITEMS`` tile mỗi worker), chỉ dùng khi có
+  data version; data version đổi mà listener của worker này không thấy
+  (worker khác ghi) thì xóa tầng bộ nhớ.
+
+Khi camera được tạo / di chuyển / đổi hệ thống / xóa (``services.camera_events``)
+chỉ các tile chứa vị trí cũ và mới ở mọi zoom bị xóa khỏi cả hai tầng. Tile ở
+cả hai tầng hết hạn sau ``MAP_TILE_MAX_AGE`` giây, phòng các lần ghi không qua
+``camera_events``.
+"""
+import math
+import os
+import shutil
+import struct
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from flask import current_app
+
+from models import Camera
+from services.cache_service import get_data_version
+from services.cluster_service import mercator, point_coordinates
+from services.mvt import encode_point_layer, encode_tile
+from services.projections import projection_columns
+from services.spatial_index import bbox_criteria
+
+MIN_TILE_ZOOM = 0
+MAX_TILE_ZOOM = 18
+TILE_EXTENT = 4096
+# Vùng đệm quanh tile, tính theo đơn vị extent (64/4096 = 1/64 tile)
+TILE_BUFFER = 64
+LAYER_NAME = "cameras"
+# Nhiều thay đổi hơn mức này (import lớn) thì xóa toàn bộ cache thay vì từng tile
+MAX_TILE_INVALIDATION_CHANGES = 200
+
+DEFAULT_CACHE_DIR = os.path.join("cache", "tiles")
+DEFAULT_MEMORY_ITEMS = 512
+DEFAULT_MAX_AGE = 3600
+
+# Đầu file tile: thời điểm bắt đầu dựng (time.time(), float 8 byte)
+_STAMP = struct.Struct("!d")
+# File ở thư mục gốc cache chứa thời điểm xóa tile gần nhất
+INVALIDATED_AT_FILE = "invalidated_at"
+
+# Thuộc tính ảnh hưởng tới nội dung tile
+_TILE_FIELDS = ("latitude", "longitude", "latlon", "system_type")
+
+
+def valid_tile(z, x, y):
+    return MIN_TILE_ZOOM <= z <= MAX_TILE_ZOOM and 0 <= x < (1 << z) and 0 <= y < (1 << z)
+
+
+def _tile_lon(x, z):
+    return x / (1 << z) * 360.0 - 180.0
+
+
+def _tile_lat(y, z):
+    return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / (1 << z)))))
+
+
+def render_tile(z, x, y):
+    """Dựng tile MVT từ DB (một query theo khung bao, xem ``bbox_criteria``)."""
+    buffer = TILE_BUFFER / TILE_EXTENT
+    min_lon, max_lon = _tile_lon(x - buffer, z), _tile_lon(x + 1 + buffer, z)
+    max_lat, min_lat = _tile_lat(max(y - buffer, 0), z), _tile_lat(min(y + 1 + buffer, 1 << z), z)
+
+    rows = (
+        Camera.query.with_entities(*projection_columns("marker"))
+        .filter(*bbox_criteria(min_lat, max_lat, min_lon, max_lon))
+        .order_by(Camera.id)
+        .all()
+    )
+
+    scale = 1 << z
+    # (px, py, system) -> [id đầu tiên, số camera]
+    points = {}
+    for row in rows:
+        mx, my = mercator(row.latitude, row.longitude)
+        px = int(round((mx * scale - x) * TILE_EXTENT))
+        py = int(round((my * scale - y) * TILE_EXTENT))
+        key = (px, py, row.system_type or "Chưa phân loại")
+        entry = points.get(key)
+        if entry is None:
+            points[key] = [row.id, 1]
+        else:
+            entry[1] += 1
+
+    features = [
+        (camera_id, px, py, {"system": system_type, "count": count})
+        for (px, py, system_type), (camera_id, count) in points.items()
+    ]
+    if not features:
+        return b""
+    return encode_tile([encode_point_layer(LAYER_NAME, features, TILE_EXTENT)])
+
+
+def tiles_for_point(lat, lon):
+    """Các tile (z, x, y) ở mọi zoom mà điểm xuất hiện (tính cả vùng đệm)."""
+    mx, my = mercator(lat, lon)
+    buffer = TILE_BUFFER / TILE_EXTENT
+    tiles = []
+    for z in range(MIN_TILE_ZOOM, MAX_TILE_ZOOM + 1):
+        scale = 1 << z
+        fx, fy = mx * scale, my * scale
+        xs = {min(int(fx), scale - 1)}
+        ys = {min(int(fy), scale - 1)}
+        for base, coords in ((fx, xs), (fy, ys)):
+            tile = min(int(base), scale - 1)
+            if base - tile < buffer and tile > 0:
+                coords.add(tile - 1)
+            if tile + 1 - base < buffer and tile < scale - 1:
+                coords.add(tile + 1)
+        tiles.extend((z, tx, ty) for tx in xs for ty in ys)
+    return tiles
+
+
+class TileCache:
+    """
+    Cache tile trên đĩa + LRU trong bộ nhớ.
+
+    Mỗi file tile mở đầu bằng thời điểm bắt đầu dựng (``_STAMP``, trước khi
+    đọc DB). Xóa tile ghi thời điểm xóa (sau commit) vào một file chung
+    ``invalidated_at`` rồi mới xóa các file tile; ``put`` ghi tile xong thì
+    đọc lại file này và bỏ tile nếu nó được dựng trước lần xóa gần nhất. Nhờ
+    vậy worker dựng tile từ dữ liệu cũ rồi ghi ra sau khi worker khác đã xóa
+    cũng không làm tile cũ sống lại, mà mỗi lần xóa chỉ ghi một file (không
+    có bia mộ theo từng tile phải dọn). Cái giá là tile dựng xen với bất kỳ
+    lần xóa nào cũng không được lưu (chỉ lỡ cache một lần).
+
+    Thời điểm dùng đồng hồ hệ thống thay vì data version vì data version chỉ
+    so được giữa các worker khi dùng chung Redis. Ghi không qua
+    ``camera_events`` (SQL trực tiếp, process khác) không xóa được tile nào,
+    nên tile còn hết hạn sau ``max_age`` giây.
+    """
+
+    def __init__(self, directory, memory_items=DEFAULT_MEMORY_ITEMS, max_age=DEFAULT_MAX_AGE):
+        self.directory = directory
+        self.memory_items = memory_items
+        self.max_age = max_age
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        # Data version mà tầng bộ nhớ đang khớp
+        self.version = None
+
+    def _path(self, z, x, y):
+        return os.path.join(self.directory, str(z), str(x), f"{y}.mvt")
+
+    def _sync_memory(self, version):
+        if not version:
+            self._memory.clear()
+        elif version != self.version:
+            self._memory.clear()
+            self.version = version
+
+    def _expired(self, rendered_at):
+        return self.max_age and time.time() - rendered_at > self.max_age
+
+    def invalidated_at(self):
+        """Thời điểm xóa tile gần nhất (0 nếu chưa từng xóa)."""
+        try:
+            with open(os.path.join(self.directory, INVALIDATED_AT_FILE), "r", encoding="ascii") as f:
+                return float(f.read())
+        except FileNotFoundError:
+            return 0.0
+        except (OSError, ValueError):
+            # Không đọc được -> coi như vừa xóa (không lưu tile nào)
+            return time.time()
+
+    def _mark_invalidated(self):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, INVALIDATED_AT_FILE)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "w", encoding="ascii") as f:
+            f.write(repr(time.time()))
+        os.replace(temp_path, path)
+
+    def get(self, z, x, y, version):
+        key = (z, x, y)
+        with self._lock:
+            self._sync_memory(version)
+            entry = self._memory.get(key)
+            if entry is not None and not self._expired(entry[1]):
+                self._memory.move_to_end(key)
+                return entry[0]
+        try:
+            with open(self._path(z, x, y), "rb") as f:
+                content = f.read()
+        except OSError:
+            return None
+        if len(content) < _STAMP.size:
+            return None
+        rendered_at = _STAMP.unpack_from(content)[0]
+        if self._expired(rendered_at):
+            return None
+        data = content[_STAMP.size:]
+        self._remember(key, data, rendered_at, version)
+        return data
+
+    def put(self, z, x, y, data, version, rendered_at):
+        """
+        Lưu tile đã dựng; ``rendered_at`` là time.time() lúc bắt đầu dựng (trước khi đọc DB).
+
+        Returns:
+            True nếu tile được lưu, False nếu có lần xóa tile xen giữa lúc dựng
+        """
+        if rendered_at <= self.invalidated_at():
+            return False
+        path = self._path(z, x, y)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Ghi file tạm rồi đổi tên: worker khác không đọc phải tile ghi dở
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(_STAMP.pack(rendered_at))
+            f.write(data)
+        os.replace(temp_path, path)
+        # invalidate() ghi thời điểm trước rồi mới xóa file: hoặc nó xóa được
+        # file vừa ghi, hoặc lần đọc này thấy thời điểm mới
+        if rendered_at <= self.invalidated_at():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return False
+        self._remember((z, x, y), data, rendered_at, version)
+        return True
+
+    def _remember(self, key, data, rendered_at, version):
+        if not version or not self.memory_items:
+            return
+        with self._lock:
+            self._sync_memory(version)
+            self._memory[key] = (data, rendered_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def invalidate(self, tiles, data_version=None):
+        with self._lock:
+            for key in tiles:
+                self._memory.pop(key, None)
+            if data_version and self.version is not None and data_version == self.version + 1:
+                self.version = data_version
+        if not tiles:
+            return
+        self._mark_invalidated()
+        for z, x, y in tiles:
+            try:
+                os.remove(self._path(z, x, y))
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        """Xóa mọi tile; thời điểm xóa được giữ lại để tile đang dựng dở không được lưu."""
+        with self._lock:
+            self._memory.clear()
+            self.version = None
+        self._mark_invalidated()
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+
+def get_tile_cache():
+    cache = current_app.extensions.get("tile_cache")
+    if cache is None:
+        cache = TileCache(
+            current_app.config.get("MAP_TILE_CACHE_DIR") or DEFAULT_CACHE_DIR,
+            current_app.config.get("MAP_TILE_MEMORY_ITEMS", DEFAULT_MEMORY_ITEMS),
+            current_app.config.get("MAP_TILE_MAX_AGE", DEFAULT_MAX_AGE),
+        )
+        current_app.extensions["tile_cache"] = cache
+    return cache
+
+
+def get_tile(z, x, y):
+    """
+    Bytes MVT của tile (rỗng nếu không có camera), đọc cache hoặc dựng mới.
+
+    Raises:
+        ValueError: nếu z/x/y ngoài phạm vi
+    """
+    if not valid_tile(z, x, y):
+        raise ValueError(f"Tile không hợp lệ: {z}/{x}/{y}")
+    cache = get_tile_cache()
+    version = get_data_version()
+    data = cache.get(z, x, y, version)
+    if data is not None:
+        return data
+    rendered_at = time.time()
+    data = render_tile(z, x, y)
+    # Có ghi xen giữa lúc dựng -> không lưu (tile có thể đã cũ)
+    if get_data_version() == version:
+        cache.put(z, x, y, data, version, rendered_at)
+    return data
+
+
+def _changed_tiles(change):
+    tiles = set()
+    old, new = change.old, change.new
+    if old is not None and new is not None and all(
+        old.get(field) == new.get(field) for field in _TILE_FIELDS
+    ):
+        return tiles
+    for row in (old, new):
+        if row is None:
+            continue
+        lat, lon = point_coordinates(row)
+        if lat is not None:
+            tiles.update(tiles_for_point(lat, lon))
+    return tiles
+
+
+def apply_camera_changes(changes, data_version=None):
+    """Listener của camera_events: xóa các tile chứa vị trí cũ/mới của camera."""
+    cache = get_tile_cache()
+    if len(changes) > MAX_TILE_INVALIDATION_CHANGES:
+        cache.clear()
+        return
+    tiles = set()
+    for change in changes:
+        tiles.update(_changed_tiles(change))
+    cache.invalidate(tiles, data_version)
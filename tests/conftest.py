@@ -0,0 +1,128 @@
+"""
+Pytest fixtures dùng chung (xem README_TESTING.md).
+
+App test dựng theo ``app.py`` với ``TestingConfig`` nhưng chỉ đăng ký các
+blueprint được kiểm thử, cùng listener ghi camera như app thật (không có
+CSRFProtect / Limiter của app.py). Mỗi test có một file SQLite mới trong
+tmp_path: SQLite trong bộ nhớ dùng chung một connection (StaticPool), nên
+connection riêng của services (kiểm tra index FTS / R*Tree) sẽ rollback cả
+transaction chưa commit của session. Các index trong bộ nhớ của services được
+xóa để không dùng lại dữ liệu của test trước.
+"""
+import pytest
+from flask import Flask
+from flask_caching import Cache
+from flask_login import LoginManager
+from werkzeug.security import generate_password_hash
+
+from config import config
+from models import User, db
+from services import camera_events, cluster_service, nearest_service, suggest_service, tile_service
+from services.camera_service import CameraService
+from services.geofence_service import GeofenceService
+from services.saved_search_service import SavedSearchService
+
+_listeners_registered = False
+
+
+def _register_listeners():
+    global _listeners_registered
+    if _listeners_registered:
+        return
+    camera_events.register_listener(SavedSearchService.apply_camera_changes)
+    camera_events.register_listener(GeofenceService.apply_camera_changes)
+    camera_events.register_listener(cluster_service.apply_camera_changes)
+    camera_events.register_listener(tile_service.apply_camera_changes)
+    _listeners_registered = True
+
+
+def _reset_indexes():
+    for module in (cluster_service, nearest_service, suggest_service):
+        module._indexes.clear()
+
+
+@pytest.fixture
+def app(tmp_path):
+    from auth import auth_bp
+    from camera import camera_bp
+    from dashboard import dashboard_bp
+    from map_view import map_bp
+
+    flask_app = Flask("sentrix_test")
+    flask_app.config.from_object(config["testing"])
+    flask_app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'sentrix.db'}",
+        MAP_TILE_CACHE_DIR=str(tmp_path / "tiles"),
+        ROUTE_CACHE_PATH=str(tmp_path / "routes.sqlite"),
+    )
+    db.init_app(flask_app)
+    Cache(flask_app, config={"CACHE_TYPE": "SimpleCache"})
+
+    login_manager = LoginManager()
+    login_manager.login_view = "auth.login"
+    login_manager.init_app(flask_app)
+    login_manager.user_loader(lambda user_id: db.session.get(User, int(user_id)))
+
+    for blueprint in (auth_bp, camera_bp, map_bp, dashboard_bp):
+        flask_app.register_blueprint(blueprint)
+    _register_listeners()
+
+    with flask_app.app_context():
+        db.create_all()
+        _reset_indexes()
+        yield flask_app
+        db.session.remove()
+        db.drop_all()
+        _reset_indexes()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_user(app):
+    user = User(username="testadmin", password=generate_password_hash("testpass"), role="admin")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def auth_client(client, admin_user):
+    response = client.post("/login", data={"username": "testadmin", "password": "testpass"})
+    assert response.status_code == 302
+    return client
+
+
+def _create_camera(**fields):
+    # Tạo qua CameraService để phát sự kiện ghi (camera_events) như form tạo camera
+    json_fields = {
+        name: fields.pop(name)
+        for name in ("monitoring_modes", "storage_types", "camera_types",
+                     "form_factors", "network_types", "install_areas")
+        if name in fields
+    }
+    return CameraService.create_camera(fields, json_fields)
+
+
+@pytest.fixture
+def camera_factory(app):
+    return _create_camera
+
+
+@pytest.fixture
+def sample_camera(camera_factory):
+    return camera_factory(
+        owner_name="Nguyễn Văn An",
+        organization_name="Công ty ABC",
+        address_street="12 Lê Lợi",
+        ward="Phường Bến Nghé",
+        province="TP Hồ Chí Minh",
+        phone="0901234567",
+        system_type="Hikvision",
+        latlon="10.7769,106.7009",
+        sharing_scope=True,
+        monitoring_modes=["Xem qua Internet"],
+    )
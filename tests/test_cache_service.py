@@ -0,0 +1,67 @@
+"""Data version và cache theo chữ ký bộ lọc (services/cache_service.py)."""
+import time
+
+import cachelib.simple
+
+from services.cache_service import (
+    DATA_VERSION_KEY,
+    bump_data_version,
+    cached_count,
+    filter_signature,
+    get_cache,
+    get_data_version,
+)
+
+
+def test_filter_signature_is_order_independent():
+    assert filter_signature({"ward": "A", "camera_types": ["IP", "Analog"]}) == filter_signature(
+        {"camera_types": ["Analog", "IP"], "ward": "A", "phone": "", "storage_types": []}
+    )
+    assert filter_signature({"ward": "A"}) != filter_signature({"ward": "B"})
+
+
+def test_bump_increments_version(app):
+    version = get_data_version()
+    assert bump_data_version() == version + 1
+    assert get_data_version() == version + 1
+
+
+def test_version_survives_default_timeout(app, monkeypatch):
+    get_data_version()
+    bumped = bump_data_version()
+
+    # Sau khi quá timeout mặc định (300 giây) của SimpleCache
+    later = time.time() + 10 * 300
+    monkeypatch.setattr(cachelib.simple, "time", lambda: later)
+    assert get_cache().get(DATA_VERSION_KEY) == bumped
+    assert get_data_version() == bumped
+
+
+def test_cached_count_is_reused_until_version_changes(app):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert cached_count("test", {"ward": "A"}, compute) == 1
+    assert cached_count("test", {"ward": "A"}, compute) == 1
+    assert cached_count("test", {"ward": "B"}, compute) == 2
+
+    bump_data_version()
+    assert cached_count("test", {"ward": "A"}, compute) == 3
+
+
+def test_camera_writes_invalidate_search_total(app, camera_factory, sample_camera):
+    from services.camera_service import CameraService
+
+    filters = {"ward": "Phường Bến Nghé"}
+    assert CameraService.search_cameras(filters)[1] == 1
+    version = get_data_version()
+
+    camera = camera_factory(owner_name="Mới", ward="Phường Bến Nghé")
+    assert get_data_version() > version
+    assert CameraService.search_cameras(filters)[1] == 2
+
+    CameraService.delete_camera(camera.id)
+    assert CameraService.search_cameras(filters)[1] == 1
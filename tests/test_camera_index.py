@@ -0,0 +1,134 @@
+"""Index dạng cột trong bộ nhớ (services/camera_index.py) so với đường SQL."""
+import time
+
+import pytest
+from sqlalchemy import update
+
+from models import Camera, db
+from services import camera_events
+from services.cache_service import bump_data_version
+from services.camera_index import get_camera_index, init_camera_index
+from services.camera_service import CameraService
+
+
+@pytest.fixture
+def cameras(camera_factory, sample_camera):
+    return [
+        sample_camera,
+        camera_factory(owner_name="Nguyễn Thị Bình", ward="Phường Bến Nghé", system_type="Dahua",
+                       manufacturer="Dahua", latlon="10.78,106.70", monitoring_modes=["Ghi"]),
+        camera_factory(owner_name="Trần Văn Cường", ward="Phường Bến Thành", system_type="Dahua",
+                       address_street="5 Hàm Nghi", latlon="10.77,106.69",
+                       monitoring_modes=["Xem qua Internet", "Ghi"], storage_types=["Thẻ nhớ"]),
+        camera_factory(owner_name="Lê Văn Dũng", ward="Phường Đa Kao", static_ip="10.0.0.1"),
+    ]
+
+
+@pytest.fixture
+def camera_index(app, cameras):
+    app.config.update(CAMERA_INDEX_ENABLED=True, CAMERA_INDEX_CHECK_INTERVAL=3600)
+    index = init_camera_index(app)
+    yield index
+    camera_events.unregister_listener(index.apply_changes)
+    app.extensions.pop("camera_index", None)
+
+
+def _sql_ids(filters):
+    return sorted(camera.id for camera in CameraService.build_search_query(filters).all())
+
+
+def _wait_for_rebuild(index):
+    deadline = time.monotonic() + 5
+    while index._rebuilding and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+FILTERS = [
+    {},
+    {"ward": "ben nghe"},
+    {"ward": "Phường Bến", "match": "prefix"},
+    {"owner_name": "văn"},
+    {"owner_name": "van", "ward": "ben"},
+    {"address_street": "ham nghi"},
+    {"system_type": "Dahua"},
+    {"monitoring_modes": ["Ghi"]},
+    {"monitoring_modes": ["Xem qua Internet", "Ghi"], "storage_types": ["Thẻ nhớ"]},
+    {"province": "ho chi minh"},
+]
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_search_ids_match_sql(camera_index, filters):
+    assert camera_index.search_ids(filters).tolist() == _sql_ids(filters)
+
+
+def test_unsupported_filters_fall_back_to_sql(camera_index):
+    assert camera_index.search_ids({"phone": "0901"}) is None
+    assert camera_index.search_ids({"ip_range": "10.0.0.0/8"}) is None
+    assert camera_index.search_ids({"monitoring_modes": ["Ngoài danh mục"]}) is None
+
+
+def test_search_cameras_uses_index(camera_index, monkeypatch):
+    items, total, _ = CameraService.search_cameras({"ward": "ben nghe"})
+    assert total == 2
+
+    def fail(filters):
+        raise AssertionError("không được dùng SQL khi index trả lời được")
+
+    monkeypatch.setattr(CameraService, "build_search_query", fail)
+    assert [camera.id for camera in CameraService.search_cameras({"ward": "ben nghe"})[0]] == [
+        camera.id for camera in items
+    ]
+
+
+def test_facet_and_summary_counts_match_sql(app, camera_index):
+    filters = {"ward": "Phường"}
+    indexed = CameraService._compute_facet_counts(filters)
+    app.config["CAMERA_INDEX_ENABLED"] = False
+    assert indexed == CameraService._compute_facet_counts(filters)
+
+    assert camera_index.summary() == {
+        "total": 4, "with_latlon": 3, "with_sharing": 1, "with_static_ip": 1,
+    }
+    assert [point["owner"] for point in camera_index.map_points()] == [
+        "Nguyễn Văn An", "Nguyễn Thị Bình", "Trần Văn Cường",
+    ]
+
+
+def test_index_follows_camera_writes(camera_index, cameras, camera_factory):
+    created = camera_factory(owner_name="Mới", ward="Phường Bến Nghé")
+    CameraService.update_camera(cameras[1].id, {"ward": "Phường Đa Kao"}, {})
+    CameraService.delete_camera(cameras[0].id)
+
+    assert get_camera_index() is camera_index
+    assert camera_index.search_ids({"ward": "ben nghe"}).tolist() == [created.id]
+    assert camera_index.search_ids({"ward": "da kao"}).tolist() == _sql_ids({"ward": "da kao"})
+    assert camera_index.check_consistency()
+
+
+def test_missed_write_makes_index_stale(camera_index):
+    bump_data_version()
+    assert get_camera_index() is None
+    _wait_for_rebuild(camera_index)
+    assert get_camera_index() is camera_index
+
+
+def test_check_consistency_scans_table_in_chunks(camera_index, cameras):
+    assert camera_index.check_consistency(max_rows=2)
+    # Ghi SQL trực tiếp, không qua camera_events, vào đoạn đã kiểm tra
+    db.session.execute(update(Camera).where(Camera.id == cameras[0].id).values(ward="Phường 1"))
+    db.session.commit()
+
+    # Checksum tổng không đổi; các đoạn sau vẫn khớp, quay lại đầu bảng thì phát hiện lệch
+    results = [camera_index.check_consistency(max_rows=2) for _ in range(3)]
+    assert results[:-1] == [True, True]
+    assert results[-1] is False
+
+
+def test_check_consistency_detects_missing_rows(camera_index, cameras):
+    db.session.execute(update(Camera).where(Camera.id == cameras[2].id).values(monitoring_modes_mask=0))
+    db.session.commit()
+    assert not camera_index.check_consistency()
+
+    camera_index.rebuild()
+    assert camera_index.check_consistency()
@@ -0,0 +1,87 @@
+"""Cụm camera /map/api/clusters (services/cluster_service.py)."""
+import random
+
+import pytest
+
+from services.camera_events import CameraChange
+from services.cluster_service import MAX_CLUSTER_ZOOM, ClusterIndex
+
+
+@pytest.fixture
+def cameras(camera_factory, sample_camera):
+    return [
+        sample_camera,
+        camera_factory(owner_name="Gần", latlon="10.7772,106.7012", system_type="Dahua"),
+        camera_factory(owner_name="Xa", latlon="10.80,106.75", system_type="Dahua"),
+        camera_factory(owner_name="Chưa rõ hệ thống", latlon="10.7771,106.7008"),
+    ]
+
+
+def test_clusters(auth_client, cameras, camera_factory):
+    url = "/map/api/clusters?bbox=106.6,10.7,106.8,10.9&zoom={}"
+    clusters = auth_client.get(url.format(5)).get_json()["clusters"]
+    assert sum(cluster["count"] for cluster in clusters) == 4
+
+    deep = auth_client.get(url.format(MAX_CLUSTER_ZOOM + 1)).get_json()["clusters"]
+    assert sorted(point["id"] for point in deep) == sorted(camera.id for camera in cameras)
+
+    # Ghi camera cập nhật lưới đã dựng
+    camera_factory(owner_name="Thêm", latlon="10.78,106.71", system_type="Dahua")
+    clusters = auth_client.get(url.format(5)).get_json()["clusters"]
+    assert sum(cluster["count"] for cluster in clusters) == 5
+    assert auth_client.get("/map/api/clusters?bbox=106.6,10.7,106.8,10.9").status_code == 400
+
+
+def _rows(count, seed=1):
+    rng = random.Random(seed)
+    return [
+        {"id": i, "latitude": 10.7 + rng.random() * 0.2, "longitude": 106.6 + rng.random() * 0.2,
+         "system_type": rng.choice(["A", "B", None])}
+        for i in range(1, count + 1)
+    ]
+
+
+def _normalized(clusters):
+    # Tổng tọa độ cập nhật tăng dần có thể lệch sai số dấu phẩy động
+    return sorted(
+        (cluster.get("cluster", ""), cluster.get("id", 0), cluster["count"], round(cluster["lat"], 9),
+         round(cluster["lon"], 9), sorted(cluster["systems"].items()))
+        for cluster in clusters
+    )
+
+
+@pytest.mark.parametrize("zoom", [0, 8, 12, MAX_CLUSTER_ZOOM])
+def test_clusters_partition_cameras_in_bbox(zoom):
+    rows = _rows(300)
+    index = ClusterIndex(rows)
+    bbox = (106.65, 10.75, 106.75, 10.85)
+    clusters = index.clusters(bbox, zoom)
+    # Mỗi camera thuộc đúng một ô; ô giao khung nhìn chứa mọi camera trong khung
+    inside = {row["id"] for row in rows
+              if bbox[0] <= row["longitude"] <= bbox[2] and bbox[1] <= row["latitude"] <= bbox[3]}
+    assert sum(cluster["count"] for cluster in clusters) >= len(inside)
+    singles = {cluster["id"] for cluster in clusters if cluster["count"] == 1}
+    assert all("cluster" in cluster for cluster in clusters if cluster["count"] > 1)
+    assert singles <= {row["id"] for row in rows}
+    for cluster in clusters:
+        assert sum(cluster["systems"].values()) == cluster["count"]
+
+
+def test_incremental_changes_match_rebuild():
+    rows = _rows(200)
+    index = ClusterIndex(rows)
+    moved = dict(rows[0], latitude=10.95, longitude=106.95, system_type="B")
+    created = {"id": 999, "latitude": 10.71, "longitude": 106.61, "system_type": "A"}
+    index.apply_changes([
+        CameraChange("update", moved["id"], rows[0], moved),
+        CameraChange("create", created["id"], None, created),
+        CameraChange("delete", rows[1]["id"], rows[1], None),
+        CameraChange("update", rows[2]["id"], rows[2], dict(rows[2], latitude=None, longitude=None)),
+    ], data_version=7)
+    expected = ClusterIndex([moved, created] + rows[3:])
+
+    assert len(index) == len(expected) == 199
+    assert index.version == 7
+    bbox = (106.5, 10.6, 107.0, 11.0)
+    for zoom in (3, 10, 15, MAX_CLUSTER_ZOOM + 1):
+        assert _normalized(index.clusters(bbox, zoom)) == _normalized(expected.clusters(bbox, zoom))
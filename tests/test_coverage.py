@@ -0,0 +1,159 @@
+"""Vùng trống camera: gán nhãn, dò biên đa giác (services/coverage_service.py) và job /map/api/coverage."""
+import time
+
+import numpy as np
+import pytest
+
+from services.coverage_service import (
+    _boundary_edges,
+    _gap_polygons,
+    _label_runs,
+    _signed_area,
+    _trace_rings,
+    plan_coverage,
+)
+from services.geofence_service import parse_polygons
+
+
+def _flood_fill_count(grid):
+    """Số vùng liên thông 4 láng giềng (cách làm đơn giản để đối chiếu)."""
+    seen = np.zeros_like(grid, dtype=bool)
+    count = 0
+    rows, cols = grid.shape
+    for row in range(rows):
+        for col in range(cols):
+            if not grid[row, col] or seen[row, col]:
+                continue
+            count += 1
+            stack = [(row, col)]
+            seen[row, col] = True
+            while stack:
+                r, c = stack.pop()
+                for nr, nc in ((r + 1, c), (r - 1, c), (r, c + 1), (r, c - 1)):
+                    if 0 <= nr < rows and 0 <= nc < cols and grid[nr, nc] and not seen[nr, nc]:
+                        seen[nr, nc] = True
+                        stack.append((nr, nc))
+    return count
+
+
+def _plan(rows, cols):
+    polygons = parse_polygons({"type": "Polygon", "coordinates": [[
+        [106.0, 10.0], [106.01, 10.0], [106.01, 10.01], [106.0, 10.01],
+    ]]})
+    return plan_coverage(polygons=polygons, radius_m=50, cell_m=25)._replace(rows=rows, cols=cols)
+
+
+def test_label_runs_matches_flood_fill():
+    rng = np.random.default_rng(3)
+    for density in (0.3, 0.5, 0.7):
+        grid = rng.random((40, 50)) < density
+        run_rows, starts, ends, labels = _label_runs(grid)
+        assert int((ends - starts).sum()) == int(grid.sum())
+        assert len(np.unique(labels)) == _flood_fill_count(grid)
+
+
+def test_label_runs_u_shape_is_one_component():
+    grid = np.array([
+        [1, 0, 1],
+        [1, 0, 1],
+        [1, 1, 1],
+    ], dtype=bool)
+    _, _, _, labels = _label_runs(grid)
+    assert len(np.unique(labels)) == 1
+    assert len(_label_runs(np.zeros((3, 3), dtype=bool))[3]) == 0
+
+
+def _rings(grid):
+    components = np.where(grid, 0, -1)
+    _, x0, y0, x1, y1, directions = _boundary_edges(components)
+    return _trace_rings(x0, y0, x1, y1, directions)
+
+
+def test_trace_rings_square_with_hole():
+    grid = np.ones((3, 3), dtype=bool)
+    grid[1, 1] = False
+    rings = sorted(_rings(grid), key=_signed_area, reverse=True)
+    assert len(rings) == 2
+    exterior, hole = rings
+    # Biên ngoài ngược chiều kim đồng hồ, lỗ cùng chiều; cạnh thẳng hàng được gộp
+    assert _signed_area(exterior) == 9
+    assert _signed_area(hole) == -1
+    assert sorted(exterior) == [(0, 0), (0, 3), (3, 0), (3, 3)]
+
+
+def test_trace_rings_corner_touching_cells_are_separate():
+    grid = np.array([
+        [1, 0],
+        [0, 1],
+    ], dtype=bool)
+    rings = _rings(grid)
+    assert len(rings) == 2
+    assert all(_signed_area(ring) == 1 for ring in rings)
+
+
+def test_gap_polygons_largest_first():
+    gaps = np.zeros((6, 8), dtype=bool)
+    gaps[0:3, 0:3] = True
+    gaps[1, 1] = False
+    gaps[4:6, 6:8] = True
+    gaps[5, 0] = True
+    count, features = _gap_polygons(_plan(6, 8), gaps, max_polygons=2)
+    assert count == 3
+    assert [feature["properties"]["cells"] for feature in features] == [8, 4]
+    outer, hole = features[0]["geometry"]["coordinates"]
+    assert outer[0] == outer[-1] and len(outer) == 5
+    assert len(hole) == 5
+
+
+def test_plan_coverage_validation():
+    polygons = parse_polygons({"type": "Polygon", "coordinates": [[
+        [106.0, 10.0], [106.01, 10.0], [106.01, 10.01], [106.0, 10.01],
+    ]]})
+    plan = plan_coverage(polygons=polygons, radius_m=100, cell_m=25)
+    assert plan.rows == 45 and plan.cols > 40
+    with pytest.raises(ValueError):
+        plan_coverage(polygons=polygons, radius_m=0)
+    with pytest.raises(ValueError):
+        plan_coverage(polygons=polygons, radius_m=1000, cell_m=5)
+    with pytest.raises(ValueError):
+        plan_coverage(route_points=[[10.0, 106.0]], buffer_m=50)
+    with pytest.raises(ValueError):
+        plan_coverage()
+
+
+@pytest.fixture
+def cameras(camera_factory, sample_camera):
+    return [
+        sample_camera,
+        camera_factory(owner_name="Gần", latlon="10.7772,106.7012", system_type="Dahua"),
+        camera_factory(owner_name="Xa", latlon="10.80,106.75", system_type="Dahua"),
+        camera_factory(owner_name="Chưa rõ hệ thống", latlon="10.7771,106.7008"),
+    ]
+
+
+def _wait_for_job(client, status_url, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(status_url).get_json()
+        if job["status"] in ("finished", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError("Job chưa xong")
+
+
+def test_coverage_job(auth_client, cameras):
+    response = auth_client.post("/map/api/coverage", json={
+        "bbox": [106.70, 10.77, 106.71, 10.78], "radius": 100, "cell": 25,
+    })
+    assert response.status_code == 202
+    job = _wait_for_job(auth_client, response.get_json()["status_url"])
+    assert job["status"] == "finished", job["error"]
+    result = job["result"]
+    assert result["cameras"] == 3
+    assert 0 < result["coverage_percent"] < 100
+    assert result["gap_count"] >= 1
+    assert result["gaps"]["features"][0]["geometry"]["type"] == "Polygon"
+
+    assert auth_client.post("/map/api/coverage", json={"bbox": [1, 2, 3]}).status_code == 400
+    assert auth_client.post("/map/api/coverage", json=[]).status_code == 400
+    assert auth_client.get("/map/api/coverage/khong-co").status_code == 404
@@ -0,0 +1,44 @@
+"""Số đếm facet /camera/api/facets (CameraService.get_facet_counts)."""
+import pytest
+
+from services.camera_service import CameraService
+
+
+@pytest.fixture
+def cameras(camera_factory, sample_camera):
+    return [
+        sample_camera,
+        camera_factory(owner_name="Nguyễn Thị Bình", ward="Phường Bến Nghé", system_type="Dahua",
+                       manufacturer="Dahua", latlon="10.78,106.70", monitoring_modes=["Ghi"]),
+        camera_factory(owner_name="Trần Văn Cường", ward="Phường Bến Thành", system_type="Dahua",
+                       manufacturer="Dahua", latlon="10.77,106.69",
+                       monitoring_modes=["Xem qua Internet", "Ghi"]),
+        camera_factory(owner_name="Lê Văn Dũng", ward="Phường Đa Kao"),
+    ]
+
+
+def test_facets(auth_client, cameras):
+    data = auth_client.get("/camera/api/facets").get_json()
+    assert data["total"] == 4
+    facets = {field: {item["value"]: item["count"] for item in items} for field, items in data["facets"].items()}
+    assert facets["system_type"] == {"Hikvision": 1, "Dahua": 2, "Chưa phân loại": 1}
+    assert facets["monitoring_modes"] == {"Xem qua Internet": 2, "Ghi": 2}
+
+    filtered = auth_client.get("/camera/api/facets?ward=Phường Bến Nghé").get_json()
+    assert filtered["total"] == 2
+    assert filtered["facets"]["ward"] == [{"value": "Phường Bến Nghé", "count": 2}]
+
+    by_option = auth_client.get("/camera/api/facets?monitoring_modes=Ghi").get_json()
+    assert by_option["total"] == 2
+
+
+def test_facets_follow_camera_writes(app, cameras, camera_factory):
+    before = CameraService.get_facet_counts({"ward": "Phường Bến Nghé"})
+    assert before["facets"]["system_type"] == {"Hikvision": 1, "Dahua": 1}
+
+    camera_factory(owner_name="Mới", ward="Phường Bến Nghé", system_type="Dahua",
+                   storage_types=["Đám mây"])
+    after = CameraService.get_facet_counts({"ward": "Phường Bến Nghé"})
+    assert after["total"] == 3
+    assert after["facets"]["system_type"] == {"Hikvision": 1, "Dahua": 2}
+    assert after["facets"]["storage_types"] == {"Đám mây": 1}
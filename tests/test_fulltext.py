@@ -0,0 +1,91 @@
+"""Full-text index (services/fulltext_service.py): FTS5 trên SQLite, đồng bộ bằng trigger."""
+import pytest
+
+from models import db
+from services import fulltext_service
+from services.camera_service import CameraService, _search_plan
+from services.fulltext_service import (
+    build_match_query,
+    drop_fulltext_index,
+    ensure_fulltext_index,
+    fulltext_available,
+    fulltext_fields,
+    tokenize_query,
+)
+
+
+@pytest.fixture
+def fts(app):
+    assert ensure_fulltext_index() is True
+    yield
+    drop_fulltext_index()
+
+
+def _owners(filters):
+    items, total, _ = CameraService.search_cameras(filters)
+    assert total == len(items)
+    return sorted(camera.owner_name for camera in items)
+
+
+def test_tokenize_and_match_query():
+    assert tokenize_query("Đông  Vệ, P.3") == ["dong", "ve", "p", "3"]
+    assert tokenize_query("   ") == []
+    assert build_match_query({"owner_name": "Nguyễn An", "ward": "Đông"}) == (
+        'owner_name_norm : "nguyen"* AND owner_name_norm : "an"* AND ward_norm : "dong"*'
+    )
+
+
+def test_without_index_falls_back_to_like(app, sample_camera):
+    fulltext_service._availability.invalidate(db.engine)
+    assert not fulltext_available()
+    assert fulltext_fields({"owner_name": "nguyen"}) == []
+
+    shape, _ = _search_plan({"owner_name": "nguyen"}, "sqlite")
+    assert shape == (("like", "owner_name_norm"),)
+    assert _owners({"owner_name": "nguyen van"}) == ["Nguyễn Văn An"]
+
+
+def test_index_created_after_missing_is_picked_up(app, sample_camera):
+    assert not fulltext_available()
+    ensure_fulltext_index()
+    try:
+        assert fulltext_available()
+    finally:
+        drop_fulltext_index()
+
+
+def test_search_uses_fulltext_and_ignores_accents(fts, camera_factory, sample_camera):
+    camera_factory(owner_name="Trần Thị Bình", ward="Phường Đông Vệ")
+    camera_factory(owner_name="Nguyễn Thị Cúc", ward="Phường Bến Thành")
+
+    assert fulltext_fields({"owner_name": "nguyen van", "phone": "0901"}) == ["owner_name"]
+    shape, params = _search_plan({"owner_name": "nguyen van"}, "sqlite")
+    assert shape == (("fulltext", ("owner_name",)),)
+    assert params == {"s0": 'owner_name_norm : "nguyen"* AND owner_name_norm : "van"*'}
+
+    assert _owners({"owner_name": "nguyen van"}) == ["Nguyễn Văn An"]
+    assert _owners({"owner_name": "NGUYỄN"}) == ["Nguyễn Thị Cúc", "Nguyễn Văn An"]
+    # Tiền tố từng token, kết hợp nhiều trường bằng AND
+    assert _owners({"ward": "dong v"}) == ["Trần Thị Bình"]
+    assert _owners({"owner_name": "nguyen", "ward": "ben th"}) == ["Nguyễn Thị Cúc"]
+    # Token không có trong index
+    assert _owners({"owner_name": "le"}) == []
+
+
+def test_existing_rows_are_indexed_on_creation(app, sample_camera):
+    ensure_fulltext_index()
+    try:
+        assert _owners({"organization_name": "cong ty"}) == ["Nguyễn Văn An"]
+    finally:
+        drop_fulltext_index()
+
+
+def test_triggers_follow_update_and_delete(fts, sample_camera):
+    CameraService.update_camera(
+        sample_camera.id, {"owner_name": "Lê Văn Đức"}, {}
+    )
+    assert _owners({"owner_name": "nguyen"}) == []
+    assert _owners({"owner_name": "le duc"}) == ["Lê Văn Đức"]
+
+    CameraService.delete_camera(sample_camera.id)
+    assert _owners({"owner_name": "le duc"}) == []
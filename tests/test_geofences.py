@@ -0,0 +1,140 @@
+"""Tìm camera trong đa giác và geofence (services/geofence_service.py)."""
+import re
+
+import pytest
+from sqlalchemy import event
+
+from models import Geofence, GeofenceCamera, db
+from services.camera_service import CameraService
+from services.geofence_service import GeofenceService, parse_polygons, points_in_polygons
+
+SQUARE = {"type": "Polygon", "coordinates": [[
+    [106.70, 10.77], [106.71, 10.77], [106.71, 10.78], [106.70, 10.78], [106.70, 10.77],
+]]}
+
+
+@pytest.fixture
+def cameras(camera_factory, sample_camera):
+    return [
+        sample_camera,
+        camera_factory(owner_name="Gần", latlon="10.7772,106.7012", system_type="Dahua"),
+        camera_factory(owner_name="Xa", latlon="10.80,106.75", system_type="Dahua"),
+        camera_factory(owner_name="Chưa rõ hệ thống", latlon="10.7771,106.7008"),
+    ]
+
+
+@pytest.fixture
+def statements(app):
+    """Danh sách câu SQL đã chạy trong lúc test."""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def _members(geofence):
+    return sorted(row[0] for row in db.session.query(GeofenceCamera.camera_id).filter_by(geofence_id=geofence.id))
+
+
+def test_points_in_polygons_excludes_boundary_and_holes():
+    polygons = parse_polygons({"type": "Polygon", "coordinates": [
+        [[0, 0], [10, 0], [10, 10], [0, 10], [0, 0]],
+        [[4, 4], [6, 4], [6, 6], [4, 6], [4, 4]],
+    ]})
+    lats = [1, 5, 0, 10, 5, 0, 4, 5, 11]
+    lons = [1, 5, 5, 5, 0, 0, 5, 4, 5]
+    # Trong / trong lỗ / cạnh dưới / cạnh trên / cạnh trái / đỉnh / cạnh lỗ / cạnh lỗ / ngoài
+    assert points_in_polygons(lats, lons, polygons).tolist() == [
+        True, False, False, False, False, False, False, False, False,
+    ]
+
+    triangle = parse_polygons({"type": "Polygon", "coordinates": [[[0, 0], [4, 0], [0, 4], [0, 0]]]})
+    # Điểm trên cạnh chéo cũng là biên
+    assert points_in_polygons([2, 1], [2, 1], triangle).tolist() == [False, True]
+
+
+def test_polygon(auth_client, cameras):
+    response = auth_client.post("/map/api/polygon", json=SQUARE)
+    data = response.get_json()
+    assert data["count"] == 3
+    assert cameras[2].id not in [camera["id"] for camera in data["cameras"]]
+    assert auth_client.post("/map/api/polygon", json={"type": "Point"}).status_code == 400
+
+
+def test_geofences_follow_camera_writes(auth_client, cameras, camera_factory):
+    response = auth_client.post("/map/api/geofences", json={"name": "Trung tâm", "geometry": SQUARE})
+    assert response.status_code == 201
+    geofence = response.get_json()
+    assert geofence["count"] == 3
+
+    camera_factory(owner_name="Mới", latlon="10.775,106.705")
+    detail = auth_client.get(f"/map/api/geofences/{geofence['id']}").get_json()
+    assert detail["count"] == 4
+    assert len(detail["cameras"]) == 4
+    assert detail["geometry"]["type"] in ("Polygon", "MultiPolygon")
+
+    listing = auth_client.get("/map/api/geofences").get_json()
+    assert [item["id"] for item in listing] == [geofence["id"]]
+    assert auth_client.post(f"/map/api/geofences/{geofence['id']}/refresh").get_json()["count"] == 4
+    assert auth_client.post(f"/map/api/geofences/{geofence['id']}/delete").status_code == 200
+    assert auth_client.get(f"/map/api/geofences/{geofence['id']}").status_code == 404
+    assert auth_client.post("/map/api/geofences", json={"name": "", "geometry": SQUARE}).status_code == 400
+
+
+def test_camera_moves_update_membership(app, admin_user, cameras):
+    geofence = GeofenceService.create(admin_user.id, "Trung tâm", SQUARE)
+    inside = sorted(camera.id for camera in (cameras[0], cameras[1], cameras[3]))
+    assert _members(geofence) == inside
+
+    CameraService.update_camera(cameras[2].id, {"latlon": "10.776,106.706"}, {})
+    CameraService.update_camera(cameras[0].id, {"latlon": "10.90,106.90"}, {})
+    CameraService.delete_camera(cameras[1].id)
+    # Di chuyển lên đúng cạnh đa giác: không còn nằm trong (như ST_Within)
+    CameraService.update_camera(cameras[3].id, {"latlon": "10.77,106.705"}, {})
+
+    db.session.refresh(geofence)
+    assert _members(geofence) == [cameras[2].id]
+    assert geofence.camera_count == 1
+    assert GeofenceService.refresh(geofence) == 1
+
+
+def test_unmoved_camera_edit_skips_geofences(app, admin_user, cameras, statements):
+    GeofenceService.create(admin_user.id, "Trung tâm", SQUARE)
+    statements.clear()
+    CameraService.update_camera(cameras[0].id, {"phone": "0911111111"}, {})
+    assert not [statement for statement in statements if "geofence" in statement]
+
+
+def test_only_geofences_around_moved_camera_are_loaded(app, admin_user, cameras, statements):
+    near = GeofenceService.create(admin_user.id, "Trung tâm", SQUARE)
+    far = GeofenceService.create(admin_user.id, "Ngoại thành", {"type": "Polygon", "coordinates": [[
+        [106.80, 10.90], [106.81, 10.90], [106.81, 10.91], [106.80, 10.91], [106.80, 10.90],
+    ]]})
+    near_id, far_id, camera_id = near.id, far.id, cameras[2].id
+    # Bỏ identity map để sự kiện "load" ghi nhận mọi geofence được nạp lại
+    db.session.expunge_all()
+    statements.clear()
+    loaded = []
+
+    def record(target, context):
+        loaded.append(target.id)
+
+    event.listen(Geofence, "load", record)
+    try:
+        # Camera xa đổi vị trí nhưng vẫn ngoài khung bao của mọi geofence
+        CameraService.update_camera(camera_id, {"latlon": "10.81,106.76"}, {})
+        assert loaded == []
+        assert not [statement for statement in statements if re.search(r"\bgeofence_camera\b", statement)]
+
+        CameraService.update_camera(camera_id, {"latlon": "10.905,106.805"}, {})
+        assert loaded == [far_id]
+    finally:
+        event.remove(Geofence, "load", record)
+
+    assert _members(db.session.get(Geofence, far_id)) == [camera_id]
+    assert db.session.get(Geofence, near_id).camera_count == 3
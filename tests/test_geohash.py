@@ -0,0 +1,101 @@
+"""Geohash và khoảng phủ khung chữ nhật (geohash_utils.py), lọc khung theo geohash (services/spatial_index.py)."""
+import random
+
+from geohash_utils import GEOHASH_PRECISION, MAX_COVER_CELLS, cover_precision, cover_ranges, encode
+from models import Camera, db
+from services import spatial_index
+from services.camera_service import CameraService
+from services.spatial_index import bbox_criteria, geohash_available, geohash_criterion
+
+
+def _in_ranges(geohash, ranges):
+    return any(start <= geohash and (stop is None or geohash < stop) for start, stop in ranges)
+
+
+def test_encode_known_values():
+    assert encode(10.7769, 106.7009, 7) == "w3gvk1c"
+    assert encode(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    assert len(encode(0, 0)) == GEOHASH_PRECISION
+    assert encode(None, 106.0) is None
+    assert encode(91, 0) is None
+    assert encode("abc", 0) is None
+
+
+def test_encode_prefix_property():
+    full = encode(21.0285, 105.8542)
+    assert all(encode(21.0285, 105.8542, precision) == full[:precision] for precision in range(1, 9))
+
+
+def test_cover_ranges_contain_every_point_in_box():
+    rng = random.Random(7)
+    boxes = [
+        (10.70, 10.85, 106.60, 106.78),
+        (10.7769, 10.7770, 106.7009, 106.7011),
+        (-0.5, 0.5, -0.5, 0.5),
+        (89.0, 90.0, 179.0, 180.0),
+    ]
+    for box in boxes:
+        ranges = cover_ranges([box])
+        min_lat, max_lat, min_lon, max_lon = box
+        for _ in range(300):
+            lat = rng.uniform(min_lat, max_lat)
+            lon = rng.uniform(min_lon, max_lon)
+            assert _in_ranges(encode(lat, lon), ranges), (box, lat, lon)
+        for corner in ((min_lat, min_lon), (max_lat, max_lon)):
+            assert _in_ranges(encode(*corner), ranges)
+
+
+def test_cover_ranges_are_sorted_disjoint_and_bounded():
+    ranges = cover_ranges([(10.70, 10.85, 106.60, 106.78), (10.80, 10.90, 106.70, 106.95)])
+    assert ranges
+    for (start, stop), (next_start, _) in zip(ranges, ranges[1:]):
+        assert start < stop < next_start
+    assert len(ranges) <= 2 * MAX_COVER_CELLS
+    # Điểm xa khung không thuộc khoảng nào
+    assert not _in_ranges(encode(21.0285, 105.8542), ranges)
+
+
+def test_cover_ranges_clamp_and_skip_invalid_boxes():
+    assert cover_ranges([(10.0, 9.0, 106.0, 107.0)]) == []
+    whole_world = cover_ranges([(-100.0, 100.0, -200.0, 200.0)])
+    assert whole_world == [("0", None)]
+
+
+def test_cover_precision_limits_cells():
+    assert cover_precision(10.0, 10.0001, 106.0, 106.0001) == GEOHASH_PRECISION
+    assert cover_precision(-90.0, 90.0, -180.0, 180.0) == 1
+
+
+def test_camera_writes_keep_geohash(sample_camera):
+    assert sample_camera.geohash == encode(10.7769, 106.7009)
+    CameraService.update_camera(sample_camera.id, {"latlon": "10.80,106.75"}, {})
+    assert db.session.get(Camera, sample_camera.id).geohash == encode(10.80, 106.75)
+
+
+def test_geohash_criterion_matches_columns(camera_factory, sample_camera):
+    cameras = [
+        sample_camera,
+        camera_factory(owner_name="Gần", latlon="10.7772,106.7012"),
+        camera_factory(owner_name="Xa", latlon="10.80,106.75"),
+        camera_factory(owner_name="Không tọa độ"),
+    ]
+    spatial_index._geohash_availability.invalidate(db.engine)
+    assert geohash_available()
+    box = (10.77, 10.78, 106.70, 106.71)
+    expected = [cameras[0].id, cameras[1].id]
+    assert sorted(camera.id for camera in Camera.query.filter(*bbox_criteria(*box))) == expected
+    # Ô geohash phủ rộng hơn khung: tập ứng viên chứa mọi camera trong khung
+    candidates = {camera.id for camera in Camera.query.filter(geohash_criterion([box]))}
+    assert set(expected) <= candidates
+    assert cameras[2].id not in candidates and cameras[3].id not in candidates
+
+
+def test_geohash_unavailable_until_backfilled(sample_camera):
+    db.session.execute(db.update(Camera).values(geohash=None))
+    db.session.commit()
+    spatial_index._geohash_availability.invalidate(db.engine)
+    assert not geohash_available()
+
+    CameraService.backfill_geohash()
+    spatial_index._geohash_availability.invalidate(db.engine)
+    assert geohash_available()
@@ -0,0 +1,71 @@
+"""Heatmap mật độ camera /map/api/heatmap (services/cluster_service.py)."""
+import pytest
+
+from services.camera_events import CameraChange
+from services.cluster_service import ClusterIndex
+
+
+@pytest.fixture
+def cameras(camera_factory, sample_camera):
+    return [
+        sample_camera,
+        camera_factory(owner_name="Gần", latlon="10.7772,106.7012", system_type="Dahua"),
+        camera_factory(owner_name="Xa", latlon="10.80,106.75", system_type="Dahua"),
+        camera_factory(owner_name="Chưa rõ hệ thống", latlon="10.7771,106.7008"),
+    ]
+
+
+def test_heatmap(auth_client, cameras):
+    url = "/map/api/heatmap?bbox=106.6,10.7,106.8,10.9&zoom=10"
+    response = auth_client.get(url)
+    data = response.get_json()
+    assert sum(cell[2] for cell in data["cells"]) == 4
+    assert data["max"] == max(cell[2] for cell in data["cells"])
+    assert set(data["systems"]) >= {"Hikvision", "Dahua", "Chưa phân loại"}
+
+    etag = response.headers["ETag"]
+    assert auth_client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    filtered = auth_client.get(url + "&system=Dahua").get_json()
+    assert sum(cell[2] for cell in filtered["cells"]) == 2
+    assert auth_client.get("/map/api/heatmap?bbox=1,2,3&zoom=10").status_code == 400
+
+
+def test_heatmap_follows_camera_writes(auth_client, cameras, camera_factory):
+    url = "/map/api/heatmap?bbox=106.6,10.7,106.8,10.9&zoom=10"
+    etag = auth_client.get(url).headers["ETag"]
+    camera_factory(owner_name="Thêm", latlon="10.78,106.71", system_type="Dahua")
+
+    response = auth_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert sum(cell[2] for cell in response.get_json()["cells"]) == 5
+
+
+def test_cluster_index_merges_unclassified_systems():
+    index = ClusterIndex([
+        {"id": 1, "latitude": 10.0, "longitude": 106.0, "system_type": None},
+        {"id": 2, "latitude": 10.0002, "longitude": 106.0002, "system_type": "Chưa phân loại"},
+        {"id": 3, "latitude": 10.0004, "longitude": 106.0004, "system_type": "A"},
+    ])
+    bbox = (105.9, 9.9, 106.1, 10.1)
+    (cluster,) = index.clusters(bbox, 5)
+    assert cluster["systems"] == {"Chưa phân loại": 2, "A": 1}
+    # Lọc theo hệ thống: tâm chỉ tính camera của hệ thống đó
+    (cell,) = index.heatmap(bbox, 5, system="A")
+    assert (cell["lat"], cell["lon"], cell["count"]) == (10.0004, 106.0004, 1)
+
+
+def test_heatmap_incremental_changes():
+    first = {"id": 1, "latitude": 10.0, "longitude": 106.0, "system_type": "A"}
+    second = {"id": 2, "latitude": 10.0002, "longitude": 106.0002, "system_type": "B"}
+    index = ClusterIndex([first, second])
+    bbox = (105.0, 9.0, 107.0, 11.0)
+
+    moved = dict(second, latitude=10.5, longitude=106.5)
+    index.apply_changes([
+        CameraChange("update", 2, second, moved),
+        CameraChange("delete", 1, first, None),
+    ])
+    (cell,) = index.heatmap(bbox, 12)
+    assert (cell["lat"], cell["lon"], cell["count"], cell["systems"]) == (10.5, 106.5, 1, {"B": 1})
+    assert index.heatmap(bbox, 12, system="A") == []
@@ -0,0 +1,63 @@
+"""Tìm camera theo dải IP (ip_utils, cột static_ip_num)."""
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from camera import _parse_search_filters
+from ip_utils import ip_to_key, parse_ip, parse_ip_range
+from services.camera_service import CameraService, _search_plan
+
+
+def _owners(filters):
+    items, _, _ = CameraService.search_cameras(filters)
+    return sorted(camera.owner_name for camera in items)
+
+
+def test_parse_ip_strips_port_and_brackets():
+    assert str(parse_ip(" 10.20.1.5:8000 ")) == "10.20.1.5"
+    assert str(parse_ip("[fe80::1]:554")) == "fe80::1"
+    assert str(parse_ip("fe80::1")) == "fe80::1"
+    assert parse_ip("camera.local") is None
+    assert parse_ip("") is None
+
+
+def test_keys_sort_like_addresses():
+    assert ip_to_key("10.0.0.1") == "00000000000000000000ffff0a000001"
+    addresses = ["10.0.0.2", "9.255.255.255", "10.0.0.10", "192.168.1.1", "::1", "fe80::1"]
+    keys = [ip_to_key(address) for address in addresses]
+    assert sorted(keys) == [ip_to_key(a) for a in ["::1", "9.255.255.255", "10.0.0.2",
+                                                   "10.0.0.10", "192.168.1.1", "fe80::1"]]
+
+
+def test_parse_ip_range():
+    assert parse_ip_range("10.20.0.0/16") == (ip_to_key("10.20.0.0"), ip_to_key("10.20.255.255"))
+    # Host bit trong CIDR được bỏ qua, khoảng ngược được đảo lại
+    assert parse_ip_range("10.20.5.1/16") == parse_ip_range("10.20.0.0/16")
+    assert parse_ip_range("10.0.0.50 - 10.0.0.1") == (ip_to_key("10.0.0.1"), ip_to_key("10.0.0.50"))
+    assert parse_ip_range("10.0.0.7") == (ip_to_key("10.0.0.7"), ip_to_key("10.0.0.7"))
+    for bad in ("", "10.0.0.0/33", "10.0.0.1-fe80::1", "abc"):
+        with pytest.raises(ValueError):
+            parse_ip_range(bad)
+
+
+def test_search_by_cidr_and_range(camera_factory):
+    camera_factory(owner_name="A", static_ip="10.20.1.5:8000")
+    camera_factory(owner_name="B", static_ip="10.20.255.255")
+    camera_factory(owner_name="C", static_ip="10.21.0.1")
+    camera_factory(owner_name="D", static_ip="không rõ")
+    camera_factory(owner_name="E")
+
+    shape, _ = _search_plan({"ip_range": "10.20.0.0/16"}, "sqlite")
+    assert shape == (("between", "static_ip_num"),)
+    assert _owners({"ip_range": "10.20.0.0/16"}) == ["A", "B"]
+    assert _owners({"ip_range": "10.20.255.255-10.21.0.1"}) == ["B", "C"]
+    assert _owners({"ip_range": "10.20.1.5"}) == ["A"]
+    assert _owners({"ip_range": "10.0.0.0/8", "owner_name": "c"}) == ["C"]
+
+
+def test_invalid_range_is_ignored_in_search_form(app):
+    filters, has_filters = _parse_search_filters(MultiDict({"ip_range": "10.0.0.0/40"}))
+    assert "ip_range" not in filters
+    assert not has_filters
+    filters, has_filters = _parse_search_filters(MultiDict({"ip_range": " 10.0.0.0/8 "}))
+    assert filters["ip_range"] == "10.0.0.0/8"
+    assert has_filters
@@ -0,0 +1,107 @@
+"""Encoder Mapbox Vector Tile (services/mvt.py), kiểm tra bằng bộ giải mã protobuf tối thiểu."""
+import struct
+
+from services.mvt import _varint, _zigzag, encode_point_layer, encode_tile
+
+
+def _read_varint(data, offset):
+    value, shift = 0, 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+
+def _fields(data):
+    """Các (field, wire_type, giá trị) của một message protobuf."""
+    offset, fields = 0, []
+    while offset < len(data):
+        key, offset = _read_varint(data, offset)
+        field, wire_type = key >> 3, key & 0x7
+        if wire_type == 0:
+            value, offset = _read_varint(data, offset)
+        elif wire_type == 1:
+            value = data[offset:offset + 8]
+            offset += 8
+        elif wire_type == 2:
+            length, offset = _read_varint(data, offset)
+            value = data[offset:offset + length]
+            offset += length
+        else:
+            raise AssertionError(f"wire type không hỗ trợ: {wire_type}")
+        fields.append((field, wire_type, value))
+    return fields
+
+
+def _packed(data):
+    offset, values = 0, []
+    while offset < len(data):
+        value, offset = _read_varint(data, offset)
+        values.append(value)
+    return values
+
+
+def _unzigzag(value):
+    return (value >> 1) ^ -(value & 1)
+
+
+def test_varint_and_zigzag():
+    assert _varint(1) == b"\x01"
+    assert _varint(300) == b"\xac\x02"
+    assert [_zigzag(value) for value in (0, -1, 1, -2, 2)] == [0, 1, 2, 3, 4]
+
+
+def test_point_layer_round_trip():
+    layer = encode_point_layer("cameras", [
+        (7, 100, 200, {"system": "Hikvision", "count": 3}),
+        (8, -5, 4100, {"system": "Hikvision", "count": 1, "ratio": 0.5, "shared": True, "note": None}),
+    ], extent=4096)
+    tile = encode_tile([layer])
+
+    (field, wire_type, payload), = _fields(tile)
+    assert (field, wire_type) == (3, 2)
+    assert payload == layer
+
+    fields = _fields(layer)
+    assert [value for field, _, value in fields if field == 15] == [2]
+    assert [value for field, _, value in fields if field == 1] == [b"cameras"]
+    assert [value for field, _, value in fields if field == 5] == [4096]
+    keys = [value.decode() for field, _, value in fields if field == 3]
+    assert keys == ["system", "count", "ratio", "shared"]
+
+    values = []
+    for field, _, value in fields:
+        if field != 4:
+            continue
+        (value_field, _, raw), = _fields(value)
+        values.append({
+            1: lambda: raw.decode(),
+            3: lambda: struct.unpack("<d", raw)[0],
+            4: lambda: raw,
+            7: lambda: bool(raw),
+        }[value_field]())
+    assert values == ["Hikvision", 3, 1, 0.5, True]
+
+    features = [_fields(value) for field, _, value in fields if field == 2]
+    assert len(features) == 2
+    decoded = []
+    for feature in features:
+        by_field = {field: value for field, _, value in feature}
+        command, x, y = _packed(by_field[4])
+        assert command == (1 | 1 << 3)
+        assert by_field[3] == 1
+        tags = _packed(by_field[2])
+        properties = {keys[tags[i]]: values[tags[i + 1]] for i in range(0, len(tags), 2)}
+        decoded.append((by_field[1], _unzigzag(x), _unzigzag(y), properties))
+
+    assert decoded[0] == (7, 100, 200, {"system": "Hikvision", "count": 3})
+    # Giá trị None bị bỏ, giá trị trùng dùng chung một mục trong bảng values
+    assert decoded[1] == (8, -5, 4100, {"system": "Hikvision", "count": 1, "ratio": 0.5, "shared": True})
+
+
+def test_empty_layer():
+    fields = _fields(encode_point_layer("cameras", []))
+    assert not [field for field, _, _ in fields if field == 2]
@@ -0,0 +1,100 @@
+"""KD-tree và /map/api/nearest (services/nearest_service.py)."""
+import time
+
+import numpy as np
+
+from services.nearest_service import (
+    KDTree,
+    NearestIndex,
+    chord_to_meters,
+    get_nearest_index,
+    nearest_cameras,
+    unit_vectors,
+)
+from services.routing import haversine_m
+
+
+def test_kdtree_matches_brute_force():
+    rng = np.random.default_rng(42)
+    lats = rng.uniform(10.6, 10.9, 500)
+    lons = rng.uniform(106.5, 106.9, 500)
+    points = unit_vectors(lats, lons)
+    tree = KDTree(points)
+
+    for target_lat, target_lon in [(10.75, 106.7), (10.6, 106.5), (11.5, 107.5)]:
+        target = unit_vectors([target_lat], [target_lon])[0]
+        expected = np.argsort(np.linalg.norm(points - target, axis=1), kind="stable")[:7]
+        result = tree.query(target, 7)
+        assert [index for _, index in result] == expected.tolist()
+        distances = [distance for distance, _ in result]
+        assert distances == sorted(distances)
+
+
+def test_kdtree_mask_and_empty():
+    points = unit_vectors([10.0, 10.001, 10.002], [106.0, 106.0, 106.0])
+    tree = KDTree(points)
+    mask = np.zeros(3, dtype=bool)
+    # mask theo thứ tự điểm trong cây
+    mask[np.flatnonzero(tree.order == 2)] = True
+    target = unit_vectors([10.0], [106.0])[0]
+    assert [index for _, index in tree.query(target, 3, mask)] == [2]
+    assert KDTree(np.zeros((0, 3))).query(target, 3) == []
+
+
+def test_chord_to_meters_matches_haversine():
+    a, b = unit_vectors([10.7769, 21.0285], [106.7009, 105.8542])
+    chord = np.linalg.norm(a - b)
+    expected = haversine_m(10.7769, 106.7009, 21.0285, 105.8542)
+    assert abs(float(chord_to_meters(chord)) - expected) < 1
+
+
+def test_nearest_index_filters():
+    index = NearestIndex([
+        {"id": 1, "latitude": 10.0, "longitude": 106.0, "system_type": "A", "sharing_scope": True},
+        {"id": 2, "latitude": 10.001, "longitude": 106.0, "system_type": None, "sharing_scope": False},
+        {"id": 3, "latlon": "10.002,106.0", "system_type": "A", "sharing_scope": False},
+        {"id": 4, "latitude": None, "longitude": None, "system_type": "A"},
+    ])
+    assert len(index) == 3
+    assert [row["id"] for row in index.nearest(10.0, 106.0, 10)] == [1, 2, 3]
+    assert [row["id"] for row in index.nearest(10.0, 106.0, 10, system="A")] == [1, 3]
+    assert [row["id"] for row in index.nearest(10.0, 106.0, 10, system="A", shared=False)] == [3]
+    assert index.nearest(10.0, 106.0, 10, system="Chưa phân loại")[0]["id"] == 2
+    assert index.nearest(10.0, 106.0, 10, system="Không có") == []
+
+
+def test_api_nearest(auth_client, camera_factory, sample_camera):
+    camera_factory(owner_name="Xa", latlon="10.80,106.75", system_type="Dahua")
+    response = auth_client.get("/map/api/nearest?lat=10.7769&lon=106.7009&k=5")
+    assert response.status_code == 200
+    cameras = response.get_json()["cameras"]
+    assert [camera["id"] for camera in cameras][0] == sample_camera.id
+    assert cameras[0]["distance"] == 0
+    assert len(cameras) == 2
+
+    response = auth_client.get("/map/api/nearest?lat=10.7769&lon=106.7009&system=Dahua")
+    assert [camera["system"] for camera in response.get_json()["cameras"]] == ["Dahua"]
+
+
+def test_api_nearest_validation(auth_client):
+    assert auth_client.get("/map/api/nearest?lat=10").status_code == 400
+    assert auth_client.get("/map/api/nearest?lat=100&lon=106").status_code == 400
+    assert auth_client.get("/map/api/nearest?lat=10&lon=106&shared=2").status_code == 400
+
+
+def test_api_requires_login(client):
+    response = client.get("/map/api/nearest?lat=10&lon=106")
+    assert response.status_code == 302
+
+
+def test_index_rebuilt_in_background_after_write(app, camera_factory, sample_camera):
+    index = get_nearest_index()
+    camera = camera_factory(owner_name="Mới", latlon="10.7770,106.7010")
+    # Ghi camera: tạm trả về cây cũ, cây mới dựng trên luồng dựng index
+    assert get_nearest_index() is index
+
+    deadline = time.monotonic() + 5
+    while get_nearest_index() is index and time.monotonic() < deadline:
+        time.sleep(0.01)
+    ids = [row["id"] for row in nearest_cameras(10.7770, 106.7010, 2)]
+    assert ids == [camera.id, sample_camera.id]
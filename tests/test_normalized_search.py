@@ -0,0 +1,53 @@
+"""Cột tìm kiếm chuẩn hóa <field>_norm (text_utils.fold_text, Camera.set_search_components)."""
+from models import Camera, db
+from services.camera_service import CameraService, _search_plan
+from text_utils import fold_text
+
+
+def _owners(filters):
+    items, _, _ = CameraService.search_cameras(filters)
+    return sorted(camera.owner_name for camera in items)
+
+
+def test_fold_text():
+    assert fold_text("  Phường  Đông Vệ ") == "phuong dong ve"
+    assert fold_text("ĐẶNG Thị Ánh") == "dang thi anh"
+    assert fold_text("") is None
+    assert fold_text(None) is None
+    assert fold_text(float("nan")) is None
+
+
+def test_create_fills_normalized_columns(sample_camera):
+    assert sample_camera.owner_name_norm == "nguyen van an"
+    assert sample_camera.ward_norm == "phuong ben nghe"
+    assert sample_camera.province_norm == "tp ho chi minh"
+
+
+def test_search_ignores_accents(camera_factory, sample_camera):
+    camera_factory(owner_name="Trần Thị Bình", ward="Phường Đông Vệ")
+
+    assert _owners({"ward": "dong ve"}) == ["Trần Thị Bình"]
+    assert _owners({"ward": "ĐÔNG VỆ"}) == ["Trần Thị Bình"]
+    assert _owners({"owner_name": "van an"}) == ["Nguyễn Văn An"]
+
+
+def test_prefix_match_uses_range_on_normalized_column(camera_factory, sample_camera):
+    camera_factory(owner_name="Anh Nguyễn")
+
+    shape, params = _search_plan({"owner_name": "Nguyễn", "match": "prefix"}, "sqlite")
+    assert shape == (("prefix_range", "owner_name_norm"),)
+    assert params == {"s0": "nguyen", "s0_hi": "nguyen\U0010ffff"}
+    assert _owners({"owner_name": "Nguyễn", "match": "prefix"}) == ["Nguyễn Văn An"]
+
+    shape, params = _search_plan({"owner_name": "a_b%", "match": "prefix"}, "postgresql")
+    assert shape == (("prefix_like", "owner_name_norm"),)
+    assert params == {"s0": "a\\_b\\%%"}
+
+
+def test_backfill_fills_rows_written_without_normalization(app):
+    db.session.add(Camera(owner_name="Lê Văn Đức", ward="Phường 3"))
+    db.session.commit()
+    assert _owners({"owner_name": "le van"}) == []
+
+    assert CameraService.backfill_search_columns(batch_size=1) == 1
+    assert _owners({"owner_name": "le van"}) == ["Lê Văn Đức"]
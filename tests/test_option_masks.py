@@ -0,0 +1,74 @@
+"""Trường nhiều lựa chọn lưu kèm bitmask (<field>_mask) để lọc/đếm bằng phép toán số nguyên."""
+import json
+
+from models import Camera, db, mask_to_options, options_to_mask
+from services.camera_service import CameraService, _search_plan
+
+
+def _owners(filters):
+    items, _, _ = CameraService.search_cameras(filters)
+    return sorted(camera.owner_name for camera in items)
+
+
+def test_mask_round_trip():
+    mask = options_to_mask("storage_types", ["Đám mây", "Đầu ghi", "Khác"])
+    assert mask == 0b101
+    assert mask_to_options("storage_types", mask) == ["Đầu ghi", "Đám mây"]
+    assert options_to_mask("storage_types", None) == 0
+    assert mask_to_options("storage_types", None) == []
+
+
+def test_set_json_updates_mask(app):
+    camera = Camera(owner_name="A")
+    camera.set_json("monitoring_modes", ["Ghi", "Xem qua Internet"])
+    assert camera.monitoring_modes_mask == 0b101
+
+    camera.monitoring_modes = json.dumps(["Xem cục bộ"], ensure_ascii=False)
+    camera.set_option_masks()
+    assert camera.monitoring_modes_mask == 0b010
+
+
+def test_filter_requires_every_selected_option(camera_factory):
+    camera_factory(owner_name="A", monitoring_modes=["Xem qua Internet", "Ghi"])
+    camera_factory(owner_name="B", monitoring_modes=["Xem qua Internet"])
+    camera_factory(owner_name="C", monitoring_modes=["Ghi"], storage_types=["Thẻ nhớ"])
+
+    shape, params = _search_plan({"monitoring_modes": ["Xem qua Internet", "Ghi"]}, "sqlite")
+    assert shape == (("mask", "monitoring_modes_mask"),)
+    assert params == {"s0": 0b101}
+
+    assert _owners({"monitoring_modes": ["Xem qua Internet"]}) == ["A", "B"]
+    assert _owners({"monitoring_modes": ["Xem qua Internet", "Ghi"]}) == ["A"]
+    assert _owners({"monitoring_modes": ["Ghi"], "storage_types": ["Thẻ nhớ"]}) == ["C"]
+
+
+def test_filter_on_value_outside_catalogue_searches_json(camera_factory):
+    camera_factory(owner_name="A", storage_types=["Ổ cứng rời"])
+    camera_factory(owner_name="B", storage_types=["Đầu ghi"])
+
+    shape, _ = _search_plan({"storage_types": ["Ổ cứng rời"]}, "sqlite")
+    assert shape == (("ilike", "storage_types"),)
+    assert _owners({"storage_types": ["Ổ cứng rời"]}) == ["A"]
+
+
+def test_option_counts_include_unlisted_values(camera_factory):
+    camera_factory(owner_name="A", monitoring_modes=["Xem qua Internet", "Ghi"])
+    camera_factory(owner_name="B", monitoring_modes=["Ghi", "Qua app"])
+    camera_factory(owner_name="C", monitoring_modes=["Qua app"])
+    camera_factory(owner_name="D", install_areas=["Ngoài đường"])
+
+    counts = CameraService.get_option_counts(["monitoring_modes", "install_areas"])
+    assert counts == {
+        "monitoring_modes": {"Xem qua Internet": 1, "Ghi": 2, "Qua app": 2},
+        "install_areas": {"Ngoài đường": 1},
+    }
+
+
+def test_backfill_option_masks(app):
+    camera = Camera(owner_name="A", storage_types=json.dumps(["Thẻ nhớ"], ensure_ascii=False))
+    db.session.add(camera)
+    db.session.commit()
+    assert _owners({"storage_types": ["Thẻ nhớ"]}) == []
+
+    assert CameraService.backfill_option_masks() == 1
+    assert _owners({"storage_types": ["Thẻ nhớ"]}) == ["A"]
@@ -0,0 +1,75 @@
+"""Phân trang con trỏ (keyset) theo Camera.id, trên SQL và trên danh sách id của index."""
+import numpy as np
+
+from models import Camera
+from services.camera_service import CameraService
+from services.pagination import (
+    COUNT_ESTIMATE,
+    decode_cursor,
+    encode_cursor,
+    keyset_paginate,
+    keyset_paginate_ids,
+)
+
+
+def test_cursor_round_trip_and_tampering():
+    cursor = encode_cursor(42, "prev", 3)
+    assert decode_cursor(cursor) == (42, "prev")
+    for bad in ("", None, "not-base64!", encode_cursor("42"), encode_cursor(True)):
+        assert decode_cursor(bad) == (None, "next")
+
+
+def _walk(search, per_page):
+    """Đi hết các trang theo con trỏ rồi lùi lại, trả về (id các trang tiến, id các trang lùi)."""
+    forward, pages = [], []
+    pagination = search("")
+    while True:
+        forward.append([camera.id for camera in pagination.items])
+        pages.append(pagination.page)
+        if not pagination.has_next:
+            break
+        pagination = search(pagination.next_cursor)
+    backward = []
+    while pagination.has_prev:
+        pagination = search(pagination.prev_cursor)
+        backward.append([camera.id for camera in pagination.items])
+    assert pages == list(range(1, len(pages) + 1))
+    assert pagination.page == 1
+    return forward, backward
+
+
+def test_keyset_pagination_sql(app, camera_factory):
+    ids = [camera_factory(owner_name=f"Camera {i}", ward="Phường 1").id for i in range(7)]
+    expected = sorted(ids, reverse=True)
+
+    def search(cursor):
+        return CameraService.search_cameras({"ward": "Phường 1"}, cursor=cursor, per_page=3)[2]
+
+    forward, backward = _walk(search, 3)
+    assert forward == [expected[0:3], expected[3:6], expected[6:7]]
+    assert backward == [expected[3:6], expected[0:3]]
+
+    first = search("")
+    assert first.total == 7
+    assert first.pages == 3
+    assert first.cursor_for(2) == first.next_cursor
+    assert list(first.iter_pages()) == [1, 2]
+
+
+def test_keyset_pagination_ids_matches_sql(app, camera_factory):
+    for i in range(5):
+        camera_factory(owner_name=f"Camera {i}")
+    ids = np.array(sorted(camera.id for camera in Camera.query.all()))
+
+    def loader(page_ids):
+        return CameraService._load_in_order(page_ids)
+
+    def by_ids(cursor):
+        return keyset_paginate_ids(ids, loader, cursor=cursor, per_page=2)
+
+    def by_sql(cursor):
+        return keyset_paginate(Camera.query, Camera.id, cursor=cursor, per_page=2, count_mode=COUNT_ESTIMATE)
+
+    assert _walk(by_ids, 2) == _walk(by_sql, 2)
+    # Con trỏ của một cách dùng được cho cách kia (cùng định dạng)
+    assert [camera.id for camera in by_sql(by_ids("").next_cursor).items] == ids[::-1][2:4].tolist()
@@ -0,0 +1,63 @@
+"""Tìm camera theo số điện thoại (text_utils.normalize_phone, cột phone_norm)."""
+import pytest
+
+from services.camera_service import CameraService, _search_plan
+from text_utils import normalize_phone
+
+
+def _owners(phone):
+    items, _, _ = CameraService.search_cameras({"phone": phone})
+    return sorted(camera.owner_name for camera in items)
+
+
+@pytest.mark.parametrize("value, expected", [
+    ("+84 912-345-678", "0912345678"),
+    ("0084912345678", "0912345678"),
+    ("84912345678", "0912345678"),
+    ("912345678", "0912345678"),
+    (912345678.0, "0912345678"),
+    ("912345678.0", "0912345678"),
+    ("9.12345678E8", "0912345678"),
+    ("0283 822 1234", "02838221234"),
+    ("912", "912"),
+    ("5678", "5678"),
+    ("không có", None),
+    (None, None),
+    (float("nan"), None),
+])
+def test_normalize_phone(value, expected):
+    assert normalize_phone(value) == expected
+
+
+@pytest.fixture
+def phones(camera_factory):
+    camera_factory(owner_name="A", phone="0912 345 678")
+    camera_factory(owner_name="B", phone="+84 909 912 000")
+    camera_factory(owner_name="C", phone="028.3822.5678")
+    camera_factory(owner_name="D", phone="912345678.0")
+
+
+def test_full_number_uses_prefix_range(phones):
+    shape, params = _search_plan({"phone": "+84 912-345-678"}, "sqlite")
+    assert shape == (("prefix_range", "phone_norm"),)
+    assert params["s0"] == "0912345678"
+    assert _owners("+84 912-345-678") == ["A", "D"]
+    assert _owners("0912.345.678") == ["A", "D"]
+
+
+def test_number_typed_from_the_start(phones):
+    assert _owners("0912") == ["A", "D"]
+    assert _owners("+84 90") == ["B"]
+    assert _owners("028") == ["C"]
+
+
+def test_partial_number_without_leading_zero(phones):
+    shape, params = _search_plan({"phone": "912"}, "sqlite")
+    assert shape == (("like", "phone_norm"),)
+    assert params == {"s0": "%912%"}
+    # "912" khớp cả đầu số 0912... lẫn giữa số
+    assert _owners("912") == ["A", "B", "D"]
+    # Vài số cuối
+    assert _owners("5678") == ["A", "C", "D"]
+    assert _owners("345 678") == ["A", "D"]
+    assert _owners("4444") == []
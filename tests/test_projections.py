@@ -0,0 +1,63 @@
+"""Tập cột khi nạp camera (services/projections.py)."""
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import InvalidRequestError
+
+from models import db
+from services.camera_service import CameraService
+from services.projections import COLUMN_SETS, projection_columns, resolve_column_names
+
+
+@pytest.fixture
+def statements(app):
+    """Danh sách câu SQL đã chạy trong lúc test."""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_resolve_column_names():
+    assert resolve_column_names(None) is None
+    assert resolve_column_names("detail") is None
+    assert resolve_column_names("marker") == COLUMN_SETS["marker"]
+    # Trường lạ bị bỏ, id luôn đứng đầu
+    assert resolve_column_names(["ward", "khong_co", "id", "phone"]) == ["id", "ward", "phone"]
+    with pytest.raises(ValueError):
+        resolve_column_names("khong_co")
+    assert [column.key for column in projection_columns("marker")] == COLUMN_SETS["marker"]
+
+
+def test_list_columns_load_in_one_query(sample_camera, camera_factory, statements):
+    camera_factory(owner_name="Trần Văn Cường", ward="Phường Bến Nghé")
+    db.session.expunge_all()
+    statements.clear()
+
+    items, _, _ = CameraService.search_cameras({"ward": "ben nghe"}, columns="list")
+    loaded = len(statements)
+    rendered = [[getattr(camera, name) for name in COLUMN_SETS["list"]] for camera in items]
+
+    assert len(rendered) == 2
+    assert len(statements) == loaded
+    (page_select,) = [statement for statement in statements if "LIMIT" in statement]
+    assert "camera.monitoring_modes" not in page_select
+    assert "camera.owner_name" in page_select
+
+
+def test_deferred_column_raises(sample_camera):
+    db.session.expunge_all()
+    (camera,), _, _ = CameraService.search_cameras({"ward": "ben nghe"}, columns="list")
+    with pytest.raises(InvalidRequestError):
+        camera.monitoring_modes
+
+
+def test_deferred_column_lazy_loads_without_raiseload(app, sample_camera):
+    app.config["PROJECTION_RAISELOAD"] = False
+    db.session.expunge_all()
+    (camera,), _, _ = CameraService.search_cameras({"ward": "ben nghe"}, columns="list")
+    assert camera.get_json("monitoring_modes") == ["Xem qua Internet"]
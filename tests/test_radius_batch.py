@@ -0,0 +1,84 @@
+"""Tìm camera quanh nhiều tâm (services/radius_service.py, ``POST /map/api/radius/batch``)."""
+import pytest
+
+from services.radius_service import MAX_BATCH_CENTERS, haversine_matrix, parse_centers
+
+CENTER = (10.7769, 106.7009)
+
+
+@pytest.fixture
+def cameras(camera_factory, sample_camera):
+    return [
+        sample_camera,
+        camera_factory(owner_name="Gần", latlon="10.7772,106.7012", system_type="Dahua"),
+        camera_factory(owner_name="Xa", latlon="10.80,106.75", system_type="Dahua"),
+        camera_factory(owner_name="Chưa rõ hệ thống", latlon="10.7771,106.7008"),
+    ]
+
+
+def test_parse_centers_defaults_and_limits():
+    centers = parse_centers({"radius": 200, "centers": [
+        {"lat": "10.5", "lon": 106.5},
+        {"id": "b", "lat": 10.6, "lon": 106.6, "radius": 50},
+    ]})
+    assert centers == [
+        {"id": 0, "lat": 10.5, "lon": 106.5, "radius": 200.0},
+        {"id": "b", "lat": 10.6, "lon": 106.6, "radius": 50.0},
+    ]
+
+    for payload in (
+        [],
+        {"centers": []},
+        {"centers": [{"lat": 10, "lon": 106}]},
+        {"centers": [{"lat": 91, "lon": 106, "radius": 10}]},
+        {"centers": [{"lat": 10, "lon": 106, "radius": 0}]},
+        {"centers": [{"lat": 10, "lon": 106, "radius": 100}] * (MAX_BATCH_CENTERS + 1)},
+    ):
+        with pytest.raises(ValueError):
+            parse_centers(payload)
+
+
+def test_haversine_matrix_shape():
+    distances = haversine_matrix([10.0, 11.0], [106.0, 106.0], [10.0, 10.0, 12.0], [106.0, 107.0, 106.0])
+    assert distances.shape == (2, 3)
+    assert distances[0, 0] == 0
+    assert round(distances[1, 0] / 1000) == 111
+    assert round(distances[1, 2] / 1000) == 111
+
+
+def test_radius_batch(auth_client, cameras):
+    response = auth_client.post("/map/api/radius/batch", json={
+        "radius": 100,
+        "centers": [
+            {"id": "a", "lat": CENTER[0], "lon": CENTER[1]},
+            {"id": "b", "lat": 10.80, "lon": 106.75, "radius": 50},
+        ],
+    })
+    assert response.status_code == 200
+    data = response.get_json()
+    counts = {center["id"]: center["count"] for center in data["centers"]}
+    assert counts == {"a": 3, "b": 1}
+    assert len(data["cameras"]) == 4
+    by_id = {camera["id"]: camera for camera in data["cameras"]}
+    assert by_id[cameras[2].id]["centers"] == ["b"]
+    assert by_id[cameras[3].id]["system"] == "Chưa phân loại"
+    # Camera trong mỗi tâm sắp theo khoảng cách tăng dần
+    distances = [camera["distance"] for camera in data["centers"][0]["cameras"]]
+    assert distances == sorted(distances) and distances[0] == 0
+
+    assert auth_client.post("/map/api/radius/batch", json={"centers": []}).status_code == 400
+    assert auth_client.post("/map/api/radius/batch", json={"centers": [{"lat": "x"}]}).status_code == 400
+
+
+def test_radius_batch_overlapping_centers_return_camera_once(auth_client, cameras):
+    data = auth_client.post("/map/api/radius/batch", json={
+        "radius": 100,
+        "centers": [
+            {"id": "a", "lat": CENTER[0], "lon": CENTER[1]},
+            {"id": "c", "lat": 10.7772, "lon": 106.7012},
+        ],
+    }).get_json()
+    assert sorted(camera["id"] for camera in data["cameras"]) == sorted(
+        camera.id for camera in (cameras[0], cameras[1], cameras[3])
+    )
+    assert all(camera["centers"] == ["a", "c"] for camera in data["cameras"])
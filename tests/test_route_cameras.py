@@ -0,0 +1,95 @@
+"""Camera dọc tuyến đường (services/route_service.py) và /map/route."""
+import numpy as np
+import pytest
+
+import map_view
+from services.route_service import SEGMENTS_PER_CHUNK, cameras_along_route, point_segment_distances
+from services.routing import Route, RouterUnavailable, haversine_m
+
+# Tuyến thẳng theo kinh tuyến 106.70 từ 10.77 lên 10.78 (~1.1 km)
+ROUTE = [[10.77, 106.70], [10.775, 106.70], [10.78, 106.70]]
+
+
+class _StubRouter:
+    def __init__(self, route=None, error=None):
+        self._route = route
+        self._error = error
+
+    def route(self, start, end):
+        if self._error:
+            raise self._error
+        return self._route
+
+
+def test_point_segment_distances_match_haversine():
+    seg_lats = np.array([10.77, 10.78, 10.78])
+    seg_lons = np.array([106.70, 106.70, 106.71])
+    points = [(10.775, 106.7003), (10.7805, 106.705), (10.76, 106.70), (10.79, 106.72)]
+    distances, segments, t = point_segment_distances(
+        np.array([p[0] for p in points]), np.array([p[1] for p in points]), seg_lats, seg_lons,
+    )
+    expected = [
+        haversine_m(10.775, 106.7003, 10.775, 106.70),
+        haversine_m(10.7805, 106.705, 10.78, 106.705),
+        haversine_m(10.76, 106.70, 10.77, 106.70),
+        haversine_m(10.79, 106.72, 10.78, 106.71),
+    ]
+    assert np.allclose(distances, expected, rtol=0.005)
+    assert segments.tolist() == [0, 1, 0, 1]
+    assert t[0] == pytest.approx(0.5)
+    assert (t[2], t[3]) == (0.0, 1.0)
+
+
+def test_degenerate_segment():
+    distances, _, t = point_segment_distances(
+        np.array([10.771]), np.array([106.70]), np.array([10.77, 10.77]), np.array([106.70, 106.70]),
+    )
+    assert distances[0] == pytest.approx(haversine_m(10.771, 106.70, 10.77, 106.70), rel=0.005)
+    assert t[0] == 0.0
+
+
+def test_cameras_along_route(app, camera_factory):
+    near_start = camera_factory(owner_name="Đầu", latlon="10.7705,106.7002")
+    near_end = camera_factory(owner_name="Cuối", latlon="10.7795,106.6997", system_type="Dahua")
+    camera_factory(owner_name="Xa tuyến", latlon="10.775,106.71")
+    camera_factory(owner_name="Trước điểm đầu", latlon="10.765,106.70")
+
+    results = cameras_along_route(ROUTE, buffer_m=50)
+    assert [row["id"] for row in results] == [near_start.id, near_end.id]
+    assert results[0]["distance_to_route"] == pytest.approx(22, abs=1)
+    assert results[0]["distance_along_route"] == pytest.approx(56, abs=1)
+    assert results[1]["system"] == "Dahua"
+    assert results[1]["distance_along_route"] > results[0]["distance_along_route"]
+
+    # Hành lang rộng hơn lấy thêm camera xa tuyến
+    assert len(cameras_along_route(ROUTE, buffer_m=1200)) == 4
+    assert cameras_along_route(ROUTE[:1]) == []
+
+
+def test_long_route_split_into_chunks_keeps_closest_match(app, camera_factory):
+    # Tuyến đi lên rồi quay lại: camera gần cả hai chiều chỉ xuất hiện một lần
+    up = [[10.77 + i * 0.0005, 106.70] for i in range(SEGMENTS_PER_CHUNK + 5)]
+    route = up + up[-2::-1]
+    camera = camera_factory(owner_name="Giữa", latlon="10.78,106.7001")
+
+    (row,) = cameras_along_route(route, buffer_m=30)
+    assert row["id"] == camera.id
+    assert row["distance_to_route"] == pytest.approx(11, abs=1)
+
+
+def test_route_endpoint(auth_client, camera_factory, monkeypatch):
+    camera = camera_factory(owner_name="Đầu", latlon="10.7705,106.7002")
+    monkeypatch.setattr(map_view, "get_router", lambda: _StubRouter(Route(ROUTE, 1113.2, 95.4)))
+
+    data = auth_client.get("/map/route?lat_a=10.77&lon_a=106.70&lat_b=10.78&lon_b=106.70").get_json()
+    assert data["route"] == ROUTE
+    assert (data["distance"], data["duration"]) == (1113, 95)
+    assert [row["id"] for row in data["cameras"]] == [camera.id]
+
+    assert auth_client.get("/map/route?lat_a=10.77&lon_a=106.70").status_code == 400
+    assert auth_client.get(
+        "/map/route?lat_a=10.77&lon_a=106.70&lat_b=10.78&lon_b=106.70&buffer=5000"
+    ).status_code == 400
+
+    monkeypatch.setattr(map_view, "get_router", lambda: _StubRouter(error=RouterUnavailable("down")))
+    assert auth_client.get("/map/route?lat_a=10.77&lon_a=106.70&lat_b=10.78&lon_b=106.70").status_code == 503
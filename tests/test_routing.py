@@ -0,0 +1,147 @@
+"""A* offline, circuit breaker và cache tuyến (services/routing.py)."""
+import json
+
+import pytest
+
+from services.routing import (
+    CachedRouter,
+    CircuitBreaker,
+    FallbackRouter,
+    OfflineRouter,
+    Route,
+    RouteCache,
+    RouterUnavailable,
+    RoutingError,
+    build_router,
+)
+
+
+def _line(*points, **properties):
+    return {
+        "type": "Feature",
+        "properties": properties,
+        "geometry": {"type": "LineString", "coordinates": [[lon, lat] for lat, lon in points]},
+    }
+
+
+@pytest.fixture
+def graph_file(tmp_path):
+    # A -- B -- C chậm (20 km/h) và A -- D -- C nhanh (80 km/h) nhưng dài hơn một chút;
+    # E -> F một chiều, G tách rời
+    a, b, c, d = (10.0, 106.0), (10.0, 106.01), (10.0, 106.02), (10.002, 106.01)
+    features = [
+        _line(a, b, c, maxspeed=20),
+        _line(a, d, c, maxspeed=80),
+        _line((10.1, 106.0), (10.1, 106.01), oneway="yes"),
+        _line((11.0, 107.0), (11.0, 107.01)),
+    ]
+    path = tmp_path / "graph.geojson"
+    path.write_text(json.dumps({"type": "FeatureCollection", "features": features}), encoding="utf-8")
+    return str(path)
+
+
+def test_offline_router_prefers_fastest_path(graph_file):
+    router = OfflineRouter(graph_file)
+    route = router.route((10.0, 106.0), (10.0, 106.02))
+    # Đi qua D (nhanh) thay vì B (ngắn hơn nhưng chậm)
+    assert [10.002, 106.01] in route.points
+    assert [10.0, 106.01] not in route.points
+    assert route.points[0] == [10.0, 106.0] and route.points[-1] == [10.0, 106.02]
+    assert route.distance > 2000
+    assert 0 < route.duration < route.distance / (20 / 3.6)
+
+
+def test_offline_router_oneway_and_disconnected(graph_file):
+    router = OfflineRouter(graph_file)
+    assert router.route((10.1, 106.0), (10.1, 106.01)).distance > 0
+    with pytest.raises(RoutingError):
+        router.route((10.1, 106.01), (10.1, 106.0))
+    with pytest.raises(RoutingError):
+        router.route((10.0, 106.0), (11.0, 107.01))
+
+
+class _FlakyRouter:
+    name = "flaky"
+
+    def __init__(self):
+        self.calls = 0
+        self.fail = True
+
+    def route(self, start, end):
+        self.calls += 1
+        if self.fail:
+            raise RouterUnavailable("down")
+        return Route([list(start), list(end)], 1.0, 1.0)
+
+
+def test_circuit_breaker_opens_and_recovers(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr("services.routing.time.monotonic", lambda: clock[0])
+    inner = _FlakyRouter()
+    breaker = CircuitBreaker(inner, failure_threshold=2, reset_timeout=30)
+
+    for _ in range(2):
+        with pytest.raises(RouterUnavailable):
+            breaker.route((0, 0), (1, 1))
+    assert breaker.state == "open"
+    with pytest.raises(RouterUnavailable):
+        breaker.route((0, 0), (1, 1))
+    # Mạch mở: không gọi router bên trong
+    assert inner.calls == 2
+
+    clock[0] = 31
+    assert breaker.state == "half-open"
+    inner.fail = False
+    assert breaker.route((0, 0), (1, 1)).distance == 1.0
+    assert breaker.state == "closed"
+
+
+def test_circuit_breaker_half_open_failure_reopens(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr("services.routing.time.monotonic", lambda: clock[0])
+    breaker = CircuitBreaker(_FlakyRouter(), failure_threshold=1, reset_timeout=10)
+    with pytest.raises(RouterUnavailable):
+        breaker.route((0, 0), (1, 1))
+    clock[0] = 11
+    with pytest.raises(RouterUnavailable):
+        breaker.route((0, 0), (1, 1))
+    assert breaker.state == "open"
+
+
+def test_route_cache_rounding_and_eviction(tmp_path):
+    cache = RouteCache(str(tmp_path / "routes.sqlite"), max_entries=2)
+    assert RouteCache.key("osrm", (10.00001, 106.0), (10.1, 106.1)) == \
+        RouteCache.key("osrm", (10.0, 106.00002), (10.1, 106.1))
+    keys = [RouteCache.key("osrm", (10.0 + i, 106.0), (10.1, 106.1)) for i in range(3)]
+    for key in keys:
+        cache.put(key, Route([[1.0, 2.0]], 3.0, 4.0))
+    assert cache.get(keys[0]) is None
+    assert cache.get(keys[2]) == Route([[1.0, 2.0]], 3.0, 4.0)
+
+
+def test_fallback_routes_are_cached_per_backend(tmp_path, graph_file):
+    cache = RouteCache(str(tmp_path / "routes.sqlite"))
+    primary = _FlakyRouter()
+    offline = OfflineRouter(graph_file)
+    router = FallbackRouter([CachedRouter(primary, cache), CachedRouter(offline, cache)])
+
+    start, end = (10.0, 106.0), (10.0, 106.02)
+    fallback_route = router.route(start, end)
+    assert cache.get(RouteCache.key("offline", start, end)) == fallback_route
+    assert cache.get(RouteCache.key("flaky", start, end)) is None
+
+    # Router chính hoạt động lại -> dùng kết quả của nó, không dùng tuyến offline đã cache
+    primary.fail = False
+    assert router.route(start, end).distance == 1.0
+
+
+def test_build_router_offline(tmp_path, graph_file):
+    router = build_router({
+        "ROUTER_BACKEND": "offline",
+        "ROUTER_GRAPH_FILE": graph_file,
+        "ROUTE_CACHE_PATH": str(tmp_path / "routes.sqlite"),
+    })
+    assert isinstance(router, CachedRouter)
+    assert router.name == "offline"
+    with pytest.raises(RuntimeError):
+        build_router({"ROUTER_BACKEND": "offline"})
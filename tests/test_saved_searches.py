@@ -0,0 +1,83 @@
+"""Saved search với tập kết quả đã materialize (services/saved_search_service.py)."""
+import pytest
+from sqlalchemy import event
+
+from models import db
+from services.camera_events import CameraChange
+from services.camera_service import CameraService
+from services.saved_search_service import SavedSearchService, _changed_columns, _filter_columns
+
+
+@pytest.fixture
+def cameras(camera_factory, sample_camera):
+    return [
+        sample_camera,
+        camera_factory(owner_name="Nguyễn Thị Bình", ward="Phường Bến Nghé", system_type="Dahua",
+                       manufacturer="Dahua", latlon="10.78,106.70", monitoring_modes=["Ghi"]),
+        camera_factory(owner_name="Trần Văn Cường", ward="Phường Bến Thành", system_type="Dahua",
+                       manufacturer="Dahua", latlon="10.77,106.69",
+                       monitoring_modes=["Xem qua Internet", "Ghi"]),
+        camera_factory(owner_name="Lê Văn Dũng", ward="Phường Đa Kao"),
+    ]
+
+
+def test_saved_searches_follow_camera_writes(auth_client, cameras, camera_factory):
+    response = auth_client.post("/camera/saved-searches", data={"name": "Bến Nghé", "ward": "Phường Bến Nghé"})
+    assert response.status_code == 302
+    (saved,) = auth_client.get("/camera/api/saved-searches").get_json()
+    assert saved["name"] == "Bến Nghé"
+    assert saved["filters"] == {"ward": "Phường Bến Nghé"}
+    assert saved["count"] == 2
+
+    camera = camera_factory(owner_name="Mới", ward="Phường Bến Nghé")
+    assert auth_client.get("/camera/api/saved-searches").get_json()[0]["count"] == 3
+
+    CameraService.update_camera(camera.id, {"ward": "Phường Đa Kao"}, {})
+    assert auth_client.get("/camera/api/saved-searches").get_json()[0]["count"] == 2
+
+    CameraService.delete_camera(cameras[0].id)
+    assert auth_client.get("/camera/api/saved-searches").get_json()[0]["count"] == 1
+
+    assert auth_client.post(f"/camera/saved-searches/{saved['id']}/delete").status_code == 302
+    assert auth_client.get("/camera/api/saved-searches").get_json() == []
+    # Thiếu tên hoặc bộ lọc -> không lưu
+    auth_client.post("/camera/saved-searches", data={"name": "Rỗng"})
+    assert auth_client.get("/camera/api/saved-searches").get_json() == []
+
+
+def test_changed_columns_merge_per_camera():
+    changes = [
+        CameraChange("update", 1, {"ward": "A", "phone": "1"}, {"ward": "B", "phone": "1"}),
+        CameraChange("update", 1, {"ward": "B", "phone": "1"}, {"ward": "B", "phone": "2"}),
+        CameraChange("create", 2, None, {"ward": "A"}),
+        CameraChange("update", 2, {"ward": "A"}, {"ward": "C"}),
+        CameraChange("delete", 3, {"ward": "A"}, None),
+    ]
+    touched, deleted = _changed_columns(changes)
+    assert touched == {1: {"ward", "phone"}, 2: None}
+    assert deleted == {3}
+    columns = _filter_columns({"ward": "A", "monitoring_modes": ["Ghi"], "phone": "", "ip_range": "10.0.0.0/8"})
+    assert {"ward", "ward_norm", "monitoring_modes_mask", "static_ip_num"} <= columns
+    assert not {"phone", "phone_norm", "ip_range"} & columns
+
+
+def test_unrelated_edit_does_not_requery_saved_search(app, admin_user, cameras):
+    saved = SavedSearchService.create(admin_user.id, "Bến Nghé", {"ward": "Phường Bến Nghé"})
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        CameraService.update_camera(cameras[0].id, {"phone": "0911111111"}, {})
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    assert not [statement for statement in executed if "saved_search_result" in statement]
+
+    items, total, _ = SavedSearchService.search(saved)
+    assert total == 2
+    assert sorted(camera.id for camera in items) == sorted(camera.id for camera in cameras[:2])
+    assert [camera.id for camera in SavedSearchService.get_cameras(saved, columns="export")] == sorted(
+        camera.id for camera in cameras[:2]
+    )
@@ -0,0 +1,88 @@
+"""R*Tree cho tọa độ camera (services/spatial_index.py) và tìm theo bán kính /map/radius."""
+import pytest
+
+from models import Camera
+from services.camera_service import CameraService
+from services.spatial_index import (
+    bbox_criteria,
+    drop_spatial_index,
+    ensure_spatial_index,
+    multi_bbox_criteria,
+    spatial_available,
+)
+
+CENTER = (10.7769, 106.7009)
+
+
+@pytest.fixture
+def cameras(camera_factory, sample_camera):
+    return [
+        sample_camera,
+        camera_factory(owner_name="Gần", latlon="10.7772,106.7012", system_type="Dahua"),
+        camera_factory(owner_name="Xa", latlon="10.80,106.75", system_type="Dahua"),
+        camera_factory(owner_name="Chưa rõ hệ thống", latlon="10.7771,106.7008"),
+        camera_factory(owner_name="Không tọa độ"),
+    ]
+
+
+@pytest.fixture(params=["btree", "rtree"])
+def spatial(request, app):
+    if request.param == "rtree":
+        assert ensure_spatial_index() is True
+        yield request.param
+        drop_spatial_index()
+    else:
+        yield request.param
+
+
+def _ids_in_bbox(*bbox):
+    return sorted(camera.id for camera in Camera.query.filter(*bbox_criteria(*bbox)))
+
+
+def test_radius(auth_client, cameras, spatial):
+    assert spatial_available() == (spatial == "rtree")
+    response = auth_client.get("/map/radius?lat=10.7769&lon=106.7009&radius=100")
+    results = response.get_json()
+    assert sorted(row["id"] for row in results) == sorted(camera.id for camera in (cameras[0], cameras[1], cameras[3]))
+    assert all(row["distance"] <= 100 for row in results)
+    assert auth_client.get("/map/radius?lat=10.7769").get_json() == []
+
+
+def test_bbox_criteria_match_columns(cameras, spatial):
+    assert _ids_in_bbox(10.77, 10.78, 106.70, 106.71) == sorted(
+        camera.id for camera in (cameras[0], cameras[1], cameras[3])
+    )
+    # Điểm nằm đúng trên biên khung vẫn được tính
+    assert _ids_in_bbox(10.80, 10.80, 106.75, 106.75) == [cameras[2].id]
+    assert _ids_in_bbox(11.0, 12.0, 107.0, 108.0) == []
+
+    boxes = [(10.7768, 10.7770, 106.7008, 106.7010), (10.79, 10.81, 106.74, 106.76)]
+    candidates = sorted(camera.id for camera in Camera.query.filter(*multi_bbox_criteria(boxes)))
+    assert {cameras[0].id, cameras[2].id} <= set(candidates)
+    assert cameras[4].id not in candidates
+
+
+def test_rtree_follows_camera_writes(app, cameras):
+    ensure_spatial_index()
+    try:
+        bbox = (10.79, 10.81, 106.74, 106.76)
+        CameraService.update_camera(cameras[0].id, {"latlon": "10.80,106.751"}, {})
+        assert _ids_in_bbox(*bbox) == sorted([cameras[0].id, cameras[2].id])
+
+        CameraService.delete_camera(cameras[2].id)
+        assert _ids_in_bbox(*bbox) == [cameras[0].id]
+    finally:
+        drop_spatial_index()
+
+
+def test_existing_rows_loaded_on_creation(app, cameras):
+    assert not spatial_available()
+    ensure_spatial_index()
+    try:
+        # "Chưa có" chỉ cache ngắn hạn: index vừa tạo được dùng ngay
+        assert spatial_available()
+        assert _ids_in_bbox(10.77, 10.78, 106.70, 106.71) == sorted(
+            camera.id for camera in (cameras[0], cameras[1], cameras[3])
+        )
+    finally:
+        drop_spatial_index()
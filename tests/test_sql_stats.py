@@ -0,0 +1,54 @@
+"""Cache điều kiện tìm kiếm theo shape bộ lọc và bộ đếm hit/miss (services/sql_stats.py)."""
+import pytest
+
+from models import db
+from services import camera_service, sql_stats
+from services.camera_service import CameraService, _search_plan
+
+
+@pytest.fixture
+def stats(app):
+    camera_service._criteria_cache.clear()
+    sql_stats.install_compiled_cache_stats()
+    sql_stats.reset_stats()
+    yield
+    sql_stats.reset_stats()
+
+
+def test_same_shape_shares_criteria_and_sql(stats, sample_camera):
+    shape_a, params_a = _search_plan({"ward": "Bến Nghé", "monitoring_modes": ["Ghi"]}, "sqlite")
+    shape_b, params_b = _search_plan({"ward": "Đa Kao", "monitoring_modes": ["Xem cục bộ"]}, "sqlite")
+    assert shape_a == shape_b
+    assert params_a != params_b
+
+    first = CameraService.build_search_query({"ward": "Bến Nghé"})
+    second = CameraService.build_search_query({"ward": "Đa Kao"})
+    assert str(first.statement) == str(second.statement)
+    assert first.count() == 1
+    assert second.count() == 0
+
+    criteria = sql_stats.get_stats()["search_criteria"]
+    assert (criteria["hits"], criteria["misses"], criteria["hit_ratio"]) == (1, 1, 0.5)
+
+
+def test_compiled_cache_hits_for_repeated_shape(stats, sample_camera):
+    for ward in ("Bến Nghé", "Đa Kao", "Bến Thành"):
+        CameraService.build_search_query({"ward": ward}).all()
+
+    compiled = sql_stats.get_stats(db.engine)["compiled"]
+    assert compiled["hits"] >= 2
+    assert compiled["cache_size"] >= 1
+    assert compiled["cache_capacity"]
+
+
+def test_criteria_cache_is_bounded(stats, monkeypatch):
+    monkeypatch.setattr(camera_service, "CRITERIA_CACHE_SIZE", 2)
+    for filters in ({"ward": "a"}, {"owner_name": "a"}, {"province": "a"}):
+        CameraService.build_search_query(filters)
+    assert len(camera_service._criteria_cache) == 1
+
+
+def test_stats_endpoint(auth_client, stats):
+    data = auth_client.get("/dashboard/api/sql-cache-stats").get_json()
+    assert set(data) == {"compiled", "search_criteria"}
+    assert data["search_criteria"]["hit_ratio"] is None
@@ -0,0 +1,59 @@
+"""Gợi ý tự động /camera/api/suggest (services/suggest_service.py)."""
+import pytest
+
+from services.suggest_service import DEFAULT_LIMIT, MAX_LIMIT, PrefixIndex, suggest
+
+
+@pytest.fixture
+def cameras(camera_factory, sample_camera):
+    return [
+        sample_camera,
+        camera_factory(owner_name="Nguyễn Thị Bình", ward="Phường Bến Nghé", system_type="Dahua",
+                       manufacturer="Dahua", latlon="10.78,106.70", monitoring_modes=["Ghi"]),
+        camera_factory(owner_name="Trần Văn Cường", ward="Phường Bến Thành", system_type="Dahua",
+                       manufacturer="Dahua", latlon="10.77,106.69",
+                       monitoring_modes=["Xem qua Internet", "Ghi"]),
+        camera_factory(owner_name="Lê Văn Dũng", ward="Phường Đa Kao"),
+    ]
+
+
+def test_suggest(auth_client, cameras):
+    response = auth_client.get("/camera/api/suggest?field=ward&q=ben")
+    suggestions = response.get_json()["suggestions"]
+    assert suggestions == [
+        {"value": "Phường Bến Nghé", "count": 2},
+        {"value": "Phường Bến Thành", "count": 1},
+    ]
+    owners = auth_client.get("/camera/api/suggest?field=owner_name&q=VAN&limit=1").get_json()
+    assert len(owners["suggestions"]) == 1
+    assert auth_client.get("/camera/api/suggest?field=phone&q=09").status_code == 400
+
+
+def test_suggest_follows_camera_writes(auth_client, cameras, camera_factory):
+    assert auth_client.get("/camera/api/suggest?field=ward&q=tan").get_json()["suggestions"] == []
+    camera_factory(owner_name="Mới", ward="Phường Tân Định")
+    suggestions = auth_client.get("/camera/api/suggest?field=ward&q=tan").get_json()["suggestions"]
+    assert suggestions == [{"value": "Phường Tân Định", "count": 1}]
+
+
+def test_prefix_index_matches_any_word_without_accents():
+    index = PrefixIndex([
+        ("Phường Đông Vệ", 3), ("Phường Đông Thọ", 5), ("Xã Đông Hưng", 1), ("Phường Ba Đình", 2), ("", 9),
+    ])
+    assert len(index) == 4
+    assert index.lookup("dong") == [("Phường Đông Thọ", 5), ("Phường Đông Vệ", 3), ("Xã Đông Hưng", 1)]
+    assert index.lookup("ĐÔNG V") == [("Phường Đông Vệ", 3)]
+    # Khớp nhiều từ của cùng giá trị chỉ trả về một lần
+    assert index.lookup("ph", limit=2) == [("Phường Đông Thọ", 5), ("Phường Đông Vệ", 3)]
+    assert index.lookup("hanoi") == []
+    # Ô rỗng: các giá trị phổ biến nhất
+    assert index.lookup("", limit=2) == [("Phường Đông Thọ", 5), ("Phường Đông Vệ", 3)]
+
+
+def test_suggest_validates_field_and_limit(app, camera_factory):
+    for i in range(MAX_LIMIT + 5):
+        camera_factory(owner_name=f"Chủ {i}")
+    with pytest.raises(ValueError):
+        suggest("phone", "09")
+    assert len(suggest("owner_name", "chu", limit=1000)) == MAX_LIMIT
+    assert len(suggest("owner_name", "chu", limit=0)) == DEFAULT_LIMIT
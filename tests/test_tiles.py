@@ -0,0 +1,86 @@
+"""Vector tile lớp camera (/map/tiles/z/x/y.mvt) và cache tile (services/tile_service.py)."""
+import os
+import time
+
+from services.tile_service import INVALIDATED_AT_FILE, TileCache, tiles_for_point
+
+CENTER = (10.7769, 106.7009)
+
+
+def test_tile_cache_rejects_render_older_than_invalidation(tmp_path):
+    cache = TileCache(str(tmp_path), memory_items=0)
+    rendered_at = time.time()
+    time.sleep(0.01)
+    # Worker khác ghi camera và xóa tile trong lúc tile đang được dựng từ dữ liệu cũ
+    TileCache(str(tmp_path)).invalidate([(14, 1, 2)])
+    assert cache.put(14, 1, 2, b"stale", None, rendered_at) is False
+    assert cache.get(14, 1, 2, None) is None
+
+    assert cache.put(14, 1, 2, b"fresh", None, time.time()) is True
+    assert cache.get(14, 1, 2, None) == b"fresh"
+
+    expiring = TileCache(str(tmp_path), memory_items=0, max_age=60)
+    expiring.put(14, 3, 4, b"old", None, time.time() - 120)
+    assert expiring.get(14, 3, 4, None) is None
+
+
+def test_invalidation_removed_after_write_is_caught(tmp_path, monkeypatch):
+    cache = TileCache(str(tmp_path), memory_items=0)
+    rendered_at = time.time()
+    time.sleep(0.01)
+    real_replace = os.replace
+
+    def replace_then_invalidate(src, dst):
+        # Lần xóa xen giữa bước kiểm tra đầu và lúc đổi tên file tile
+        real_replace(src, dst)
+        if dst.endswith(".mvt"):
+            monkeypatch.setattr(os, "replace", real_replace)
+            cache._mark_invalidated()
+
+    monkeypatch.setattr(os, "replace", replace_then_invalidate)
+    assert cache.put(14, 1, 2, b"stale", None, rendered_at) is False
+    assert not os.path.exists(cache._path(14, 1, 2))
+
+
+def test_invalidate_writes_one_marker_and_keeps_other_tiles(tmp_path):
+    cache = TileCache(str(tmp_path), memory_items=0)
+    cache.put(14, 1, 2, b"a", None, time.time())
+    cache.put(14, 5, 6, b"b", None, time.time())
+
+    cache.invalidate(tiles_for_point(*CENTER) + [(14, 1, 2)])
+    files = sorted(
+        os.path.relpath(os.path.join(root, name), tmp_path)
+        for root, _, names in os.walk(tmp_path) for name in names
+    )
+    assert files == [os.path.join("14", "5", "6.mvt"), INVALIDATED_AT_FILE]
+    assert cache.get(14, 5, 6, None) == b"b"
+    assert cache.get(14, 1, 2, None) is None
+
+
+def test_clear_keeps_invalidation_time(tmp_path):
+    cache = TileCache(str(tmp_path), memory_items=0)
+    cache.put(14, 1, 2, b"a", None, time.time())
+    rendered_at = time.time()
+    time.sleep(0.01)
+
+    cache.clear()
+    assert cache.get(14, 1, 2, None) is None
+    assert cache.invalidated_at() > rendered_at
+    assert cache.put(14, 1, 2, b"stale", None, rendered_at) is False
+    assert cache.put(14, 1, 2, b"fresh", None, time.time()) is True
+
+
+def test_vector_tiles(auth_client, sample_camera, camera_factory):
+    z, x, y = next(tile for tile in tiles_for_point(*CENTER) if tile[0] == 14)
+    response = auth_client.get(f"/map/tiles/{z}/{x}/{y}.mvt")
+    assert response.status_code == 200
+    assert response.mimetype == "application/vnd.mapbox-vector-tile"
+    assert b"Hikvision" in response.data
+
+    # Camera mới trong tile -> tile cache bị xóa và dựng lại
+    camera_factory(owner_name="Mới", latlon="10.7770,106.7010", system_type="Dahua")
+    refreshed = auth_client.get(f"/map/tiles/{z}/{x}/{y}.mvt")
+    assert b"Dahua" in refreshed.data
+
+    assert auth_client.get(f"/map/tiles/{z}/{x}/{y + 1}.mvt").data == b""
+    assert auth_client.get(f"/map/tiles/{z}/{2 ** z}/0.mvt").status_code == 404
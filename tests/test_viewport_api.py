@@ -0,0 +1,72 @@
+"""Marker theo khung nhìn /map/api/cameras và popup theo lô /map/api/cameras/popup."""
+import pytest
+
+from map_view import MAX_POPUP_IDS
+from services import cache_service
+from services.cache_service import data_version_tag, get_data_version
+
+BBOX = "bbox=106.6,10.7,106.8,10.9"
+
+
+@pytest.fixture
+def cameras(camera_factory, sample_camera):
+    return [
+        sample_camera,
+        camera_factory(owner_name="Gần", latlon="10.7772,106.7012", system_type="Dahua"),
+        camera_factory(owner_name="Xa", latlon="11.5,107.5", system_type="Dahua"),
+        camera_factory(owner_name="Chưa rõ hệ thống", latlon="10.7771,106.7008"),
+    ]
+
+
+def test_cameras_in_viewport(auth_client, cameras):
+    data = auth_client.get(f"/map/api/cameras?{BBOX}").get_json()
+    assert data["fields"] == ["id", "lat", "lon", "system"]
+    assert len(data["colors"]) == len(data["systems"])
+    rows = {row[0]: row for row in data["cameras"]}
+    assert sorted(rows) == sorted(camera.id for camera in (cameras[0], cameras[1], cameras[3]))
+    assert rows[cameras[0].id][1:3] == [10.7769, 106.7009]
+    assert data["systems"][rows[cameras[1].id][3]] == "Dahua"
+    assert data["systems"][rows[cameras[3].id][3]] == "Chưa phân loại"
+
+    assert auth_client.get("/map/api/cameras?bbox=1,2,3").status_code == 400
+
+
+def test_viewport_etag(auth_client, cameras, camera_factory):
+    url = f"/map/api/cameras?{BBOX}"
+    etag = auth_client.get(url).headers["ETag"]
+    assert auth_client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    assert auth_client.get(f"/map/api/cameras?bbox=106.6,10.7,106.8,10.8",
+                           headers={"If-None-Match": etag}).status_code == 200
+
+    camera_factory(owner_name="Mới", latlon="10.78,106.71")
+    response = auth_client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.get_json()["cameras"]) == 4
+
+
+def test_etag_is_scoped_to_process_with_local_cache(auth_client, cameras, monkeypatch):
+    url = f"/map/api/cameras?{BBOX}"
+    etag = auth_client.get(url).headers["ETag"]
+    version = get_data_version()
+    assert data_version_tag().endswith(f".{version}")
+
+    # Worker khác (token khác) có cùng số version -> không được trả 304
+    monkeypatch.setattr(cache_service, "_process", None)
+    assert auth_client.get(url, headers={"If-None-Match": etag}).status_code == 200
+
+    # Backend dùng chung (Redis): version đủ để so giữa các worker
+    monkeypatch.setattr(cache_service, "is_shared_cache", lambda: True)
+    assert data_version_tag() == str(version)
+
+
+def test_popups(auth_client, cameras):
+    ids = f"{cameras[0].id},{cameras[3].id},999999"
+    data = auth_client.get(f"/map/api/cameras/popup?ids={ids}").get_json()["cameras"]
+    assert set(data) == {str(cameras[0].id), str(cameras[3].id)}
+    assert data[str(cameras[0].id)]["owner"] == "Nguyễn Văn An"
+    assert data[str(cameras[3].id)]["system"] == "Chưa phân loại"
+
+    assert auth_client.get("/map/api/cameras/popup?ids=").get_json() == {"cameras": {}}
+    assert auth_client.get("/map/api/cameras/popup?ids=1,a").status_code == 400
+    too_many = ",".join(str(i) for i in range(MAX_POPUP_IDS + 1))
+    assert auth_client.get(f"/map/api/cameras/popup?ids={too_many}").status_code == 400
@@ -0,0 +1,80 @@
+"""
+Tiện ích chuẩn hóa văn bản tiếng Việt cho tìm kiếm.
+
+``fold_text`` chuyển chuỗi về dạng chữ thường, bỏ dấu (kể cả đ → d) và gộp
+khoảng trắng, để "Phường Đông Vệ" và "phuong dong ve" có cùng một khóa tìm kiếm.
+``normalize_phone`` đưa số điện thoại về dạng chỉ gồm chữ số theo định dạng
+trong nước ("+84 912-345-678" -> "0912345678").
+"""
+import math
+import re
+import unicodedata
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_NON_DIGIT_RE = re.compile(r"\D")
+# Số thực Excel đã lưu thành chuỗi: "912345678.0", "9.12345678E8"
+_FLOAT_TEXT_RE = re.compile(r"^\d+(?:\.\d*)?(?:[eE][+-]?\d+)?$")
+
+
+def fold_text(value):
+    """
+    Chuẩn hóa chuỗi: lowercase, bỏ dấu tiếng Việt, gộp khoảng trắng.
+
+    Returns:
+        str hoặc None nếu giá trị rỗng/NaN
+
+    Example:
+        >>> fold_text("  Phường  Đông Vệ ")
+        'phuong dong ve'
+    """
+    if value is None:
+        return None
+    if isinstance(value, float) and math.isnan(value):
+        return None
+
+    text = unicodedata.normalize("NFD", str(value).lower())
+    # 'đ' không có dạng phân tách NFD nên phải thay thủ công
+    text = text.replace("đ", "d")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = _WHITESPACE_RE.sub(" ", text).strip()
+    return text or None
+
+
+def normalize_phone(value):
+    """
+    Chuẩn hóa số điện thoại: chỉ giữ chữ số, đưa mã quốc gia +84/0084 về số 0
+    đầu, bổ sung số 0 bị Excel làm mất (số 9-10 chữ số bắt đầu bằng 2-9).
+
+    Returns:
+        str hoặc None nếu không có chữ số nào
+
+    Example:
+        >>> normalize_phone("+84 912-345-678")
+        '0912345678'
+        >>> normalize_phone(912345678.0)
+        '0912345678'
+        >>> normalize_phone("912345678.0")
+        '0912345678'
+    """
+    if value is None:
+        return None
+    if isinstance(value, str) and _FLOAT_TEXT_RE.match(value.strip()) and not value.strip().isdigit():
+        value = float(value)
+    if isinstance(value, float):
+        if math.isnan(value):
+            return None
+        if value.is_integer():
+            value = int(value)
+
+    text = str(value).strip()
+    digits = _NON_DIGIT_RE.sub("", text)
+    if not digits:
+        return None
+
+    if digits.startswith("0084"):
+        digits = "0" + digits[4:]
+    elif text.startswith("+84") or (digits.startswith("84") and len(digits) in (11, 12)):
+        digits = "0" + digits[2:]
+    elif digits[0] in "23456789" and len(digits) in (9, 10):
+        digits = "0" + digits
+    return digits
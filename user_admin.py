@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from flask_login import login_required, current_user
 from models import db, User
 from security_utils import log_audit, sanitize_input
+from services.pagination import keyset_paginate
 from services.user_service import create_user
 
 user_bp = Blueprint("user", __name__, url_prefix="/users")
@@ -22,18 +23,46 @@ def manage_users():
     # Pagination
     page = request.args.get('page', 1, type=int)
     per_page = current_app.config.get('CAMERAS_PER_PAGE', 50)  # Dùng cùng config
+    cursor = request.args.get('cursor')
+    if cursor is None and current_app.config.get('PAGINATION_MODE') == 'keyset':
+        cursor = ''
     
-    pagination = User.query.paginate(page=page, per_page=per_page, error_out=False)
+    if cursor is not None:
+        pagination = keyset_paginate(
+            User.query,
+            User.id,
+            cursor=cursor,
+            per_page=per_page,
+            count_mode=current_app.config.get('KEYSET_COUNT_MODE', 'estimate'),
+        )
+    else:
+        pagination = User.query.paginate(page=page, per_page=per_page, error_out=False)
     users = pagination.items
     
     # Helper function để build pagination URL
     def build_pagination_url(page_num):
         """Build URL với tất cả query params hiện tại, chỉ thay đổi page"""
+        if cursor is not None:
+            # Keyset: số trang (đầu/trước/sau) được đổi thành con trỏ tương ứng
+            return build_cursor_url(pagination.cursor_for(page_num) or '')
         args = request.args.copy()
         args['page'] = page_num
         return url_for('user.manage_users', **args)
     
-    return render_template("user/manage.html", users=users, pagination=pagination, build_pagination_url=build_pagination_url)
+    def build_cursor_url(cursor_value):
+        """Build URL với tất cả query params hiện tại, chỉ thay đổi cursor"""
+        args = request.args.copy()
+        args.pop('page', None)
+        args['cursor'] = cursor_value
+        return url_for('user.manage_users', **args)
+    
+    return render_template(
+        "user/manage.html",
+        users=users,
+        pagination=pagination,
+        build_pagination_url=build_pagination_url,
+        build_cursor_url=build_cursor_url,
+    )
 
 
 @user_bp.route("/create", methods=["POST"])